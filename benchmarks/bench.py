@@ -0,0 +1,268 @@
+"""
+Benchmarks of the client hot paths against the local stand-in server.
+
+Run the suite and store the results of the current commit in
+`benchmarks/results/<commit>.json`:
+
+```bash
+python benchmarks/bench.py run [--protocol ipc|rest|all] [--size small]
+```
+
+Compare two result files; benchmarks that are slower than the given
+threshold (relative change of the median) are flagged and the command exits
+with status 1 when there are regressions:
+
+```bash
+python benchmarks/bench.py compare results/abc123.json results/def456.json
+```
+
+When no files are given, the two most recent files in the results folder
+are compared.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import olca_schema as o
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import olca_ipc.utree as utree  # noqa: E402
+from olca_ipc.protocol import ProtoClient  # noqa: E402
+from olca_ipc.standin import StandInServer, SyntheticModel  # noqa: E402
+
+RESULTS = Path(__file__).resolve().parent / "results"
+
+SIZES = {
+    "small": dict(tech_flows=200, envi_flows=100, impacts=10),
+    "medium": dict(tech_flows=2000, envi_flows=500, impacts=30),
+    "large": dict(tech_flows=10000, envi_flows=2000, impacts=50),
+}
+
+
+class Bench:
+    """
+    A benchmark function that is called `number` times per repetition; the
+    timings are reported per call. `unit` is the number of items that are
+    processed per call, e.g. the number of decoded objects.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        number: int = 10,
+        unit: int = 1,
+        setup: Callable[[], Any] | None = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.number = number
+        self.unit = unit
+        self.setup = setup
+
+    def run(self, repeat: int) -> dict[str, Any]:
+        times: list[float] = []
+        self.fn()  # warm up
+        for _ in range(repeat):
+            if self.setup is not None:
+                self.setup()
+            start = time.perf_counter()
+            for _ in range(self.number):
+                self.fn()
+            times.append((time.perf_counter() - start) / self.number)
+        median = statistics.median(times)
+        return {
+            "median": median,
+            "min": min(times),
+            "mean": statistics.fmean(times),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+            "repeat": repeat,
+            "number": self.number,
+            "unit": self.unit,
+            "throughput": self.unit / median if median > 0 else 0.0,
+        }
+
+
+def _suite(client: ProtoClient, prefix: str) -> list[Bench]:
+    result = client.calculate(o.CalculationSetup())
+    result.wait_until_ready()
+    tech_flows = result.get_tech_flows()
+    impact = result.get_impact_categories()[0]
+    envi_flow = result.get_envi_flows()[0]
+    raw = [v.to_dict() for v in result.get_flow_contributions_of(envi_flow)]
+
+    def decode():
+        return [o.TechFlowValue.from_dict(d) for d in raw]
+
+    def expand():
+        utree.expand(utree.of(result, impact), max_depth=4, concurrency=4)
+
+    units = [o.new_unit_group(f"units {i}", "kg") for i in range(100)]
+
+    def put_all():
+        client.put_all(*units)
+
+    def find():
+        client.find(o.Process, f"process {len(tech_flows) // 2}")
+
+    simulation = client.simulate(o.CalculationSetup())
+
+    def monte_carlo():
+        simulation.simulate_next()
+        simulation.get_total_impacts()
+
+    return [
+        Bench("startup/import", _import_package, number=1),
+        Bench(f"{prefix}/round_trip", lambda: result.get_state(), number=50),
+        Bench(
+            f"{prefix}/total_requirements",
+            result.get_total_requirements,
+            unit=len(tech_flows),
+        ),
+        Bench("decode/tech_flow_values", decode, unit=len(raw)),
+        Bench(f"{prefix}/utree_expand", expand, number=3),
+        Bench(f"{prefix}/put_all", put_all, number=1, unit=len(units)),
+        Bench(f"{prefix}/find", find, number=5),
+        Bench(f"{prefix}/monte_carlo", monte_carlo, number=10),
+    ]
+
+
+def _import_package():
+    """Imports the package in a fresh interpreter (including its startup)."""
+    subprocess.run(
+        [sys.executable, "-c", "import olca_ipc"],
+        cwd=Path(__file__).resolve().parent.parent,
+        check=True,
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    model = SyntheticModel(**SIZES[args.size])
+    results: dict[str, Any] = {}
+    protocols = ["ipc", "rest"] if args.protocol == "all" else [args.protocol]
+    with StandInServer(model, latency=args.latency) as server:
+        for protocol in protocols:
+            if protocol == "ipc":
+                client: ProtoClient = server.ipc_client()
+            else:
+                client = server.rest_client()
+            for bench in _suite(client, protocol):
+                if bench.name in results:
+                    continue
+                if args.filter and args.filter not in bench.name:
+                    continue
+                stats = bench.run(args.repeat)
+                results[bench.name] = stats
+                print(
+                    f"{bench.name:<32} {stats['median'] * 1000:10.3f} ms"
+                    f"  {stats['throughput']:12.1f} /s"
+                )
+
+    commit = _commit()
+    data = {
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": args.size,
+        "latency": args.latency,
+        "benchmarks": results,
+    }
+    out = Path(args.out) if args.out else RESULTS / f"{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"results written to {out}")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    files = [Path(f) for f in args.files]
+    if len(files) == 0:
+        files = sorted(RESULTS.glob("*.json"), key=lambda f: f.stat().st_mtime)
+        files = files[-2:]
+    if len(files) != 2:
+        print("two result files are required for a comparison")
+        return 2
+    with open(files[0], encoding="utf-8") as f:
+        base = json.load(f)
+    with open(files[1], encoding="utf-8") as f:
+        head = json.load(f)
+    if base.get("size") != head.get("size"):
+        print("warning: the results were measured with different sizes")
+
+    print(f"base: {base.get('commit')}  head: {head.get('commit')}")
+    regressions = 0
+    for name, h in head["benchmarks"].items():
+        b = base["benchmarks"].get(name)
+        if b is None:
+            print(f"{name:<32} {'new':>10}")
+            continue
+        change = h["median"] / b["median"] - 1 if b["median"] > 0 else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  improved"
+        print(
+            f"{name:<32} {b['median'] * 1000:10.3f} ms"
+            f" -> {h['median'] * 1000:10.3f} ms {change:+8.1%}{flag}"
+        )
+    return 1 if regressions > 0 else 0
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=Path(__file__).resolve().parent,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run the benchmarks")
+    run_cmd.add_argument(
+        "--protocol", choices=["ipc", "rest", "all"], default="all"
+    )
+    run_cmd.add_argument("--size", choices=list(SIZES), default="small")
+    run_cmd.add_argument("--repeat", type=int, default=5)
+    run_cmd.add_argument(
+        "--latency", type=float, default=0.0, help="server latency in seconds"
+    )
+    run_cmd.add_argument("--filter", help="only run matching benchmarks")
+    run_cmd.add_argument("--out", help="the output file")
+
+    compare_cmd = commands.add_parser("compare", help="compare two results")
+    compare_cmd.add_argument("files", nargs="*", help="base and head file")
+    compare_cmd.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="the relative slow-down that is flagged as regression",
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        return run(args)
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,25 @@
-from .protocol import ProtoClient, ProtoResult, FileData
-from .ipc import Client, Result
-from .rest import RestClient, RestResult
+"""
+The client implementations are loaded on first access, so that importing
+the package does not import the transport dependencies of both protocols.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+from .protocol import ProtoClient, ProtoResult, FileData, FileStream
+
+if TYPE_CHECKING:
+    from . import utree
+    from .ipc import Client, Result
+    from .rest import RestClient, RestResult
+
+_LAZY = {
+    "Client": ".ipc",
+    "Result": ".ipc",
+    "RestClient": ".rest",
+    "RestResult": ".rest",
+    "utree": ".utree",
+}
 
 __all__ = [
     "Client",
@@ -10,4 +29,20 @@ __all__ = [
     "ProtoClient",
     "ProtoResult",
     "FileData",
+    "FileStream",
+    "utree",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name, __name__)
+    value = module if name == "utree" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
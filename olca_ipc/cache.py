@@ -0,0 +1,268 @@
+"""
+A cache for entities that are requested by ID.
+
+The cache is enabled per client and is then used by `get` when an ID is
+given:
+
+```python
+cache = client.enable_cache(max_bytes=128 * 1024 * 1024)
+unit_group = client.get(o.UnitGroup, "93a60a57-a4c8-11da-a746-0800200c9a66")
+...
+print(cache.hits, cache.misses, cache.size)
+```
+
+The entities are stored as JSON in a memory tier with a size limit in bytes;
+when this limit is exceeded, the least recently used entities are evicted.
+When a directory is given, the entities are also stored in a disk tier with
+its own size limit, which survives the process. Each `get` returns a new
+instance, so that changing a returned entity does not change the cache.
+
+With `revalidate`, a cached entity is checked against its descriptor before
+it is returned: when the descriptor contains a `version` or `lastChange`
+that does not match the cached entity, the entity is downloaded again. This
+costs a round trip with a small response instead of downloading the full
+entity. Changes through the same client (`put`, `delete`) remove the
+entities from the cache directly. Without `revalidate`, entities are only
+updated on such changes.
+"""
+
+import json
+import logging as log
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, cast
+
+import olca_schema as o
+
+_Key = tuple[str, str]
+
+
+@dataclass
+class _Entry:
+    data: bytes
+    version: str | None
+    last_change: str | None
+
+
+class EntityCache:
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: str | os.PathLike[str] | None = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        revalidate: bool = True,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._entries: OrderedDict[_Key, _Entry] = OrderedDict()
+        self._size = 0
+        self._disk_size: int | None = None
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """The size of the entities in the memory tier in bytes."""
+        return self._size
+
+    def get(
+        self,
+        type_name: str,
+        uid: str,
+        fetch: Callable[[], dict[str, Any] | None],
+        descriptor: Callable[[], dict[str, Any] | None] | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Returns the JSON object of the entity with the given type and ID.
+        When it is not cached, or when it is outdated, it is loaded with the
+        given `fetch` function. The `descriptor` function is used to check
+        whether a cached entity is outdated.
+        """
+        key = (type_name, uid)
+        entry = self._memory_get(key)
+        if entry is None:
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._memory_put(key, entry)
+
+        if entry is not None and self.revalidate and descriptor is not None:
+            if not _is_valid(entry, descriptor()):
+                self.stale += 1
+                self.invalidate(uid, type_name)
+                entry = None
+
+        if entry is not None:
+            self.hits += 1
+            return json.loads(entry.data)
+
+        self.misses += 1
+        data = fetch()
+        if data is None:
+            return None
+        self.put(type_name, uid, data)
+        return data
+
+    def put(self, type_name: str, uid: str, data: dict[str, Any]):
+        raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        entry = _Entry(raw, data.get("version"), data.get("lastChange"))
+        key = (type_name, uid)
+        self._memory_put(key, entry)
+        self._disk_put(key, entry)
+
+    def invalidate(self, uid: str, type_name: str | None = None):
+        """
+        Removes the entity with the given ID from the cache. When no type is
+        given, entities of all types with that ID are removed.
+        """
+        with self._lock:
+            keys = (
+                [(type_name, uid)]
+                if type_name is not None
+                else [k for k in self._entries if k[1] == uid]
+            )
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._size -= len(entry.data)
+        if self.directory is None:
+            return
+        if type_name is not None:
+            files = [self._file_of((type_name, uid))]
+        else:
+            files = list(self.directory.glob(f"*/{uid}.json"))
+        with self._disk_lock:
+            for file in files:
+                self._remove_file(file)
+
+    def on_change(self, ref: o.Ref):
+        """A change listener that invalidates the changed entity."""
+        if ref.id is None:
+            return
+        type_name = ref.ref_type.value if ref.ref_type is not None else None
+        self.invalidate(ref.id, type_name)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.directory is None:
+            return
+        with self._disk_lock:
+            for file in self.directory.glob("*/*.json"):
+                self._remove_file(file)
+            self._disk_size = 0
+
+    # region: memory tier
+
+    def _memory_get(self, key: _Key) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key: _Key, entry: _Entry):
+        if len(entry.data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.data)
+            self._entries[key] = entry
+            self._size += len(entry.data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.data)
+                self.evictions += 1
+
+    # endregion
+
+    # region: disk tier
+
+    def _file_of(self, key: _Key) -> Path:
+        return cast(Path, self.directory) / key[0] / f"{key[1]}.json"
+
+    def _disk_get(self, key: _Key) -> _Entry | None:
+        if self.directory is None:
+            return None
+        file = self._file_of(key)
+        try:
+            raw = file.read_bytes()
+            os.utime(file)  # the modification time is the last access
+            data = json.loads(raw)
+        except (OSError, ValueError):
+            return None
+        return _Entry(raw, data.get("version"), data.get("lastChange"))
+
+    def _disk_put(self, key: _Key, entry: _Entry):
+        if self.directory is None or len(entry.data) > self.max_disk_bytes:
+            return
+        file = self._file_of(key)
+        with self._disk_lock:
+            try:
+                self._init_disk_size()
+                file.parent.mkdir(parents=True, exist_ok=True)
+                if file.exists():
+                    self._remove_file(file)
+                tmp = file.with_suffix(f".{threading.get_ident()}.tmp")
+                tmp.write_bytes(entry.data)
+                os.replace(tmp, file)
+                self._disk_size = (self._disk_size or 0) + len(entry.data)
+                if self._disk_size > self.max_disk_bytes:
+                    self._evict_disk()
+            except OSError as e:
+                log.error("failed to write cache file %s: %s", file, e)
+
+    def _init_disk_size(self):
+        if self._disk_size is not None or self.directory is None:
+            return
+        self._disk_size = sum(
+            f.stat().st_size for f in self.directory.glob("*/*.json")
+        )
+
+    def _evict_disk(self):
+        if self.directory is None:
+            return
+        files = sorted(
+            self.directory.glob("*/*.json"), key=lambda f: f.stat().st_mtime
+        )
+        for file in files:
+            if (self._disk_size or 0) <= self.max_disk_bytes:
+                break
+            self._remove_file(file)
+            self.evictions += 1
+
+    def _remove_file(self, file: Path):
+        try:
+            size = file.stat().st_size
+            file.unlink()
+        except OSError:
+            return
+        if self._disk_size is not None:
+            self._disk_size -= size
+
+    # endregion
+
+
+def _is_valid(entry: _Entry, descriptor: dict[str, Any] | None) -> bool:
+    if descriptor is None:
+        return False
+    version = descriptor.get("version")
+    if version is not None and version != entry.version:
+        return False
+    last_change = descriptor.get("lastChange")
+    if last_change is not None and last_change != entry.last_change:
+        return False
+    return True
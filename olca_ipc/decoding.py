@@ -0,0 +1,228 @@
+"""
+Decoding of large responses in a process pool.
+
+Turning a large JSON response into schema objects is CPU-bound and holds the
+GIL, so that other client threads stall while it runs. With a
+`ProcessDecoder`, responses above a size threshold are decoded and converted
+into schema objects in worker processes; the objects are sent back pickled,
+which is much cheaper to load than to construct them again:
+
+```python
+from olca_ipc.decoding import ProcessDecoder
+
+decoder = ProcessDecoder(threshold=4 * 1024 * 1024)
+client = ipc.Client(8080, decoder=decoder)
+...
+decoder.close()
+```
+
+Smaller responses, and responses with a transformation that cannot be
+pickled, are decoded in the calling thread as before. When concurrent,
+identical calls are coalesced by the client, the objects of a response that
+was decoded in a worker process are copied for each caller.
+
+For numeric results, `amounts` extracts the amounts of a list of values into
+a NumPy array; above the threshold, a worker writes them into a shared
+memory block from which the array is copied, without pickling the values.
+"""
+
+import copy
+import json
+import multiprocessing
+import pickle
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Callable, Generic, TypeVar
+
+if TYPE_CHECKING:
+    import numpy as np
+
+T = TypeVar("T")
+
+# the maximum number of transformations of which the pickle check is kept
+_MAX_MEMO = 256
+
+
+def copy_constructed(fetched: tuple[Any, Any, bool]) -> tuple[Any, Any, bool]:
+    """
+    Copies the data of a `(data, error, constructed)` tuple of a client when
+    it was constructed by a decoder. Raw JSON data is only read by the
+    transformations that construct objects from it, so that it can be shared.
+    """
+    data, err, constructed = fetched
+    return (copy.deepcopy(data), err, True) if constructed else fetched
+
+
+class ListOf(Generic[T]):
+    """
+    A transformation that applies a transformation to each item of a list.
+    Unlike a lambda, it can be pickled when the item transformation can be
+    pickled, e.g. `ListOf(o.Ref.from_dict)`. Instances with the same item
+    transformation are equal, so that they can be part of the keys of
+    coalesced calls.
+    """
+
+    __slots__ = ("transform",)
+
+    def __init__(self, transform: Callable[[Any], T]):
+        self.transform = transform
+
+    def __call__(self, xs: list[Any]) -> list[T]:
+        return [self.transform(x) for x in xs]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ListOf) and other.transform == self.transform
+
+    def __hash__(self) -> int:
+        return hash((ListOf, self.transform))
+
+
+class ProcessDecoder:
+    """
+    Decodes responses of at least `threshold` bytes in a pool of at most
+    `max_workers` processes. The pool is started on first use; `close`
+    stops it.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 4 * 1024 * 1024,
+        max_workers: int | None = None,
+    ):
+        self.threshold = threshold
+        self.max_workers = max_workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._picklable: dict[Any, bool] = {}
+
+    def accepts(self, size: int) -> bool:
+        return size >= self.threshold
+
+    def decode(self, content: bytes, transform: Callable[[Any], T]) -> T:
+        """Decodes the JSON content and applies the transformation on it."""
+        if not self.accepts(len(content)) or not self._can_pickle(transform):
+            return transform(json.loads(content))
+        return self._pool_of().submit(_decode, content, transform).result()
+
+    def decode_rpc(
+        self, content: bytes, transform: Callable[[Any], Any]
+    ) -> dict[str, Any]:
+        """
+        Decodes a JSON-RPC response and applies the transformation on its
+        result, if it has one.
+        """
+        if not self.accepts(len(content)) or not self._can_pickle(transform):
+            return _decode_rpc(content, transform)
+        return self._pool_of().submit(_decode_rpc, content, transform).result()
+
+    def amounts(self, content: bytes, field: str = "amount") -> "np.ndarray":
+        """
+        Returns the amounts of a JSON list of values (or of the result of a
+        JSON-RPC response with such a list) as array.
+        """
+        import numpy as np
+
+        if not self.accepts(len(content)):
+            items = _items_of(json.loads(content))
+            return np.array(
+                [x.get(field) or 0.0 for x in items], dtype=np.float64
+            )
+        name, n = self._pool_of().submit(_to_shared, content, field).result()
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            return np.ndarray((n,), dtype=np.float64, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self) -> "ProcessDecoder":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _pool_of(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # client threads may be running; thus, we do not fork
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _can_pickle(self, transform: Callable[[Any], Any]) -> bool:
+        key = _memo_key(transform)
+        try:
+            with self._lock:
+                known = self._picklable.get(key)
+        except TypeError:  # not hashable
+            known = None
+        if known is not None:
+            return known
+        try:
+            pickle.dumps(transform)
+            ok = True
+        except (pickle.PicklingError, AttributeError, TypeError):
+            ok = False
+        try:
+            with self._lock:
+                if len(self._picklable) >= _MAX_MEMO:
+                    self._picklable.clear()
+                self._picklable[key] = ok
+        except TypeError:
+            pass
+        return ok
+
+
+def _memo_key(transform: Callable[[Any], Any]) -> Any:
+    """
+    Returns a stable key of a transformation: bound methods like
+    `o.Ref.from_dict` are created on each access, and a `ListOf` is
+    created for each call; thus, they are identified by their parts.
+    """
+    if isinstance(transform, ListOf):
+        return (ListOf, _memo_key(transform.transform))
+    if isinstance(transform, types.MethodType):
+        return (transform.__self__, transform.__func__)
+    return transform
+
+
+def _decode(content: bytes, transform: Callable[[Any], T]) -> T:
+    return transform(json.loads(content))
+
+
+def _decode_rpc(
+    content: bytes, transform: Callable[[Any], Any]
+) -> dict[str, Any]:
+    resp = json.loads(content)
+    if resp.get("error") is None and resp.get("result") is not None:
+        resp["result"] = transform(resp["result"])
+    return resp
+
+
+def _items_of(data: Any) -> list[dict[str, Any]]:
+    if isinstance(data, dict):
+        data = data.get("result")
+    return data if isinstance(data, list) else []
+
+
+def _to_shared(content: bytes, field: str) -> tuple[str, int]:
+    items = _items_of(json.loads(content))
+    n = len(items)
+    shm = shared_memory.SharedMemory(create=True, size=max(8, 8 * n))
+    values = shm.buf.cast("d")
+    for i, item in enumerate(items):
+        values[i] = float(item.get(field) or 0.0)
+    values.release()
+    name = shm.name
+    shm.close()
+    return name, n
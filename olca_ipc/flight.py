@@ -0,0 +1,94 @@
+"""
+Coalescing of identical, concurrent calls.
+
+With `SingleFlight`, concurrent calls with the same key share one execution:
+the first caller runs the function, and callers that arrive while it is in
+flight wait for it and receive the same value (or exception). Nothing is
+cached; a call that starts after the previous one finished runs again. The
+clients use this for their read-only requests, so that many threads asking
+for the same data at the same moment result in a single download. As the
+shared values can be mutable, a `copy` function can be passed, so that each
+caller of a shared execution receives its own copy. With `forget`, calls
+that are in flight are not joined anymore, e.g. after a write that their
+values may not reflect.
+"""
+
+import threading
+from typing import Callable, Generic, Hashable, TypeVar, cast
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: T | None = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """The number of calls that are currently executed."""
+        with self._lock:
+            return len(self._calls)
+
+    def forget(self):
+        """
+        Lets new calls run again instead of joining the calls that are
+        currently in flight. The callers of these calls still receive their
+        values.
+        """
+        with self._lock:
+            self._calls.clear()
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], T],
+        copy: Callable[[T], T] | None = None,
+    ) -> tuple[T, bool]:
+        """
+        Executes the function, or waits for the execution of a concurrent
+        call with the same key. Returns the value and whether it came from
+        the execution of such a concurrent call. When a `copy` function is
+        given and the execution was shared, every caller, including the one
+        that executed the function, receives a copy of the value.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            value = cast(T, call.value)
+            return (copy(value) if copy is not None else value), True
+
+        try:
+            value = fn()
+            call.value = value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                shared = call.waiters > 0
+            call.done.set()
+        # no waiter can join after the call was removed; thus, when there
+        # are no waiters, the value is not shared and needs no copy
+        if shared and copy is not None:
+            return copy(value), False
+        return value, False
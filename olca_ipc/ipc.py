@@ -1,11 +1,24 @@
+import copy
+import json
 import logging as log
+import threading
+import time
 from dataclasses import dataclass
 from typing import Any, Callable, Optional, Tuple, Type, TypeVar, cast, override
 
 import olca_schema as o
-import requests
 
-from .protocol import E, ProtoClient, ProtoResult, FileData
+from .decoding import ListOf, ProcessDecoder, copy_constructed
+from .flight import SingleFlight
+from .metrics import Metrics, size_of
+from .protocol import (
+    E,
+    FileData,
+    FileStream,
+    ProtoClient,
+    ProtoResult,
+    tech_key,
+)
 
 _T = TypeVar("_T")
 
@@ -13,17 +26,38 @@ _T = TypeVar("_T")
 class Client(ProtoClient):
     """
     A client to communicate with an openLCA IPC server over the JSON-RPC
-    protocol.
+    protocol. When a `Metrics` instance is given, the calls of the client
+    are recorded in it. With `coalesce`, which is off by default, concurrent
+    calls of the same read-only method with equal parameters share one
+    request; each caller constructs its own objects from the response. Calls
+    after a change through the client do not join calls from before it. With
+    a `ProcessDecoder`, large responses are decoded in worker processes.
     """
 
-    def __init__(self, endpoint: str | int = 8080):
+    def __init__(
+        self,
+        endpoint: str | int = 8080,
+        metrics: Metrics | None = None,
+        coalesce: bool = False,
+        decoder: ProcessDecoder | None = None,
+    ):
+        import requests  # deferred until a client is created
+
         self.url: str
         if isinstance(endpoint, str):
             self.url = endpoint
         else:
             self.url = "http://localhost:%i" % endpoint
         self.next_id = 1
+        self._id_lock = threading.Lock()
         self._s = requests.Session()
+        self.metrics = metrics
+        self._flight = SingleFlight() if coalesce else None
+        flight = self._flight
+        if flight is not None:
+            # reads after a change must not join reads from before it
+            self.add_change_listener(lambda _: flight.forget())
+        self.decoder = decoder
 
     @override
     def get(
@@ -35,6 +69,18 @@ class Client(ProtoClient):
         if not uid and not name:
             log.error("no ID or name given")
             return None
+        if uid and self._entity_cache is not None:
+            ref = {"@type": model_type.__name__, "@id": uid}
+            data = self._entity_cache.get(
+                model_type.__name__,
+                uid,
+                lambda: self._data_of("data/get", ref),
+                lambda: self._data_of("data/get/descriptor", ref),
+            )
+            if data is None:
+                return None
+            entity = self._construct("data/get", model_type.from_dict, data)
+            return cast(E, entity)
         params = {"@type": model_type.__name__}
         if uid is not None:
             params["@id"] = uid
@@ -44,26 +90,28 @@ class Client(ProtoClient):
         if err:
             log.warning("failed to get entity of type %s: %s", model_type, err)
             return None
-        return cast(E, model_type.from_dict(result))
+        entity = self._construct("data/get", model_type.from_dict, result)
+        return cast(E, entity)
+
+    def _data_of(self, method: str, params: dict[str, Any]) -> Any | None:
+        result, err = self.rpc_call(method, params)
+        if err:
+            log.warning("failed to call method %s: %s", method, err)
+            return None
+        return result
 
     @override
     def get_all(self, model_type: Type[E]) -> list[E]:
         params = {"@type": model_type.__name__}
-        result, err = self.rpc_call("data/get/all", params)
-        if err:
-            log.error("failed to get all of type %s: %s", model_type, err)
-        return [cast(E, model_type.from_dict(r)) for r in result]
+        return cast(
+            list[E],
+            self._call_each("data/get/all", model_type.from_dict, params),
+        )
 
     @override
     def get_descriptors(self, model_type: Type[E]) -> list[o.Ref]:
         params = {"@type": model_type.__name__}
-        result, err = self.rpc_call("data/get/descriptors", params)
-        if err:
-            log.error(
-                "failed to get descriptors of type %s: %s", model_type, err
-            )
-            return []
-        return [o.Ref.from_dict(r) for r in result]
+        return self._call_each("data/get/descriptors", o.Ref.from_dict, params)
 
     @override
     def get_descriptor(
@@ -95,11 +143,9 @@ class Client(ProtoClient):
                 "@id": flow.id,
                 "name": flow.name,
             }
-        providers, err = self.rpc_call("data/get/providers", params)
-        if err:
-            log.error("failed to get providers: %s", err)
-            return []
-        return [o.TechFlow.from_dict(d) for d in providers]
+        return self._call_each(
+            "data/get/providers", o.TechFlow.from_dict, params
+        )
 
     @override
     def get_parameters(
@@ -123,18 +169,21 @@ class Client(ProtoClient):
         if err:
             log.error("failed to insert model: %s", err)
             return None
-        return o.Ref.from_dict(resp)
+        ref = o.Ref.from_dict(resp)
+        self._notify_change(ref)
+        return ref
 
     @override
     def put_source_file(
-        self, source: o.Source | o.Ref, file_data: FileData
+        self, source: o.Source | o.Ref, file_data: FileData | FileStream
     ) -> bool:
-        resp, err = self.rpc_call(
+        resp, err, _ = self._rpc_call(
             "data/put/source-file",
             {
                 "source": o.as_ref(source).to_dict(),
                 "file": file_data.to_dict(),
             },
+            stream=file_data if isinstance(file_data, FileStream) else None,
         )
         if err:
             log.error("failed to upload source file: %s", err)
@@ -163,7 +212,9 @@ class Client(ProtoClient):
         if err:
             log.error("failed to create product system: %s", err)
             return None
-        return o.Ref.from_dict(r)
+        system = o.Ref.from_dict(r)
+        self._notify_change(system)
+        return system
 
     @override
     def delete(self, model: o.RootEntity | o.Ref) -> o.Ref | None:
@@ -174,7 +225,9 @@ class Client(ProtoClient):
         if err:
             log.error("failed to delete model: %s", err)
             return None
-        return o.Ref.from_dict(resp)
+        deleted = o.Ref.from_dict(resp)
+        self._notify_change(deleted)
+        return deleted
 
     @override
     def calculate(self, setup: o.CalculationSetup) -> "Result":
@@ -204,47 +257,133 @@ class Client(ProtoClient):
 
         It returns a tuple (result, error).
         """
+        result, err, _ = self._rpc(method, params)
+        return result, err
+
+    def _rpc(
+        self,
+        method: str,
+        params: Any = None,
+        transform: Callable[[Any], Any] | None = None,
+    ) -> Tuple[Any, Optional[str], bool]:
+        """
+        Returns a tuple (result, error, constructed). When a transformation
+        is given, the result may be constructed with it already by the
+        decoder of the client; `constructed` is then true.
+        """
+        # raw results are returned to the caller and are copied; otherwise,
+        # the callers construct their own objects from the shared result
+        copies = copy.deepcopy if transform is None else copy_constructed
+        if self.decoder is None:
+            transform = None
+        if self._flight is None or not _is_read_only(method):
+            return self._rpc_call(method, params, transform=transform)
+        key = (method, json.dumps(params, sort_keys=True), transform)
+        value, shared = self._flight.do(
+            key,
+            lambda: self._rpc_call(method, params, transform=transform),
+            copies,
+        )
+        if shared and self.metrics is not None:
+            self.metrics.record_coalesced(method)
+        return value
+
+    def _rpc_call(
+        self,
+        method: str,
+        params: Any = None,
+        stream: FileStream | None = None,
+        transform: Callable[[Any], Any] | None = None,
+    ) -> Tuple[Any, Optional[str], bool]:
+        with self._id_lock:
+            req_id = self.next_id
+            self.next_id += 1
         req: dict[str, Any] = {
             "jsonrpc": "2.0",
-            "id": self.next_id,
+            "id": req_id,
             "method": method,
         }
         if params is not None:
             req["params"] = params
-        self.next_id += 1
 
-        raw = self._s.post(self.url, json=req)
-        resp: dict = raw.json()
+        start = time.perf_counter()
+        if stream is None:
+            raw = self._s.post(self.url, json=req)
+        else:
+            raw = self._s.post(
+                self.url,
+                data=stream.body_of(req),
+                headers={"Content-Type": "application/json"},
+            )
+        received = time.perf_counter()
+        constructed = False
+        if (
+            transform is not None
+            and self.decoder is not None
+            and self.decoder.accepts(len(raw.content))
+        ):
+            resp: dict = self.decoder.decode_rpc(raw.content, transform)
+            constructed = True
+        else:
+            resp = raw.json()
         raw.close()
         err: dict | None = resp.get("error")
+        if self.metrics is not None:
+            self.metrics.record_call(
+                method,
+                received - start,
+                request_bytes=size_of(raw.request.body),
+                response_bytes=len(raw.content),
+                error=err is not None,
+            )
+            self.metrics.record_decode(method, time.perf_counter() - received)
         if err:
             err_msg = "%d: %s" % (
                 cast(int, err.get("code")),
                 err.get("message"),
             )
-            return None, err_msg
+            return None, err_msg, False
         result = resp.get("result")
         if result is None:
-            return None, "No error and no result: invalid JSON-RPC response"
-        return result, None
+            return (
+                None,
+                "No error and no result: invalid JSON-RPC response",
+                False,
+            )
+        return result, None, constructed
 
     def _call(
         self, method: str, transform: Callable[[Any], _T], data: Any = None
     ) -> _T | None:
-        (resp, err) = self.rpc_call(method, data)
+        (resp, err, constructed) = self._rpc(method, data, transform)
         if err is not None:
             log.error("failed to call method %s: %s", method, err)
             return None
-        return transform(resp)
+        if constructed:
+            return resp
+        return self._construct(method, transform, resp)
 
     def _call_each(
         self, method: str, transform: Callable[[Any], _T], data: Any = None
     ) -> list[_T]:
-        (resp, err) = self.rpc_call(method, data)
+        each = ListOf(transform)
+        (resp, err, constructed) = self._rpc(method, data, each)
         if err is not None:
             log.error("failed to call method %s: %s", method, err)
             return []
-        return [transform(r) for r in resp]
+        if constructed:
+            return resp
+        return self._construct(method, each, resp)
+
+    def _construct(
+        self, method: str, transform: Callable[[Any], _T], data: Any
+    ) -> _T:
+        if self.metrics is None:
+            return transform(data)
+        start = time.perf_counter()
+        value = transform(data)
+        self.metrics.record_construct(method, time.perf_counter() - start)
+        return value
 
 
 @dataclass
@@ -283,61 +422,50 @@ class Result(ProtoResult):
 
     @override
     def get_demand(self) -> o.TechFlowValue | None:
-        (data, err) = self.client.rpc_call("result/demand", {"@id": self.uid})
-        if err:
-            log.error("failed to get demand: %s", err)
-            return None
-        return o.TechFlowValue.from_dict(data)
+        return self.client._call(
+            "result/demand", o.TechFlowValue.from_dict, {"@id": self.uid}
+        )
 
     @override
     def get_tech_flows(self) -> list[o.TechFlow]:
-        (data, err) = self.client.rpc_call(
-            "result/tech-flows", {"@id": self.uid}
+        return self.client._call_each(
+            "result/tech-flows", o.TechFlow.from_dict, {"@id": self.uid}
         )
-        if err:
-            log.error("failed to query /tech-flows: %s", err)
-            return []
-        return [o.TechFlow.from_dict(d) for d in data]
 
     @override
     def get_envi_flows(self) -> list[o.EnviFlow]:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/envi-flows", args)
-        if err:
-            log.error("request envi-flows failed: %s", err)
-            return []
-        return [o.EnviFlow.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/envi-flows", o.EnviFlow.from_dict, args
+        )
 
     @override
     def get_impact_categories(self) -> list[o.Ref]:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/impact-categories", args)
-        if err:
-            log.error("request impact-categories failed: %s", err)
-            return []
-        return [o.Ref.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/impact-categories", o.Ref.from_dict, args
+        )
 
     # region: tech-flows
 
     @override
     def get_total_requirements(self) -> list[o.TechFlowValue]:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/total-requirements", args)
-        if err:
-            log.error("request total-requirements failed: %s", err)
-            return []
-        return [o.TechFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/total-requirements", o.TechFlowValue.from_dict, args
+        )
 
     @override
     def get_total_requirements_of(
         self, tech_flow: o.TechFlow
     ) -> o.TechFlowValue:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/total-requirements-of", args)
-        if err:
-            log.error("request total-requirements-of failed: %s", err)
+        r = self.client._call(
+            "result/total-requirements-of", o.TechFlowValue.from_dict, args
+        )
+        if r is None:
             return o.TechFlowValue(amount=0, tech_flow=tech_flow)
-        return o.TechFlowValue.from_dict(r)
+        return r
 
     @override
     def get_scaling_factors(self) -> list[o.TechFlowValue]:
@@ -374,42 +502,37 @@ class Result(ProtoResult):
     @override
     def get_total_flows(self) -> list[o.EnviFlowValue]:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/total-flows", args)
-        if err:
-            log.error("request total-flows failed: %s", err)
-            return []
-        return [o.EnviFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/total-flows", o.EnviFlowValue.from_dict, args
+        )
 
     @override
     def get_total_flow_value_of(self, envi_flow: o.EnviFlow) -> o.EnviFlowValue:
         args = {"@id": self.uid, "enviFlow": envi_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/total-flow-value-of", args)
-        if err:
-            log.error("request total-flow-value-of failed: %s", err)
+        r = self.client._call(
+            "result/total-flow-value-of", o.EnviFlowValue.from_dict, args
+        )
+        if r is None:
             return o.EnviFlowValue(amount=0, envi_flow=envi_flow)
-        return o.EnviFlowValue.from_dict(r)
+        return r
 
     @override
     def get_flow_contributions_of(
         self, envi_flow: o.EnviFlow
     ) -> list[o.TechFlowValue]:
         args = {"@id": self.uid, "enviFlow": envi_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/flow-contributions-of", args)
-        if err:
-            log.error("request direct-flow-values-of failed: %s", err)
-            return []
-        return [o.TechFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/flow-contributions-of", o.TechFlowValue.from_dict, args
+        )
 
     @override
     def get_direct_interventions_of(
         self, tech_flow: o.TechFlow
     ) -> list[o.EnviFlowValue]:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/direct-interventions-of", args)
-        if err:
-            log.error("request direct-flows-of failed: %s", err)
-            return []
-        return [o.EnviFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/direct-interventions-of", o.EnviFlowValue.from_dict, args
+        )
 
     @override
     def get_direct_intervention_of(
@@ -420,22 +543,21 @@ class Result(ProtoResult):
             "enviFlow": envi_flow.to_dict(),
             "techFlow": tech_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/direct-intervention-of", args)
-        if err:
-            log.error("request direct-flow-of failed: %s", err)
+        r = self.client._call(
+            "result/direct-intervention-of", o.EnviFlowValue.from_dict, args
+        )
+        if r is None:
             return o.EnviFlowValue(amount=0, envi_flow=envi_flow)
-        return o.EnviFlowValue.from_dict(r)
+        return r
 
     @override
     def get_flow_intensities_of(
         self, tech_flow: o.TechFlow
     ) -> list[o.EnviFlowValue]:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/flow-intensities-of", args)
-        if err:
-            log.error("request total-flows-of-one failed: %s", err)
-            return []
-        return [o.EnviFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/flow-intensities-of", o.EnviFlowValue.from_dict, args
+        )
 
     @override
     def get_flow_intensity_of(
@@ -446,22 +568,21 @@ class Result(ProtoResult):
             "enviFlow": envi_flow.to_dict(),
             "techFlow": tech_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/flow-intensity-of", args)
-        if err:
-            log.error("request total-flow-of-one failed: %s", err)
+        r = self.client._call(
+            "result/flow-intensity-of", o.EnviFlowValue.from_dict, args
+        )
+        if r is None:
             return o.EnviFlowValue(amount=0, envi_flow=envi_flow)
-        return o.EnviFlowValue.from_dict(r)
+        return r
 
     @override
     def get_total_interventions_of(
         self, tech_flow: o.TechFlow
     ) -> list[o.EnviFlowValue]:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/total-interventions-of", args)
-        if err:
-            log.error("request total-flows-of failed: %s", err)
-            return []
-        return [o.EnviFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/total-interventions-of", o.EnviFlowValue.from_dict, args
+        )
 
     @override
     def get_total_intervention_of(
@@ -472,28 +593,25 @@ class Result(ProtoResult):
             "enviFlow": envi_flow.to_dict(),
             "techFlow": tech_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/total-intervention-of", args)
-        if err:
-            log.error("request total-flow-of failed: %s", err)
+        r = self.client._call(
+            "result/total-intervention-of", o.EnviFlowValue.from_dict, args
+        )
+        if r is None:
             return o.EnviFlowValue(amount=0, envi_flow=envi_flow)
-        return o.EnviFlowValue.from_dict(r)
+        return r
 
     @override
     def get_upstream_interventions_of(
-        self, envi_flow: o.EnviFlow, path: list[o.TechFlow]
+        self, envi_flow: o.EnviFlow, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         args = {
             "@id": self.uid,
             "enviFlow": envi_flow.to_dict(),
             "path": _encode_path(path),
         }
-        (r, err) = self.client.rpc_call(
-            "result/upstream-interventions-of", args
+        return self.client._call_each(
+            "result/upstream-interventions-of", o.UpstreamNode.from_dict, args
         )
-        if err:
-            log.error("request upstream-interventions-of failed: %s", err)
-            return []
-        return [o.UpstreamNode.from_dict(d) for d in r]
 
     @override
     def get_grouped_flow_results_of(
@@ -503,11 +621,9 @@ class Result(ProtoResult):
             "@id": self.uid,
             "enviFlow": envi_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/grouped-flow-results-of", args)
-        if err:
-            log.error("request grouped-flow-results-of failed: %s", err)
-            return []
-        return [o.GroupValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/grouped-flow-results-of", o.GroupValue.from_dict, args
+        )
 
     # endregion
 
@@ -516,64 +632,55 @@ class Result(ProtoResult):
     @override
     def get_total_impacts(self) -> list[o.ImpactValue]:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/total-impacts", args)
-        if err:
-            log.error("request total-impacts failed: %s", err)
-            return []
-        return [o.ImpactValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/total-impacts", o.ImpactValue.from_dict, args
+        )
 
     @override
     def get_total_impact_value_of(
         self, impact_category: o.Ref
     ) -> o.ImpactValue:
         args = {"@id": self.uid, "impactCategory": impact_category.to_dict()}
-        (r, err) = self.client.rpc_call("result/total-impact-value-of", args)
-        if err:
-            log.error("request total-impact-value-of failed: %s", err)
+        r = self.client._call(
+            "result/total-impact-value-of", o.ImpactValue.from_dict, args
+        )
+        if r is None:
             return o.ImpactValue(amount=0, impact_category=impact_category)
-        return o.ImpactValue.from_dict(r)
+        return r
 
     @override
     def get_normalized_impacts(self) -> list[o.ImpactValue]:
-        (r, err) = self.client.rpc_call(
-            "result/total-impacts/normalized", {"@id": self.uid}
+        return self.client._call_each(
+            "result/total-impacts/normalized",
+            o.ImpactValue.from_dict,
+            {"@id": self.uid},
         )
-        if err:
-            log.error("failed to get normalized impacts: %s", err)
-            return []
-        return [o.ImpactValue.from_dict(d) for d in r]
 
     @override
     def get_weighted_impacts(self) -> list[o.ImpactValue]:
-        (r, err) = self.client.rpc_call(
-            "result/total-impacts/weighted", {"@id": self.uid}
+        return self.client._call_each(
+            "result/total-impacts/weighted",
+            o.ImpactValue.from_dict,
+            {"@id": self.uid},
         )
-        if err:
-            log.error("failed to get weighted impacts: %s", err)
-            return []
-        return [o.ImpactValue.from_dict(d) for d in r]
 
     @override
     def get_impact_contributions_of(
         self, impact_category: o.Ref
     ) -> list[o.TechFlowValue]:
         args = {"@id": self.uid, "impactCategory": impact_category.to_dict()}
-        (r, err) = self.client.rpc_call("result/impact-contributions-of", args)
-        if err:
-            log.error("request direct-impact-values-of failed: %s", err)
-            return []
-        return [o.TechFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/impact-contributions-of", o.TechFlowValue.from_dict, args
+        )
 
     @override
     def get_direct_impacts_of(
         self, tech_flow: o.TechFlow
     ) -> list[o.ImpactValue]:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/direct-impacts-of", args)
-        if err:
-            log.error("request direct-impacts-of failed: %s", err)
-            return []
-        return [o.ImpactValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/direct-impacts-of", o.ImpactValue.from_dict, args
+        )
 
     @override
     def get_direct_impact_of(
@@ -584,22 +691,21 @@ class Result(ProtoResult):
             "impactCategory": impact_category.to_dict(),
             "techFlow": tech_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/direct-impact-of", args)
-        if err:
-            log.error("request direct-impact-of failed: %s", err)
+        r = self.client._call(
+            "result/direct-impact-of", o.ImpactValue.from_dict, args
+        )
+        if r is None:
             return o.ImpactValue(amount=0, impact_category=impact_category)
-        return o.ImpactValue.from_dict(r)
+        return r
 
     @override
     def get_impact_intensities_of(
         self, tech_flow: o.TechFlow
     ) -> list[o.ImpactValue]:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/total-impacts-of-one", args)
-        if err:
-            log.error("request total-impacts-of-one failed: %s", err)
-            return []
-        return [o.ImpactValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/total-impacts-of-one", o.ImpactValue.from_dict, args
+        )
 
     @override
     def get_impact_intensity_of(
@@ -610,22 +716,21 @@ class Result(ProtoResult):
             "impactCategory": impact_category.to_dict(),
             "techFlow": tech_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/impact-intensity-of", args)
-        if err:
-            log.error("request total-impact-of-one failed: %s", err)
+        r = self.client._call(
+            "result/impact-intensity-of", o.ImpactValue.from_dict, args
+        )
+        if r is None:
             return o.ImpactValue(amount=0, impact_category=impact_category)
-        return o.ImpactValue.from_dict(r)
+        return r
 
     @override
     def get_total_impacts_of(
         self, tech_flow: o.TechFlow
     ) -> list[o.ImpactValue]:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/total-impacts-of", args)
-        if err:
-            log.error("request total-impacts-of failed: %s", err)
-            return []
-        return [o.ImpactValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/total-impacts-of", o.ImpactValue.from_dict, args
+        )
 
     @override
     def get_total_impact_of(
@@ -636,22 +741,21 @@ class Result(ProtoResult):
             "impactCategory": impact_category.to_dict(),
             "techFlow": tech_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/total-impact-of", args)
-        if err:
-            log.error("request total-impact-of failed: %s", err)
+        r = self.client._call(
+            "result/total-impact-of", o.ImpactValue.from_dict, args
+        )
+        if r is None:
             return o.ImpactValue(amount=0, impact_category=impact_category)
-        return o.ImpactValue.from_dict(r)
+        return r
 
     @override
     def get_impact_factors_of(
         self, impact_category: o.Ref
     ) -> list[o.EnviFlowValue]:
         args = {"@id": self.uid, "impactCategory": impact_category.to_dict()}
-        (r, err) = self.client.rpc_call("result/impact-factors-of", args)
-        if err:
-            log.error("request impact-factors-of failed: %s", err)
-            return []
-        return [o.EnviFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/impact-factors-of", o.EnviFlowValue.from_dict, args
+        )
 
     @override
     def get_impact_factor_of(
@@ -662,22 +766,21 @@ class Result(ProtoResult):
             "impactCategory": impact_category.to_dict(),
             "enviFlow": envi_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/impact-factor-of", args)
-        if err:
-            log.error("request impact-factor-of failed: %s", err)
+        r = self.client._call(
+            "result/impact-factor-of", o.EnviFlowValue.from_dict, args
+        )
+        if r is None:
             return o.EnviFlowValue(amount=0, envi_flow=envi_flow)
-        return o.EnviFlowValue.from_dict(r)
+        return r
 
     @override
     def get_flow_impacts_of(
         self, impact_category: o.Ref
     ) -> list[o.EnviFlowValue]:
         args = {"@id": self.uid, "impactCategory": impact_category.to_dict()}
-        (r, err) = self.client.rpc_call("result/flow-impacts-of", args)
-        if err:
-            log.error("request flow-impacts-of failed: %s", err)
-            return []
-        return [o.EnviFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/flow-impacts-of", o.EnviFlowValue.from_dict, args
+        )
 
     @override
     def get_flow_impact_of(
@@ -688,26 +791,25 @@ class Result(ProtoResult):
             "impactCategory": impact_category.to_dict(),
             "enviFlow": envi_flow.to_dict(),
         }
-        (r, err) = self.client.rpc_call("result/flow-impact-of", args)
-        if err:
-            log.error("request flow-impact-of failed: %s", err)
+        r = self.client._call(
+            "result/flow-impact-of", o.EnviFlowValue.from_dict, args
+        )
+        if r is None:
             return o.EnviFlowValue(amount=0, envi_flow=envi_flow)
-        return o.EnviFlowValue.from_dict(r)
+        return r
 
     @override
     def get_upstream_impacts_of(
-        self, impact_category: o.Ref, path: list[o.TechFlow]
+        self, impact_category: o.Ref, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         args = {
             "@id": self.uid,
             "impactCategory": impact_category.to_dict(),
             "path": _encode_path(path),
         }
-        (r, err) = self.client.rpc_call("result/upstream-impacts-of", args)
-        if err:
-            log.error("request upstream-impacts-of failed: %s", err)
-            return []
-        return [o.UpstreamNode.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/upstream-impacts-of", o.UpstreamNode.from_dict, args
+        )
 
     @override
     def get_grouped_impact_results_of(
@@ -717,13 +819,9 @@ class Result(ProtoResult):
             "@id": self.uid,
             "impactCategory": impact.to_dict(),
         }
-        (r, err) = self.client.rpc_call(
-            "result/grouped-impact-results-of", args
+        return self.client._call_each(
+            "result/grouped-impact-results-of", o.GroupValue.from_dict, args
         )
-        if err:
-            log.error("request grouped-impact-results-of failed: %s", err)
-            return []
-        return [o.GroupValue.from_dict(d) for d in r]
 
     # endregion
 
@@ -732,70 +830,58 @@ class Result(ProtoResult):
     @override
     def get_total_costs(self) -> o.CostValue:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/total-costs", args)
-        if err:
-            log.error("request total-costs failed: %s", err)
-            return o.CostValue(amount=0)
-        return o.CostValue.from_dict(r)
+        r = self.client._call("result/total-costs", o.CostValue.from_dict, args)
+        return r if r is not None else o.CostValue(amount=0)
 
     @override
     def get_cost_contributions(self) -> list[o.TechFlowValue]:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/cost-contributions", args)
-        if err:
-            log.error("request direct-cost-values failed: %s", err)
-            return []
-        return [o.TechFlowValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/cost-contributions", o.TechFlowValue.from_dict, args
+        )
 
     @override
     def get_direct_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/direct-costs-of", args)
-        if err:
-            log.error("request direct-costs-of failed: %s", err)
-            return o.CostValue(amount=0)
-        return o.CostValue.from_dict(r)
+        r = self.client._call(
+            "result/direct-costs-of", o.CostValue.from_dict, args
+        )
+        return r if r is not None else o.CostValue(amount=0)
 
     @override
     def get_cost_intensities_of(self, tech_flow: o.TechFlow) -> o.CostValue:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/cost-intensities-of", args)
-        if err:
-            log.error("request total-costs-of-one failed: %s", err)
-            return o.CostValue(amount=0)
-        return o.CostValue.from_dict(r)
+        r = self.client._call(
+            "result/cost-intensities-of", o.CostValue.from_dict, args
+        )
+        return r if r is not None else o.CostValue(amount=0)
 
     @override
     def get_total_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
         args = {"@id": self.uid, "techFlow": tech_flow.to_dict()}
-        (r, err) = self.client.rpc_call("result/total-costs-of", args)
-        if err:
-            log.error("request total-costs-of failed: %s", err)
-            return o.CostValue(amount=0)
-        return o.CostValue.from_dict(r)
+        r = self.client._call(
+            "result/total-costs-of", o.CostValue.from_dict, args
+        )
+        return r if r is not None else o.CostValue(amount=0)
 
     @override
     def get_upstream_costs_of(
-        self, path: list[o.TechFlow]
+        self, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         args = {
             "@id": self.uid,
             "path": _encode_path(path),
         }
-        (r, err) = self.client.rpc_call("result/upstream-costs-of", args)
-        if err:
-            log.error("request upstream-costs-of failed: %s", err)
-            return []
-        return [o.UpstreamNode.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/upstream-costs-of", o.UpstreamNode.from_dict, args
+        )
 
     @override
     def get_grouped_cost_results(self) -> list[o.GroupValue]:
         args = {"@id": self.uid}
-        (r, err) = self.client.rpc_call("result/grouped-cost-results", args)
-        if err:
-            log.error("request grouped-cost-results failed: %s", err)
-            return []
-        return [o.GroupValue.from_dict(d) for d in r]
+        return self.client._call_each(
+            "result/grouped-cost-results", o.GroupValue.from_dict, args
+        )
 
     # endregion
 
@@ -811,18 +897,20 @@ class Result(ProtoResult):
         return o.SankeyGraph.from_dict(r)
 
 
-def _encode_path(path: list[o.TechFlow]) -> str | None:
+def _encode_path(path: list[o.TechFlow] | str) -> str | None:
     if path is None or len(path) == 0:
         return None
-    p = None
-    for tf in path:
-        next_id = ""
-        if tf.provider and tf.provider.id:
-            next_id += tf.provider.id
-        if tf.flow and tf.flow.id:
-            next_id += "::" + tf.flow.id
-        if p is None:
-            p = next_id
-        else:
-            p += "/" + next_id
-    return p
+    if isinstance(path, str):
+        return path
+    return "/".join(tech_key(tf) for tf in path)
+
+
+def _is_read_only(method: str) -> bool:
+    if method.startswith("data/get"):
+        return True
+    return method.startswith("result/") and method not in (
+        "result/calculate",
+        "result/simulate",
+        "result/simulate/next",
+        "result/dispose",
+    )
@@ -0,0 +1,353 @@
+"""
+Local impact assessment of inventory results with other methods.
+
+Switching the impact assessment method of a calculation only changes the
+characterization step. Instead of recalculating the product system for
+every method, the inventory of a result can be fetched once and then
+characterized locally with the factors of other methods:
+
+```python
+import olca_ipc.lcia as lcia
+
+inventory = lcia.Inventory.of(result)
+methods = lcia.MethodCache(client)
+for method in client.get_descriptors(o.ImpactMethod):
+    r = lcia.evaluate(inventory, methods.get(method, inventory))
+    for v in r.get_total_impacts():
+        print(method.name, v.impact_category.name, v.amount)
+```
+
+The factors of a method are fetched once and converted to the reference
+units of the flows; the characterization matrix of a method is then cached
+for the envi. flow index of an inventory. The server already adjusts the
+signs of the inventory values of input flows; thus, the factors are applied
+without a sign change, like in `Characterization.of_result`. This requires
+NumPy and SciPy to be installed.
+"""
+
+import logging as log
+from concurrent.futures import ThreadPoolExecutor
+from typing import cast
+
+import numpy as np
+import olca_schema as o
+import scipy.sparse as sparse
+
+from .protocol import ProtoClient, ProtoResult, envi_key, tech_key
+
+
+class Inventory:
+    """
+    The inventory of a result: the total flows `g` and, optionally, the
+    direct contributions of the tech. flows `G` (an `m * n` matrix).
+    """
+
+    def __init__(
+        self,
+        envi_flows: list[o.EnviFlow],
+        tech_flows: list[o.TechFlow],
+        total_flows: np.ndarray,
+        contributions: sparse.csr_matrix | None = None,
+    ):
+        self.envi_flows = envi_flows
+        self.tech_flows = tech_flows
+        self.total_flows = total_flows
+        self.contributions = contributions
+        self.envi_index = {envi_key(ef): i for i, ef in enumerate(envi_flows)}
+        self.key = "|".join(envi_key(ef) for ef in envi_flows)
+
+    @staticmethod
+    def of(
+        result: ProtoResult, contributions: bool = True, concurrency: int = 8
+    ) -> "Inventory":
+        """
+        Fetches the inventory of the given result. The flow contributions
+        are fetched concurrently for each envi. flow.
+        """
+        envi_flows = result.get_envi_flows()
+        tech_flows = result.get_tech_flows()
+        envi_index = {envi_key(ef): i for i, ef in enumerate(envi_flows)}
+        tech_index = {tech_key(tf): j for j, tf in enumerate(tech_flows)}
+
+        g = np.zeros(len(envi_flows))
+        for v in result.get_total_flows():
+            i = envi_index.get(envi_key(v.envi_flow))
+            if i is not None:
+                g[i] = v.amount or 0
+
+        if not contributions:
+            return Inventory(envi_flows, tech_flows, g)
+
+        def fetch_row(i: int) -> list[tuple[int, int, float]]:
+            values = result.get_flow_contributions_of(envi_flows[i])
+            return [
+                (i, j, v.amount)
+                for v in values
+                if v.amount
+                and (j := tech_index.get(tech_key(v.tech_flow))) is not None
+            ]
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            rows = list(pool.map(fetch_row, range(len(g))))
+        entries = [e for row in rows for e in row]
+        G = _csr(entries, (len(envi_flows), len(tech_flows)))
+        return Inventory(envi_flows, tech_flows, g, G)
+
+
+class Characterization:
+    """
+    The characterization matrix `C` (a `k * m` matrix) of `k` impact
+    categories for the `m` envi. flows of an inventory.
+    """
+
+    def __init__(self, impacts: list[o.Ref], matrix: sparse.csr_matrix):
+        self.impacts = impacts
+        self.matrix = matrix
+
+    @staticmethod
+    def of_result(
+        result: ProtoResult, inventory: Inventory
+    ) -> "Characterization":
+        """
+        Creates the characterization matrix of the impact method of the
+        given result, with the factors as they are used in that result.
+        """
+        impacts = result.get_impact_categories()
+        entries: list[tuple[int, int, float]] = []
+        for k, impact in enumerate(impacts):
+            for v in result.get_impact_factors_of(impact):
+                i = inventory.envi_index.get(envi_key(v.envi_flow))
+                if i is not None and v.amount:
+                    entries.append((k, i, v.amount))
+        return Characterization(
+            impacts, _csr(entries, (len(impacts), len(inventory.envi_flows)))
+        )
+
+
+class MethodCache:
+    """
+    Fetches the factors of impact methods from a client and caches them,
+    together with the characterization matrices that were built from them.
+    """
+
+    def __init__(self, client: ProtoClient, concurrency: int = 8):
+        self.client = client
+        self.concurrency = concurrency
+        self._methods: dict[str, list[o.ImpactCategory]] = {}
+        self._matrices: dict[tuple[str, str], Characterization] = {}
+        self._unit_factors: dict[str, float] | None = None
+        self._flows: dict[str, o.Flow | None] = {}
+
+    def get(
+        self, method: o.Ref | o.ImpactMethod, inventory: Inventory
+    ) -> Characterization:
+        """
+        Returns the characterization matrix of the given method for the
+        envi. flows of the given inventory.
+        """
+        key = (cast(str, method.id), inventory.key)
+        c = self._matrices.get(key)
+        if c is not None:
+            return c
+        impacts = self._impacts_of(method)
+        flow_ids = {cast(o.Ref, ef.flow).id for ef in inventory.envi_flows}
+        self._fetch_flows(impacts, flow_ids)
+
+        entries: list[tuple[int, int, float]] = []
+        for k, impact in enumerate(impacts):
+            # regionalized factors take precedence over the default
+            # factors without location
+            defaults: dict[str, float] = {}
+            regional: dict[str, float] = {}
+            for f in impact.impact_factors or []:
+                if not f.flow or f.flow.id not in flow_ids or not f.value:
+                    continue
+                conversion = self._conversion_of(f)
+                if conversion is None:
+                    continue
+                value = f.value * conversion
+                if f.location and f.location.id:
+                    regional[f"{f.flow.id}::{f.location.id}"] = value
+                else:
+                    defaults[cast(str, f.flow.id)] = value
+            for i, ef in enumerate(inventory.envi_flows):
+                value = regional.get(envi_key(ef))
+                if value is None:
+                    value = defaults.get(cast(o.Ref, ef.flow).id or "")
+                if value is None:
+                    continue
+                entries.append((k, i, value))
+
+        c = Characterization(
+            [i.to_ref() for i in impacts],
+            _csr(entries, (len(impacts), len(inventory.envi_flows))),
+        )
+        self._matrices[key] = c
+        return c
+
+    def _impacts_of(
+        self, method: o.Ref | o.ImpactMethod
+    ) -> list[o.ImpactCategory]:
+        method_id = cast(str, method.id)
+        impacts = self._methods.get(method_id)
+        if impacts is not None:
+            return impacts
+        m = method
+        if not isinstance(m, o.ImpactMethod):
+            m = self.client.get(o.ImpactMethod, method_id)
+            if m is None:
+                raise ValueError(f"impact method {method_id} not found")
+        refs = m.impact_categories or []
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            fetched = list(
+                pool.map(
+                    lambda ref: self.client.get(o.ImpactCategory, ref.id), refs
+                )
+            )
+        impacts = []
+        for ref, impact in zip(refs, fetched):
+            if impact is None:
+                log.error("impact category %s not found", ref.id)
+                continue
+            impacts.append(impact)
+        self._methods[method_id] = impacts
+        return impacts
+
+    def _fetch_flows(
+        self, impacts: list[o.ImpactCategory], flow_ids: set[str | None]
+    ):
+        """
+        Fetches the flows of the inventory that are needed for converting
+        factors that are given in another flow property.
+        """
+        missing = {
+            f.flow.id
+            for impact in impacts
+            for f in impact.impact_factors or []
+            if f.flow
+            and f.flow.id in flow_ids
+            and f.flow.id not in self._flows
+            and f.flow_property
+        }
+        if len(missing) == 0:
+            return
+        ids = list(missing)
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            flows = pool.map(lambda uid: self.client.get(o.Flow, uid), ids)
+            for uid, flow in zip(ids, flows):
+                self._flows[cast(str, uid)] = flow
+
+    def _conversion_of(self, factor: o.ImpactFactor) -> float | None:
+        """
+        Returns the factor for converting a characterization factor into a
+        factor per reference unit of the flow: `property factor / unit
+        factor`.
+        """
+        unit_factor = 1.0
+        if factor.unit and factor.unit.id:
+            unit_factor = self._unit_factor_of(factor.unit.id)
+        property_factor = 1.0
+        if factor.flow_property and factor.flow_property.id:
+            flow = self._flows.get(cast(o.Ref, factor.flow).id or "")
+            if flow is None:
+                log.warning(
+                    "could not convert factor of flow %s", factor.flow.id
+                )
+                return None
+            pf = next(
+                (
+                    p
+                    for p in flow.flow_properties or []
+                    if p.flow_property
+                    and p.flow_property.id == factor.flow_property.id
+                ),
+                None,
+            )
+            if pf is None or not pf.conversion_factor:
+                log.warning(
+                    "flow %s has no property %s",
+                    flow.id,
+                    factor.flow_property.id,
+                )
+                return None
+            property_factor = pf.conversion_factor
+        return property_factor / unit_factor
+
+    def _unit_factor_of(self, unit_id: str) -> float:
+        if self._unit_factors is None:
+            self._unit_factors = {}
+            for group in self.client.get_all(o.UnitGroup):
+                for unit in group.units or []:
+                    if unit.id and unit.conversion_factor:
+                        self._unit_factors[unit.id] = unit.conversion_factor
+        return self._unit_factors.get(unit_id, 1.0)
+
+
+class LciaResult:
+    """The impact assessment result of an inventory with a method."""
+
+    def __init__(
+        self, inventory: Inventory, characterization: Characterization
+    ):
+        self.inventory = inventory
+        self.characterization = characterization
+        C = characterization.matrix
+        self.total_impacts: np.ndarray = C @ inventory.total_flows
+        self.flow_impacts: sparse.csr_matrix = C @ sparse.diags(
+            inventory.total_flows
+        )
+        self.contributions: np.ndarray | None = None
+        if inventory.contributions is not None:
+            impacts = C @ inventory.contributions
+            self.contributions = cast(sparse.csr_matrix, impacts).toarray()
+        self._impact_index = {
+            cast(str, i.id): k for k, i in enumerate(characterization.impacts)
+        }
+
+    def get_total_impacts(self) -> list[o.ImpactValue]:
+        return [
+            o.ImpactValue(amount=float(a), impact_category=i)
+            for a, i in zip(self.total_impacts, self.characterization.impacts)
+        ]
+
+    def get_impact_contributions_of(
+        self, impact_category: o.Ref
+    ) -> list[o.TechFlowValue]:
+        k = self._impact_index.get(cast(str, impact_category.id))
+        if k is None or self.contributions is None:
+            return []
+        return [
+            o.TechFlowValue(amount=float(a), tech_flow=tf)
+            for a, tf in zip(self.contributions[k], self.inventory.tech_flows)
+        ]
+
+    def get_flow_impacts_of(
+        self, impact_category: o.Ref
+    ) -> list[o.EnviFlowValue]:
+        k = self._impact_index.get(cast(str, impact_category.id))
+        if k is None:
+            return []
+        row = self.flow_impacts.getrow(k).toarray().ravel()
+        return [
+            o.EnviFlowValue(amount=float(a), envi_flow=ef)
+            for a, ef in zip(row, self.inventory.envi_flows)
+        ]
+
+
+def evaluate(
+    inventory: Inventory, characterization: Characterization
+) -> LciaResult:
+    """
+    Calculates the total impacts, the contributions of the tech. flows, and
+    the flow impacts of the inventory with the given characterization.
+    """
+    return LciaResult(inventory, characterization)
+
+
+def _csr(
+    entries: list[tuple[int, int, float]], shape: tuple[int, int]
+) -> sparse.csr_matrix:
+    if len(entries) == 0:
+        return sparse.csr_matrix(shape)
+    rows, cols, values = zip(*entries)
+    return sparse.csr_matrix((values, (rows, cols)), shape=shape)
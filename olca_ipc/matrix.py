@@ -0,0 +1,267 @@
+"""
+Client-side reconstruction of the matrices of a calculation result.
+
+The technology matrix `A`, the intervention matrix `B`, and the
+characterization matrix `C` of a result can be reconstructed from the
+tech. flow, intervention, and impact factor getters of that result. With
+these matrices, the system can be solved locally for other demands without
+calling the server again:
+
+```python
+import olca_ipc.matrix as matrix
+
+model = matrix.LocalModel.cached(result, "path/to/model")
+impacts = model.total_impacts(amount=42)
+```
+
+This requires NumPy and SciPy to be installed.
+"""
+
+import json
+import logging as log
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import olca_schema as o
+import scipy.sparse as sparse
+import scipy.sparse.linalg as linalg
+
+from .protocol import ProtoResult, envi_key, tech_key
+
+
+class LocalModel:
+    """
+    The matrices of a result together with their index maps. The rows and
+    columns of the matrices are in the order of the tech. flows, envi. flows,
+    and impact categories of the result. The sparse LU factorization of the
+    technology matrix is computed once, on the first solve.
+    """
+
+    def __init__(
+        self,
+        tech_flows: list[o.TechFlow],
+        envi_flows: list[o.EnviFlow],
+        impacts: list[o.Ref],
+        tech_matrix: sparse.csc_matrix,
+        envi_matrix: sparse.csc_matrix,
+        impact_matrix: sparse.csr_matrix,
+        demand: o.TechFlowValue,
+    ):
+        self.tech_flows = tech_flows
+        self.envi_flows = envi_flows
+        self.impacts = impacts
+        self.tech_matrix = tech_matrix
+        self.envi_matrix = envi_matrix
+        self.impact_matrix = impact_matrix
+        self.demand = demand
+        self.tech_index = {tech_key(tf): i for i, tf in enumerate(tech_flows)}
+        self.envi_index = {envi_key(ef): i for i, ef in enumerate(envi_flows)}
+        self.impact_index = {cast(str, i.id): j for j, i in enumerate(impacts)}
+        self._lu: linalg.SuperLU | None = None
+
+    @staticmethod
+    def of(result: ProtoResult, concurrency: int = 8) -> "LocalModel":
+        """
+        Reconstructs the matrices from the given result. The columns of the
+        matrices are fetched concurrently with the given number of threads.
+        """
+        tech_flows = result.get_tech_flows()
+        envi_flows = result.get_envi_flows()
+        impacts = result.get_impact_categories()
+        demand = result.get_demand()
+        if demand is None:
+            raise ValueError("the result has no demand")
+        tech_index = {tech_key(tf): i for i, tf in enumerate(tech_flows)}
+        envi_index = {envi_key(ef): i for i, ef in enumerate(envi_flows)}
+        n, m, k = len(tech_flows), len(envi_flows), len(impacts)
+
+        scaling = np.zeros(n)
+        for v in result.get_scaling_factors():
+            j = tech_index.get(tech_key(cast(o.TechFlow, v.tech_flow)))
+            if j is not None:
+                scaling[j] = v.amount or 0
+
+        def fetch_column(j: int) -> tuple[list[Any], list[Any] | None]:
+            tf = tech_flows[j]
+            tech = [
+                (i, j, v.amount)
+                for v in result.get_unscaled_tech_flows_of(tf)
+                if v.amount
+                and (i := tech_index.get(tech_key(v.tech_flow))) is not None
+            ]
+            s = scaling[j]
+            if s != 0:
+                # the direct interventions are scaled: B[:, j] * s[j]
+                envi = [
+                    (i, j, v.amount / s)
+                    for v in result.get_direct_interventions_of(tf)
+                    if v.amount
+                    and (i := envi_index.get(envi_key(v.envi_flow))) is not None
+                ]
+            else:
+                envi = None
+            return tech, envi
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            columns = list(pool.map(fetch_column, range(n)))
+            factors = list(pool.map(result.get_impact_factors_of, impacts))
+
+        tech_entries = [e for tech, _ in columns for e in tech]
+        tech_matrix = sparse.csc_matrix(_sparse(tech_entries, (n, n)))
+
+        envi_entries = [e for _, envi in columns if envi for e in envi]
+        unscaled = [j for j, (_, envi) in enumerate(columns) if envi is None]
+        if len(unscaled) > 0:
+            # for tech. flows with a zero scaling factor, we calculate the
+            # column from the intensities: B[:, j] = M A[:, j]
+            log.info(
+                "derive %i intervention columns from intensities", len(unscaled)
+            )
+            intensities: dict[int, list[o.EnviFlowValue]] = {}
+            for j in unscaled:
+                col = tech_matrix[:, j].tocoo()
+                for t, a in zip(col.row, col.data):
+                    row = intensities.get(t)
+                    if row is None:
+                        row = result.get_flow_intensities_of(tech_flows[t])
+                        intensities[t] = row
+                    for v in row:
+                        i = envi_index.get(envi_key(v.envi_flow))
+                        if i is not None and v.amount:
+                            envi_entries.append((i, j, v.amount * a))
+        envi_matrix = sparse.csc_matrix(_sparse(envi_entries, (m, n)))
+
+        impact_entries = [
+            (i, j, v.amount)
+            for i, values in enumerate(factors)
+            for v in values
+            if v.amount
+            and (j := envi_index.get(envi_key(v.envi_flow))) is not None
+        ]
+        impact_matrix = sparse.csr_matrix(_sparse(impact_entries, (k, m)))
+
+        return LocalModel(
+            tech_flows,
+            envi_flows,
+            impacts,
+            tech_matrix,
+            envi_matrix,
+            impact_matrix,
+            demand,
+        )
+
+    @staticmethod
+    def cached(
+        result: ProtoResult,
+        folder: str | os.PathLike[str],
+        concurrency: int = 8,
+    ) -> "LocalModel":
+        """
+        Loads the model from the given folder or reconstructs it from the
+        result and stores it in that folder when it does not exist yet.
+        """
+        path = Path(folder)
+        if (path / "index.json").exists():
+            return LocalModel.load(path)
+        model = LocalModel.of(result, concurrency)
+        model.save(path)
+        return model
+
+    def save(self, folder: str | os.PathLike[str]):
+        path = Path(folder)
+        path.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(path / "A.npz", self.tech_matrix)
+        sparse.save_npz(path / "B.npz", self.envi_matrix)
+        sparse.save_npz(path / "C.npz", self.impact_matrix)
+        index = {
+            "techFlows": [tf.to_dict() for tf in self.tech_flows],
+            "enviFlows": [ef.to_dict() for ef in self.envi_flows],
+            "impactCategories": [i.to_dict() for i in self.impacts],
+            "demand": self.demand.to_dict(),
+        }
+        with open(path / "index.json", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+    @staticmethod
+    def load(folder: str | os.PathLike[str]) -> "LocalModel":
+        path = Path(folder)
+        with open(path / "index.json", "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return LocalModel(
+            [o.TechFlow.from_dict(d) for d in index["techFlows"]],
+            [o.EnviFlow.from_dict(d) for d in index["enviFlows"]],
+            [o.Ref.from_dict(d) for d in index["impactCategories"]],
+            sparse.load_npz(path / "A.npz").tocsc(),
+            sparse.load_npz(path / "B.npz").tocsc(),
+            sparse.load_npz(path / "C.npz").tocsr(),
+            o.TechFlowValue.from_dict(index["demand"]),
+        )
+
+    @property
+    def lu(self) -> linalg.SuperLU:
+        """The sparse LU factorization of the technology matrix."""
+        if self._lu is None:
+            self._lu = linalg.splu(self.tech_matrix.tocsc())
+        return self._lu
+
+    def demand_vector(
+        self,
+        amount: float | None = None,
+        tech_flow: o.TechFlow | None = None,
+    ) -> np.ndarray:
+        """
+        Returns the final demand vector for the given amount of the given
+        tech. flow. The defaults are the demand of the original result.
+        """
+        tf = tech_flow or cast(o.TechFlow, self.demand.tech_flow)
+        j = self.tech_index.get(tech_key(tf))
+        if j is None:
+            raise ValueError(f"tech. flow {tech_key(tf)} is not in the model")
+        f = np.zeros(len(self.tech_flows))
+        f[j] = self.demand.amount if amount is None else amount
+        return f
+
+    def solve(self, demand: np.ndarray) -> np.ndarray:
+        """
+        Solves `A s = f` for the scaling vector `s` of the given demand `f`.
+        When `f` is a matrix, the system is solved for each column of it.
+        """
+        return self.lu.solve(np.asarray(demand, dtype=np.float64))
+
+    def scaling_vector(self, amount: float | None = None) -> np.ndarray:
+        return self.solve(self.demand_vector(amount))
+
+    def total_requirements(self, amount: float | None = None) -> np.ndarray:
+        return self.tech_matrix.diagonal() * self.scaling_vector(amount)
+
+    def total_flows(self, amount: float | None = None) -> np.ndarray:
+        return self.envi_matrix @ self.scaling_vector(amount)
+
+    def total_impacts(self, amount: float | None = None) -> np.ndarray:
+        return self.impact_matrix @ self.total_flows(amount)
+
+    def direct_interventions(self, amount: float | None = None) -> np.ndarray:
+        """
+        Returns the direct interventions of the tech. flows, the scaled
+        intervention matrix `B diag(s)`.
+        """
+        s = self.scaling_vector(amount)
+        scaled = self.envi_matrix @ sparse.diags(s)
+        return cast(sparse.csc_matrix, scaled).toarray()
+
+    def direct_impacts(self, amount: float | None = None) -> np.ndarray:
+        s = self.scaling_vector(amount)
+        scaled = self.envi_matrix @ sparse.diags(s)
+        return cast(sparse.csr_matrix, self.impact_matrix @ scaled).toarray()
+
+
+def _sparse(
+    entries: list[tuple[int, int, float]], shape: tuple[int, int]
+) -> sparse.coo_matrix:
+    if len(entries) == 0:
+        return sparse.coo_matrix(shape)
+    rows, cols, values = zip(*entries)
+    return sparse.coo_matrix((values, (rows, cols)), shape=shape)
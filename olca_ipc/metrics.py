@@ -0,0 +1,281 @@
+"""
+Instrumentation of the client calls.
+
+A `Metrics` instance can be attached to a client to record, per JSON-RPC
+method or REST route, the number of calls and errors, a histogram of the
+transport latencies, the request and response sizes, and the time that was
+spent in transport, JSON decoding, and the construction of the schema
+objects. Calls that were served by a concurrent, identical request (see
+`olca_ipc.flight`) are counted as coalesced and not as calls. Entities that
+are served from the entity cache of a client send no request; only their
+construction time is recorded:
+
+```python
+import olca_ipc as ipc
+from olca_ipc.metrics import Metrics
+
+metrics = Metrics()
+client = ipc.Client(8080, metrics=metrics)
+...
+for method, stats in metrics.snapshot().items():
+    print(method, stats.calls, stats.mean_latency, stats.construct_seconds)
+print(metrics.to_prometheus())
+```
+
+The transport time is measured from sending the request until the complete
+response body was received; thus, it contains the network and server time.
+REST routes are recorded with their IDs and names replaced by placeholders,
+e.g. `GET data/processes/{id}`.
+"""
+
+import re
+import threading
+from collections.abc import Sized
+from dataclasses import dataclass, field
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+_ID = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+    r"[0-9a-fA-F]{12}"
+)
+
+
+@dataclass
+class MethodStats:
+    """
+    The recorded values of a method. `buckets` contains the number of calls
+    with a transport latency less or equal than the respective upper bound
+    in `bounds`; the last bucket counts the calls above the largest bound.
+    """
+
+    bounds: tuple[float, ...] = DEFAULT_BUCKETS
+    calls: int = 0
+    errors: int = 0
+    coalesced: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    transport_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    construct_seconds: float = 0.0
+    buckets: list[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        if len(self.buckets) == 0:
+            self.buckets = [0] * (len(self.bounds) + 1)
+
+    @property
+    def total_seconds(self) -> float:
+        return (
+            self.transport_seconds
+            + self.decode_seconds
+            + self.construct_seconds
+        )
+
+    @property
+    def mean_latency(self) -> float:
+        if self.calls == 0:
+            return 0.0
+        return self.transport_seconds / self.calls
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns an estimate of the given quantile of the transport latency:
+        the upper bound of the bucket that contains it.
+        """
+        if self.calls == 0:
+            return 0.0
+        rank = q * self.calls
+        count = 0
+        for bound, n in zip(self.bounds, self.buckets):
+            count += n
+            if count >= rank:
+                return bound
+        return float("inf")
+
+    def copy(self) -> "MethodStats":
+        return MethodStats(
+            bounds=self.bounds,
+            calls=self.calls,
+            errors=self.errors,
+            coalesced=self.coalesced,
+            request_bytes=self.request_bytes,
+            response_bytes=self.response_bytes,
+            transport_seconds=self.transport_seconds,
+            decode_seconds=self.decode_seconds,
+            construct_seconds=self.construct_seconds,
+            buckets=list(self.buckets),
+        )
+
+
+class Metrics:
+    """
+    Collects the statistics of client calls. It is thread-safe, so that it
+    can be shared by clients that are used from multiple threads.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._stats: dict[str, MethodStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> MethodStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = MethodStats(bounds=self.buckets)
+            self._stats[key] = stats
+        return stats
+
+    def record_call(
+        self,
+        key: str,
+        transport: float,
+        request_bytes: int = 0,
+        response_bytes: int = 0,
+        error: bool = False,
+    ):
+        with self._lock:
+            stats = self._get(key)
+            stats.calls += 1
+            if error:
+                stats.errors += 1
+            stats.transport_seconds += transport
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            i = 0
+            for bound in self.buckets:
+                if transport <= bound:
+                    break
+                i += 1
+            stats.buckets[i] += 1
+
+    def record_coalesced(self, key: str):
+        with self._lock:
+            self._get(key).coalesced += 1
+
+    def record_decode(self, key: str, seconds: float):
+        with self._lock:
+            self._get(key).decode_seconds += seconds
+
+    def record_construct(self, key: str, seconds: float):
+        with self._lock:
+            self._get(key).construct_seconds += seconds
+
+    def snapshot(self) -> dict[str, MethodStats]:
+        """Returns a consistent copy of the current statistics."""
+        with self._lock:
+            return {key: stats.copy() for key, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def to_prometheus(self, prefix: str = "olca_ipc") -> str:
+        """
+        Returns the statistics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        methods = sorted(snapshot.keys())
+        lines: list[str] = []
+
+        def counter(name: str, help: str, value_of):
+            lines.append(f"# HELP {prefix}_{name} {help}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for m in methods:
+                value = value_of(snapshot[m])
+                lines.append(f'{prefix}_{name}{{method="{_label(m)}"}} {value}')
+
+        counter("calls_total", "Number of calls.", lambda s: s.calls)
+        counter("errors_total", "Number of failed calls.", lambda s: s.errors)
+        counter(
+            "coalesced_total",
+            "Number of calls that shared a concurrent request.",
+            lambda s: s.coalesced,
+        )
+        counter(
+            "request_bytes_total",
+            "Size of the request bodies.",
+            lambda s: s.request_bytes,
+        )
+        counter(
+            "response_bytes_total",
+            "Size of the response bodies.",
+            lambda s: s.response_bytes,
+        )
+
+        name = f"{prefix}_time_seconds_total"
+        lines.append(f"# HELP {name} Time spent per phase of the calls.")
+        lines.append(f"# TYPE {name} counter")
+        for m in methods:
+            s = snapshot[m]
+            for phase, value in (
+                ("transport", s.transport_seconds),
+                ("decode", s.decode_seconds),
+                ("construct", s.construct_seconds),
+            ):
+                lines.append(
+                    f'{name}{{method="{_label(m)}",phase="{phase}"}} {value}'
+                )
+
+        name = f"{prefix}_latency_seconds"
+        lines.append(f"# HELP {name} Transport latency of the calls.")
+        lines.append(f"# TYPE {name} histogram")
+        for m in methods:
+            s = snapshot[m]
+            label = _label(m)
+            count = 0
+            for bound, n in zip(s.bounds, s.buckets):
+                count += n
+                lines.append(
+                    f'{name}_bucket{{method="{label}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'{name}_bucket{{method="{label}",le="+Inf"}} {s.calls}'
+            )
+            lines.append(
+                f'{name}_sum{{method="{label}"}} {s.transport_seconds}'
+            )
+            lines.append(f'{name}_count{{method="{label}"}} {s.calls}')
+
+        return "\n".join(lines) + "\n"
+
+
+def route_of(verb: str, path: str) -> str:
+    """
+    Returns the route of a REST request, with the IDs and names in the path
+    replaced by placeholders.
+    """
+    path = path.split("?", 1)[0]
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        if i > 0 and segments[i - 1] == "name":
+            segments[i] = "{name}"
+        elif _ID.search(segment):
+            segments[i] = "{id}"
+    return f"{verb} {'/'.join(segments)}"
+
+
+def size_of(body: object) -> int:
+    """
+    Returns the size of a request body; streamed bodies without a length,
+    like file uploads, have the size 0.
+    """
+    return len(body) if isinstance(body, Sized) else 0
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
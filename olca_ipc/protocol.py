@@ -1,18 +1,32 @@
 import abc
 import base64
+import json
+import logging as log
 import os
 import time
 
 from abc import abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
-from typing import TypeVar, Type, Any
+from typing import Callable, Iterable, Iterator, TypeVar, Type, Any, get_args
 
 import olca_schema as o
 
+from .cache import EntityCache
+
 E = TypeVar("E", bound=o.RootEntity)
 
+_ROOT_TYPES: dict[str, type] = {t.__name__: t for t in get_args(o.RootEntity)}
+
+ChangeListener = Callable[[o.Ref], None]
+"""
+A function that is called with the reference of an entity that was changed
+(inserted, updated, or deleted) through a client.
+"""
+
 
 @dataclass
 class FileData:
@@ -32,7 +46,124 @@ class FileData:
         return {"name": self.name, "content": self.content}
 
 
+# a placeholder for the content of a file stream in a JSON request
+_CONTENT_MARKER = "@olca-ipc:file-stream-content"
+
+
+class FileStream:
+    """
+    A file that is Base64 encoded in chunks while it is sent. It can be
+    used instead of `FileData` in `put_source_file`; then, only a chunk of
+    the file is held in memory at a time instead of the file, its encoding,
+    and the JSON request with it. The chunk size is rounded to a multiple
+    of 3 bytes, so that the encoded chunks can be concatenated.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        name: str | None = None,
+        chunk_size: int = 192 * 1024,
+    ):
+        self.path = Path(path)
+        self.name = name or self.path.name
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+
+    @property
+    def size(self) -> int:
+        return self.path.stat().st_size
+
+    @property
+    def encoded_size(self) -> int:
+        return 4 * ((self.size + 2) // 3)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"name": self.name, "content": _CONTENT_MARKER}
+
+    def chunks(self) -> Iterator[bytes]:
+        """Yields the Base64 encoded content of the file in chunks."""
+        with open(self.path, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                yield base64.b64encode(chunk)
+
+    def body_of(self, data: Any) -> "StreamBody":
+        """
+        Returns a request body with the JSON of the given data, in which the
+        dictionary of this stream (`to_dict`) is replaced with the encoded
+        content of the file.
+        """
+        text = json.dumps(data, separators=(",", ":"))
+        head, tail = text.split(json.dumps(_CONTENT_MARKER), 1)
+        return StreamBody(head.encode() + b'"', self, b'"' + tail.encode())
+
+
+class StreamBody:
+    """
+    A request body that streams the encoded content of a file between a
+    head and tail. It has a length, so that it is sent with a fixed
+    `Content-Length` and not with chunked transfer encoding, and it can be
+    iterated multiple times, e.g. when a request is retried.
+    """
+
+    def __init__(self, head: bytes, stream: FileStream, tail: bytes):
+        self.head = head
+        self.stream = stream
+        self.tail = tail
+
+    def __len__(self) -> int:
+        return len(self.head) + self.stream.encoded_size + len(self.tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.head
+        yield from self.stream.chunks()
+        yield self.tail
+
+
 class ProtoClient(abc.ABC):
+    _entity_cache: EntityCache | None = None
+    _change_listeners: tuple[ChangeListener, ...] = ()
+
+    @property
+    def cache(self) -> EntityCache | None:
+        return self._entity_cache
+
+    def enable_cache(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: str | os.PathLike[str] | None = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        revalidate: bool = True,
+    ) -> EntityCache:
+        """
+        Enables a cache for the entities that are requested by ID with
+        `get`. See `olca_ipc.cache.EntityCache` for the parameters. Entities
+        that are changed through this client are removed from the cache.
+        """
+        self.disable_cache()
+        cache = EntityCache(max_bytes, directory, max_disk_bytes, revalidate)
+        self._entity_cache = cache
+        self.add_change_listener(cache.on_change)
+        return cache
+
+    def disable_cache(self):
+        cache = self._entity_cache
+        if cache is None:
+            return
+        self.remove_change_listener(cache.on_change)
+        self._entity_cache = None
+
+    def add_change_listener(self, listener: ChangeListener):
+        self._change_listeners = self._change_listeners + (listener,)
+
+    def remove_change_listener(self, listener: ChangeListener):
+        self._change_listeners = tuple(
+            x for x in self._change_listeners if x != listener
+        )
+
+    def _notify_change(self, ref: o.Ref):
+        for listener in self._change_listeners:
+            listener(ref)
+
     @abstractmethod
     def get(
         self,
@@ -59,12 +190,81 @@ class ProtoClient(abc.ABC):
     ) -> o.Ref | None:
         pass
 
+    def get_many(
+        self, model_type: Type[E], ids: Iterable[str], concurrency: int = 8
+    ) -> Iterator[tuple[str, E | None]]:
+        """
+        Fetches the entities with the given IDs concurrently, with at most
+        `concurrency` requests at a time. The results are yielded as pairs
+        `(id, entity)` in the order of the given IDs, as soon as they are
+        available; for IDs that were not found, the entity is `None`. The
+        IDs are consumed lazily, so that only a bounded number of results
+        is held in memory.
+        """
+        workers = max(1, concurrency)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        pending: deque[tuple[str, Future[E | None]]] = deque()
+        try:
+            for uid in ids:
+                pending.append((uid, pool.submit(self.get, model_type, uid)))
+                if len(pending) >= 2 * workers:
+                    head, future = pending.popleft()
+                    yield head, future.result()
+            while pending:
+                head, future = pending.popleft()
+                yield head, future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
     def find(self, model_type: Type[E], name: str) -> o.Ref | None:
         for d in self.get_descriptors(model_type):
             if d.name == name:
                 return d
         return None
 
+    def resolve_refs(
+        self,
+        entities: Iterable[o.RootEntity],
+        depth: int = 1,
+        concurrency: int = 8,
+    ) -> dict[str, o.RootEntity]:
+        """
+        Returns the entities that are referenced by the given entities, by
+        ID. Each referenced entity is fetched only once; the fetches run
+        concurrently, grouped by type. With a depth > 1, the references of
+        the fetched entities are resolved too. References to the given
+        entities are resolved with these, and references that could not be
+        resolved are not contained in the returned map.
+        """
+        known: dict[str, o.RootEntity] = {e.id: e for e in entities if e.id}
+        resolved: dict[str, o.RootEntity] = {}
+        visited = set(known.keys())
+        wave = list(known.values())
+        for _ in range(depth):
+            refs: dict[str, type] = {}
+            for entity in wave:
+                _collect_refs(entity, refs)
+            todo: list[tuple[type, str]] = []
+            for uid, model_type in refs.items():
+                if uid in known:
+                    resolved[uid] = known[uid]
+                elif uid not in visited:
+                    visited.add(uid)
+                    todo.append((model_type, uid))
+            if len(todo) == 0:
+                break
+            todo.sort(key=lambda t: (t[0].__name__, t[1]))
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+                fetched = list(pool.map(lambda t: self.get(*t), todo))
+            wave = []
+            for (_, uid), entity in zip(todo, fetched):
+                if entity is None:
+                    log.warning("could not resolve reference %s", uid)
+                    continue
+                resolved[uid] = entity
+                wave.append(entity)
+        return resolved
+
     @abstractmethod
     def get_providers(
         self, flow: o.Ref | o.Flow | None = None
@@ -83,10 +283,28 @@ class ProtoClient(abc.ABC):
 
     @abstractmethod
     def put_source_file(
-        self, source: o.Source | o.Ref, file_data: FileData
+        self, source: o.Source | o.Ref, file_data: FileData | FileStream
     ) -> bool:
         pass
 
+    def put_source_files(
+        self,
+        files: Iterable[tuple[o.Source | o.Ref, str | os.PathLike[str]]],
+        concurrency: int = 4,
+    ) -> list[bool]:
+        """
+        Uploads the given files to their sources, streamed and with at most
+        `concurrency` uploads at a time. Returns for each file whether the
+        upload was successful.
+        """
+
+        def upload(item: tuple[o.Source | o.Ref, str | os.PathLike[str]]):
+            source, path = item
+            return self.put_source_file(source, FileStream(path))
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            return list(pool.map(upload, files))
+
     def put_all(self, *models: o.RootEntity):
         for model in models:
             self.put(model)
@@ -116,6 +334,23 @@ class ProtoClient(abc.ABC):
         pass
 
 
+def _collect_refs(value: Any, refs: dict[str, type]):
+    """Collects the IDs and types of the root entity references."""
+    if isinstance(value, o.Ref):
+        if value.id and value.ref_type is not None:
+            model_type = _ROOT_TYPES.get(value.ref_type.value)
+            if model_type is not None:
+                refs.setdefault(value.id, model_type)
+        return
+    if isinstance(value, list):
+        for item in value:
+            _collect_refs(item, refs)
+        return
+    if hasattr(value, "__dataclass_fields__"):
+        for item in vars(value).values():
+            _collect_refs(item, refs)
+
+
 class ProtoResult(abc.ABC):
     @abstractmethod
     def get_state(self) -> o.ResultState:
@@ -240,8 +475,13 @@ class ProtoResult(abc.ABC):
 
     @abstractmethod
     def get_upstream_interventions_of(
-        self, envi_flow: o.EnviFlow, path: list[o.TechFlow]
+        self, envi_flow: o.EnviFlow, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
+        """
+        Returns the upstream nodes of the given path. The path can be given
+        as a list of tech. flows or in its encoded form, a `/` separated list
+        of `{provider ID}::{flow ID}` segments.
+        """
         pass
 
     @abstractmethod
@@ -340,7 +580,7 @@ class ProtoResult(abc.ABC):
 
     @abstractmethod
     def get_upstream_impacts_of(
-        self, impact_category: o.Ref, path: list[o.TechFlow]
+        self, impact_category: o.Ref, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         pass
 
@@ -376,7 +616,7 @@ class ProtoResult(abc.ABC):
 
     @abstractmethod
     def get_upstream_costs_of(
-        self, path: list[o.TechFlow]
+        self, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         pass
 
@@ -389,3 +629,33 @@ class ProtoResult(abc.ABC):
     @abstractmethod
     def get_sankey_graph(self, config: o.SankeyRequest) -> o.SankeyGraph:
         pass
+
+
+def tech_key(tech_flow: o.TechFlow | None) -> str:
+    """
+    Returns the key of a tech. flow, `<provider ID>::<flow ID>`, which is
+    also used to identify tech. flows in the REST API.
+    """
+    key = ""
+    if tech_flow is None:
+        return key
+    if tech_flow.provider and tech_flow.provider.id:
+        key = tech_flow.provider.id
+    if tech_flow.flow and tech_flow.flow.id:
+        key += "::" + tech_flow.flow.id
+    return key
+
+
+def envi_key(envi_flow: o.EnviFlow | None) -> str:
+    """
+    Returns the key of an envi. flow, `<flow ID>` or, for regionalized
+    flows, `<flow ID>::<location ID>`.
+    """
+    key = ""
+    if envi_flow is None:
+        return key
+    if envi_flow.flow and envi_flow.flow.id:
+        key = envi_flow.flow.id
+    if envi_flow.location and envi_flow.location.id:
+        key += "::" + envi_flow.location.id
+    return key
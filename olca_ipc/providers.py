@@ -0,0 +1,120 @@
+"""
+An in-memory index of the providers of a database.
+
+Instead of calling `get_providers(flow)` for each flow, the index is built
+from a single `get_providers()` call and answers the lookups in memory:
+
+```python
+from olca_ipc.providers import ProviderIndex
+
+index = ProviderIndex(client)
+for tech_flow in index.providers_of(flow):
+    print(tech_flow.provider.name)
+
+# candidate providers for all linkable exchanges of the processes
+candidates = index.candidates_of(processes)
+```
+
+The index listens for changes through its client: when a process, product
+system, or result is inserted, updated, or deleted, the index is rebuilt
+with a single request before the next lookup. Changes through other clients
+are not detected; call `refresh` in that case.
+"""
+
+import threading
+from typing import Iterable
+
+import olca_schema as o
+
+from .protocol import ProtoClient
+
+# the types of entities that can be providers
+_PROVIDER_TYPES = (o.RefType.Process, o.RefType.ProductSystem, o.RefType.Result)
+
+
+class ProviderIndex:
+    def __init__(self, client: ProtoClient, listen: bool = True):
+        self.client = client
+        self._by_flow: dict[str, list[o.TechFlow]] = {}
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._listening = listen
+        if listen:
+            client.add_change_listener(self._on_change)
+        self.refresh()
+
+    def __len__(self) -> int:
+        """Returns the number of tech. flows in the index."""
+        self._check()
+        return sum(len(tfs) for tfs in self._by_flow.values())
+
+    def __contains__(self, flow: o.Ref | o.Flow | str) -> bool:
+        return len(self.providers_of(flow)) > 0
+
+    def refresh(self):
+        """Rebuilds the index with a single request of all providers."""
+        by_flow: dict[str, list[o.TechFlow]] = {}
+        for tech_flow in self.client.get_providers():
+            if tech_flow.flow is None or tech_flow.flow.id is None:
+                continue
+            by_flow.setdefault(tech_flow.flow.id, []).append(tech_flow)
+        with self._lock:
+            self._by_flow = by_flow
+            self._dirty = False
+
+    def invalidate(self):
+        """Marks the index as outdated; it is rebuilt on the next lookup."""
+        self._dirty = True
+
+    def close(self):
+        """Stops listening for changes through the client."""
+        if self._listening:
+            self.client.remove_change_listener(self._on_change)
+            self._listening = False
+
+    def providers_of(self, flow: o.Ref | o.Flow | str) -> list[o.TechFlow]:
+        """Returns the tech. flows that provide the given flow."""
+        self._check()
+        uid = flow if isinstance(flow, str) else flow.id
+        return list(self._by_flow.get(uid or "", []))
+
+    def candidates_of(
+        self, processes: Iterable[o.Process]
+    ) -> dict[tuple[str, int], list[o.TechFlow]]:
+        """
+        Returns the candidate providers for the product inputs and waste
+        outputs of the given processes, mapped by the process ID and the
+        internal ID of the respective exchange. Exchanges without candidate
+        providers are not contained in the map.
+        """
+        self._check()
+        candidates: dict[tuple[str, int], list[o.TechFlow]] = {}
+        for process in processes:
+            if process.id is None:
+                continue
+            for e in process.exchanges or []:
+                if e.internal_id is None or not _is_linkable(e):
+                    continue
+                flow_id = e.flow.id if e.flow is not None else None
+                providers = self._by_flow.get(flow_id or "")
+                if providers:
+                    candidates[(process.id, e.internal_id)] = list(providers)
+        return candidates
+
+    def _check(self):
+        if self._dirty:
+            self.refresh()
+
+    def _on_change(self, ref: o.Ref):
+        if ref.ref_type is None or ref.ref_type in _PROVIDER_TYPES:
+            self._dirty = True
+
+
+def _is_linkable(e: o.Exchange) -> bool:
+    """Returns true for product inputs and waste outputs."""
+    flow_type = e.flow.flow_type if e.flow is not None else None
+    if flow_type == o.FlowType.ELEMENTARY_FLOW:
+        return False
+    if flow_type == o.FlowType.WASTE_FLOW:
+        return not e.is_input
+    return bool(e.is_input)
@@ -0,0 +1,272 @@
+"""
+Declarative query plans for results.
+
+Report code often calls result getters whose inputs depend on the outputs
+of earlier calls, e.g. the contributions of the top impacts and then the
+direct impacts of the top contributing tech flows. A `QueryPlan` describes
+such calls as a dependency graph; `execute` runs the plan in waves, where
+all calls of a wave are independent of each other and are sent
+concurrently:
+
+```python
+from olca_ipc.query import QueryPlan
+
+plan = QueryPlan()
+impacts = plan.call("impacts", "get_total_impacts")
+top = plan.compute(
+    "top", lambda vs: sorted(vs, key=lambda v: -abs(v.amount))[:3], impacts
+)
+contributions = plan.each(
+    "contributions",
+    "get_impact_contributions_of",
+    top,
+    item=lambda v: v.impact_category,
+)
+out = plan.execute(result)
+for value, contribution in zip(out["top"], out["contributions"]):
+    ...
+```
+
+A call is given by the name of a `ProtoResult` getter or by a function that
+takes the result as first argument. Its arguments can be constants or
+queries of the plan, which are replaced by their outputs. `each` calls the
+getter for every item of the output of another query, and `compute` applies
+a local function on outputs without a round trip. A query can only depend on
+queries that were added before it; thus, a plan cannot contain cycles.
+
+When a query fails, the error is logged, and the query and all queries
+that depend on it are skipped: their outputs are `None`, and the names of
+the skipped queries are contained in the `failed` set of the outputs.
+"""
+
+import logging as log
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, cast
+
+from .protocol import ProtoResult
+
+Method = str | Callable[..., Any]
+
+
+class Query:
+    """
+    A node of a query plan; its output is available under its name after
+    the plan was executed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        fn: Method,
+        args: tuple[Any, ...],
+        over: "Query | None" = None,
+        item: Callable[[Any], Any] | None = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.over = over
+        self.item = item
+
+    def __repr__(self) -> str:
+        return f"Query({self.name!r})"
+
+    @property
+    def deps(self) -> list["Query"]:
+        deps = [a for a in self.args if isinstance(a, Query)]
+        if self.over is not None:
+            deps.append(self.over)
+        return deps
+
+    @property
+    def is_remote(self) -> bool:
+        return self.kind != "compute"
+
+
+class QueryOutputs(dict[str, Any]):
+    """
+    The outputs of an executed plan by the names of the queries; `failed`
+    contains the names of the queries that failed or that were skipped
+    because a query they depend on failed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.failed: set[str] = set()
+
+
+class QueryPlan:
+    def __init__(self):
+        self._queries: dict[str, Query] = {}
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def __getitem__(self, name: str) -> Query:
+        return self._queries[name]
+
+    def call(self, name: str, method: Method, *args: Any) -> Query:
+        """Adds a call of a result getter with the given arguments."""
+        return self._add(Query(name, "call", method, args))
+
+    def each(
+        self,
+        name: str,
+        method: Method,
+        over: Query,
+        *args: Any,
+        item: Callable[[Any], Any] | None = None,
+    ) -> Query:
+        """
+        Adds a call of a result getter for each item of the output of the
+        query `over`; the item, or the value that the `item` function
+        returns for it, is passed as first argument to the getter. The
+        output is the list of the outputs of these calls.
+        """
+        return self._add(Query(name, "each", method, args, over, item))
+
+    def compute(self, name: str, fn: Callable[..., Any], *args: Any) -> Query:
+        """
+        Adds a local computation on the outputs of other queries, like the
+        selection of the top contributions, which does not need a request.
+        """
+        return self._add(Query(name, "compute", fn, args))
+
+    def waves(self) -> list[list[str]]:
+        """
+        Returns the names of the queries that send requests, grouped by the
+        waves in which they are executed.
+        """
+        levels: dict[str, int] = {}
+        waves: list[list[str]] = []
+        for query in self._queries.values():
+            level = max((levels[d.name] for d in query.deps), default=-1)
+            if query.is_remote:
+                level += 1
+                while len(waves) <= level:
+                    waves.append([])
+                waves[level].append(query.name)
+            levels[query.name] = level
+        return waves
+
+    def execute(
+        self, result: ProtoResult, concurrency: int = 8
+    ) -> QueryOutputs:
+        """
+        Executes the plan on the given result with at most `concurrency`
+        parallel requests and returns the outputs of all queries by name.
+        """
+        outputs = QueryOutputs()
+        todo = list(self._queries.values())
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            while todo:
+                ready = [
+                    q for q in todo if all(d.name in outputs for d in q.deps)
+                ]
+                skipped = [
+                    q
+                    for q in ready
+                    if any(d.name in outputs.failed for d in q.deps)
+                ]
+                if skipped:
+                    for query in skipped:
+                        log.warning("skipped query %s", query.name)
+                        outputs[query.name] = None
+                        outputs.failed.add(query.name)
+                    todo = [q for q in todo if q not in skipped]
+                    continue
+
+                local = [q for q in ready if not q.is_remote]
+                if local:
+                    for query in local:
+                        args = _args_of(query.args, outputs)
+                        fn = cast(Callable[..., Any], query.fn)
+                        value, ok = _compute(query.name, fn, args)
+                        outputs[query.name] = value
+                        if not ok:
+                            outputs.failed.add(query.name)
+                    todo = [q for q in todo if q not in local]
+                    continue
+
+                # all remote calls of a wave are sent at once
+                calls: list[tuple[Query, tuple[Any, ...]]] = []
+                for query in ready:
+                    args = _args_of(query.args, outputs)
+                    if query.kind == "call":
+                        calls.append((query, args))
+                        continue
+                    items, ok = _compute(
+                        query.name, _items_of, (query, outputs)
+                    )
+                    if not ok:
+                        outputs.failed.add(query.name)
+                        continue
+                    for x in items:
+                        calls.append((query, (x, *args)))
+                futures = [
+                    pool.submit(_invoke, result, query.fn, args)
+                    for query, args in calls
+                ]
+
+                each: dict[str, list[Any]] = {
+                    q.name: [] for q in ready if q.kind == "each"
+                }
+                for (query, _), future in zip(calls, futures):
+                    value, ok = future.result()
+                    if not ok:
+                        outputs.failed.add(query.name)
+                    if query.kind == "each":
+                        each[query.name].append(value)
+                    else:
+                        outputs[query.name] = value
+                outputs.update(each)
+                for query in ready:
+                    if query.name in outputs.failed:
+                        outputs[query.name] = None
+                todo = [q for q in todo if q not in ready]
+        return outputs
+
+    def _add(self, query: Query) -> Query:
+        if query.name in self._queries:
+            raise ValueError(f"a query with name {query.name} already exists")
+        for dep in query.deps:
+            if self._queries.get(dep.name) is not dep:
+                raise ValueError(f"{dep} is not a query of this plan")
+        self._queries[query.name] = query
+        return query
+
+
+def _args_of(args: tuple[Any, ...], outputs: dict[str, Any]) -> tuple[Any, ...]:
+    return tuple(outputs[a.name] if isinstance(a, Query) else a for a in args)
+
+
+def _items_of(query: Query, outputs: dict[str, Any]) -> list[Any]:
+    """Returns the arguments of the calls of an `each` query."""
+    items = outputs[cast(Query, query.over).name] or []
+    if query.item is None:
+        return list(items)
+    return [query.item(x) for x in items]
+
+
+def _invoke(
+    result: ProtoResult, fn: Method, args: tuple[Any, ...]
+) -> tuple[Any, bool]:
+    name = fn if isinstance(fn, str) else getattr(fn, "__name__", repr(fn))
+    # unbound getters like `ProtoResult.get_total_impacts` are abstract;
+    # thus, they are called by name on the result
+    if isinstance(fn, str) or getattr(ProtoResult, name, None) is fn:
+        return _compute(name, getattr(result, name), args)
+    return _compute(name, fn, (result, *args))
+
+
+def _compute(
+    name: str, fn: Callable[..., Any], args: tuple[Any, ...]
+) -> tuple[Any, bool]:
+    """Calls the function and returns its value and whether it succeeded."""
+    try:
+        return fn(*args), True
+    except Exception as e:
+        log.error("query %s failed: %s", name, e)
+        return None, False
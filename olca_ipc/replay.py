@@ -0,0 +1,352 @@
+"""
+Recording and replay of the HTTP traffic of a client.
+
+The request/response pairs of a client, together with their timings, can be
+recorded to a compact, gzip compressed file. The recorded responses can then
+be served by a replay transport, optionally with the original or a scaled
+latency. This works with both protocols, `ipc.Client` and `RestClient`:
+
+```python
+import olca_ipc.replay as replay
+
+with replay.record(client, "workload.rec.gz"):
+    run_workload(client)
+
+# later, without a server
+client = ipc.Client(8080)
+replay.replay(client, "workload.rec.gz", latency_scale=1.0)
+run_workload(client)
+```
+
+Requests are matched by their method, path, and body. For JSON-RPC calls,
+the request ID is not part of the match, and the ID of a replayed response
+is set to the ID of the request. When the same request was recorded
+multiple times, the responses are replayed in the recorded order and the
+last response is repeated when the recorded responses are exhausted.
+Streamed file uploads are recorded and matched with the length and a hash
+of their content instead of the content itself.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .ipc import Client
+from .protocol import StreamBody
+from .rest import RestClient
+
+_FORMAT = "olca-ipc-recording"
+_VERSION = 1
+
+
+@dataclass
+class Exchange:
+    """A recorded request/response pair."""
+
+    method: str
+    path: str
+    request: bytes
+    status: int
+    response: bytes
+    content_type: str
+    elapsed: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "request": _encode(self.request),
+            "status": self.status,
+            "response": _encode(self.response),
+            "contentType": self.content_type,
+            "elapsed": self.elapsed,
+        }
+
+    @staticmethod
+    def from_dict(d: dict[str, Any]) -> "Exchange":
+        return Exchange(
+            method=d["method"],
+            path=d["path"],
+            request=_decode(d.get("request")),
+            status=d["status"],
+            response=_decode(d.get("response")),
+            content_type=d.get("contentType") or "application/json",
+            elapsed=d.get("elapsed") or 0.0,
+        )
+
+    @property
+    def key(self) -> str:
+        return _key_of(self.method, self.path, self.request)
+
+
+class Recording:
+    """Recorded exchanges that can be saved to and loaded from a file."""
+
+    def __init__(self, exchanges: list[Exchange] | None = None):
+        self.exchanges = exchanges or []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.exchanges)
+
+    def add(self, exchange: Exchange):
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    @property
+    def total_elapsed(self) -> float:
+        return sum(e.elapsed for e in self.exchanges)
+
+    def save(self, path: str | os.PathLike[str]):
+        with self._lock:
+            exchanges = list(self.exchanges)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            header = {"format": _FORMAT, "version": _VERSION}
+            f.write(json.dumps(header) + "\n")
+            for e in exchanges:
+                f.write(json.dumps(e.to_dict()) + "\n")
+
+    @staticmethod
+    def load(path: str | os.PathLike[str]) -> "Recording":
+        exchanges: list[Exchange] = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != _FORMAT:
+                raise ValueError(f"{path} is not a recording file")
+            for line in f:
+                if line.strip():
+                    exchanges.append(Exchange.from_dict(json.loads(line)))
+        return Recording(exchanges)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """A transport adapter that records the exchanges it sends."""
+
+    def __init__(self, recording: Recording, **kwargs):
+        super().__init__(**kwargs)
+        self.recording = recording
+
+    def send(self, request, *args, **kwargs):  # type: ignore
+        start = time.perf_counter()
+        resp = super().send(request, *args, **kwargs)
+        content = resp.content  # reads the complete body
+        elapsed = time.perf_counter() - start
+        self.recording.add(
+            Exchange(
+                method=request.method or "GET",
+                path=_path_of(request.url),
+                request=_bytes_of(request.body),
+                status=resp.status_code,
+                response=content or b"",
+                content_type=resp.headers.get(
+                    "Content-Type", "application/json"
+                ),
+                elapsed=elapsed,
+            )
+        )
+        return resp
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    A transport adapter that serves the responses of a recording. The
+    recorded latencies are multiplied by `latency_scale`; thus, `0` replays
+    without delays and `1` with the original latencies. When `strict` is
+    set, a request that is not in the recording raises a `RuntimeError`;
+    otherwise, a response with status 404 is returned.
+    """
+
+    def __init__(
+        self,
+        recording: Recording,
+        latency_scale: float = 0.0,
+        strict: bool = True,
+    ):
+        super().__init__()
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._queues: dict[str, list[Exchange]] = {}
+        self._positions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        for e in recording.exchanges:
+            self._queues.setdefault(e.key, []).append(e)
+
+    def _next(self, key: str) -> Exchange | None:
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                return None
+            pos = self._positions.get(key, 0)
+            self._positions[key] = pos + 1
+            return queue[min(pos, len(queue) - 1)]
+
+    def send(self, request, *args, **kwargs):  # type: ignore
+        method = request.method or "GET"
+        path = _path_of(request.url)
+        body = _bytes_of(request.body)
+        exchange = self._next(_key_of(method, path, body))
+        if exchange is None:
+            if self.strict:
+                raise RuntimeError(f"no recorded response for {method} {path}")
+            return _response(request, 404, b"not recorded", "text/plain")
+        if self.latency_scale > 0 and exchange.elapsed > 0:
+            time.sleep(exchange.elapsed * self.latency_scale)
+        content = _with_rpc_id(exchange.response, body)
+        return _response(
+            request, exchange.status, content, exchange.content_type
+        )
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def record(
+    client: Client | RestClient, path: str | os.PathLike[str] | None = None
+) -> Iterator[Recording]:
+    """
+    Records the traffic of the given client within the context and saves it
+    to the given file, if provided, when the context is closed.
+    """
+    session = client._s
+    recording = Recording()
+    adapter = RecordingAdapter(recording)
+    previous = OrderedDict(session.adapters)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    try:
+        yield recording
+    finally:
+        session.adapters = previous
+        adapter.close()
+        if path is not None:
+            recording.save(path)
+
+
+def replay(
+    client: Client | RestClient,
+    recording: Recording | str | os.PathLike[str],
+    latency_scale: float = 0.0,
+    strict: bool = True,
+) -> ReplayAdapter:
+    """
+    Lets the given client send its requests to the replay transport of the
+    given recording. The endpoint of the client does not need to match the
+    endpoint of the recording.
+    """
+    if not isinstance(recording, Recording):
+        recording = Recording.load(recording)
+    adapter = ReplayAdapter(recording, latency_scale, strict)
+    client._s.mount("http://", adapter)
+    client._s.mount("https://", adapter)
+    return adapter
+
+
+def _path_of(url: str | None) -> str:
+    if url is None:
+        return "/"
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def _bytes_of(body: Any) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if isinstance(body, bytes):
+        return body
+    if isinstance(body, StreamBody):
+        # the JSON around the file content is kept for the match
+        return body.head + _digest_of(body.stream.chunks()) + body.tail
+    if hasattr(body, "__iter__"):  # another streamed body
+        return _digest_of(body)
+    return bytes(body)
+
+
+def _digest_of(chunks: Iterable[bytes]) -> bytes:
+    """
+    Returns the length and SHA-256 hash of streamed content, which is used
+    instead of the content so that it is not held in memory.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+    return f"stream:{size}:{digest.hexdigest()}".encode("ascii")
+
+
+def _key_of(method: str, path: str, body: bytes) -> str:
+    if len(body) == 0:
+        return f"{method} {path}"
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return f"{method} {path} {body.decode('utf-8', 'replace')}"
+    if isinstance(data, dict) and "jsonrpc" in data:
+        data.pop("id", None)
+    return f"{method} {path} {json.dumps(data, sort_keys=True)}"
+
+
+def _with_rpc_id(content: bytes, request: bytes) -> bytes:
+    """Sets the ID of a JSON-RPC response to the ID of the request."""
+    if b'"jsonrpc"' not in request:
+        return content
+    try:
+        req_id = json.loads(request).get("id")
+        resp = json.loads(content)
+    except (ValueError, AttributeError):
+        return content
+    if not isinstance(resp, dict) or resp.get("id") == req_id:
+        return content
+    resp["id"] = req_id
+    return json.dumps(resp).encode("utf-8")
+
+
+def _response(
+    request: requests.PreparedRequest,
+    status: int,
+    content: bytes,
+    content_type: str,
+) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = content
+    resp.headers = CaseInsensitiveDict(
+        {"Content-Type": content_type, "Content-Length": str(len(content))}
+    )
+    resp.encoding = "utf-8"
+    resp.url = request.url or ""
+    resp.request = request
+    resp.reason = "OK" if status == 200 else ""
+    return resp
+
+
+def _encode(data: bytes) -> str | dict[str, str]:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(data).decode("ascii")}
+
+
+def _decode(data: str | dict[str, str] | None) -> bytes:
+    if data is None:
+        return b""
+    if isinstance(data, dict):
+        return base64.b64decode(data["base64"])
+    return data.encode("utf-8")
@@ -0,0 +1,448 @@
+"""
+Views of a result for other demand amounts.
+
+The results of a linear system are linear in the amount of the reference
+demand. Thus, instead of recalculating a product system for another amount,
+the values of an existing result can be scaled in memory:
+
+```python
+import olca_ipc.rescale as rescale
+
+rescaler = rescale.Rescaler(result)
+view = rescaler.view(42)  # a ProtoResult for a demand of 42
+impacts = view.get_total_impacts()
+
+# vectorized for many amounts, this requires NumPy
+matrix = rescaler.total_impacts([1, 2, 5, 10])
+```
+
+The values of the underlying result are fetched once and cached in the
+rescaler, so that creating and querying views is cheap. Intensities, impact
+factors, and unscaled tech. flows do not depend on the demand and are
+passed through unchanged.
+"""
+
+import copy
+import dataclasses
+from typing import Any, Sequence, cast, override
+
+import olca_schema as o
+
+from .protocol import ProtoResult, envi_key, tech_key
+
+
+class Rescaler:
+    """
+    Caches the values of a result and creates views of that result for
+    other demand amounts.
+    """
+
+    def __init__(self, result: ProtoResult):
+        self.result = result
+        demand = result.get_demand()
+        if demand is None or not demand.amount:
+            raise ValueError("the result has no demand or a zero demand")
+        self.demand = demand
+        self.base_amount = cast(float, demand.amount)
+        self._cache: dict[tuple[Any, ...], Any] = {}
+
+    def view(self, amount: float) -> "RescaledResult":
+        return RescaledResult(self, amount)
+
+    def fetch(self, name: str, *args: Any) -> Any:
+        """
+        Calls the method with the given name and arguments on the underlying
+        result, or returns the cached value of a previous call.
+        """
+        key = (name, *[_key_of(arg) for arg in args])
+        value = self._cache.get(key)
+        if value is None:
+            value = getattr(self.result, name)(*args)
+            self._cache[key] = value
+        return value
+
+    def clear(self):
+        self._cache.clear()
+
+    def dispose(self):
+        """
+        Clears the cache and disposes the underlying result. The views of
+        this rescaler cannot be used anymore after this.
+        """
+        self._cache.clear()
+        self.result.dispose()
+
+    def batch(self, amounts: Sequence[float], name: str, *args: Any) -> Any:
+        """
+        Evaluates the values of the given result method for many amounts at
+        once as an outer product: row `i` of the returned matrix contains the
+        values for `amounts[i]`. This requires NumPy.
+        """
+        import numpy as np
+
+        values = self.fetch(name, *args)
+        if not isinstance(values, list):
+            values = [values]
+        base = np.array([_amount_of(v) for v in values], dtype=np.float64)
+        factors = np.asarray(amounts, dtype=np.float64) / self.base_amount
+        return np.outer(factors, base)
+
+    def total_requirements(self, amounts: Sequence[float]) -> Any:
+        return self.batch(amounts, "get_total_requirements")
+
+    def total_flows(self, amounts: Sequence[float]) -> Any:
+        return self.batch(amounts, "get_total_flows")
+
+    def total_impacts(self, amounts: Sequence[float]) -> Any:
+        return self.batch(amounts, "get_total_impacts")
+
+    def total_costs(self, amounts: Sequence[float]) -> Any:
+        return self.batch(amounts, "get_total_costs")[:, 0]
+
+
+def rescale(result: ProtoResult, amount: float) -> "RescaledResult":
+    """Creates a view of the given result for the given demand amount."""
+    return Rescaler(result).view(amount)
+
+
+class RescaledResult(ProtoResult):
+    """
+    A view of a result for another demand amount. The views of a rescaler
+    share its cache and the underlying result; disposing a view does not
+    dispose them, use `Rescaler.dispose` for this.
+    """
+
+    def __init__(self, rescaler: Rescaler, amount: float):
+        self.rescaler = rescaler
+        self.amount = amount
+        self.factor = amount / rescaler.base_amount
+
+    def _scaled(self, name: str, *args: Any) -> Any:
+        value = self.rescaler.fetch(name, *args)
+        if isinstance(value, list):
+            return [_scale(v, self.factor) for v in value]
+        return _scale(value, self.factor)
+
+    def _plain(self, name: str, *args: Any) -> Any:
+        # copies, so that changing a returned value does not change the cache
+        value = self.rescaler.fetch(name, *args)
+        if isinstance(value, list):
+            return [copy.copy(v) for v in value]
+        return copy.copy(value)
+
+    @override
+    def get_state(self) -> o.ResultState:
+        return self.rescaler.result.get_state()
+
+    @override
+    def simulate_next(self) -> o.ResultState:
+        state = self.rescaler.result.simulate_next()
+        self.rescaler.clear()
+        return state
+
+    @override
+    def dispose(self):
+        # a view holds no state of its own
+        pass
+
+    @override
+    def get_demand(self) -> o.TechFlowValue | None:
+        return o.TechFlowValue(
+            amount=self.amount, tech_flow=self.rescaler.demand.tech_flow
+        )
+
+    @override
+    def get_tech_flows(self) -> list[o.TechFlow]:
+        return self._plain("get_tech_flows")
+
+    @override
+    def get_envi_flows(self) -> list[o.EnviFlow]:
+        return self._plain("get_envi_flows")
+
+    @override
+    def get_impact_categories(self) -> list[o.Ref]:
+        return self._plain("get_impact_categories")
+
+    # region: tech-flows
+
+    @override
+    def get_total_requirements(self) -> list[o.TechFlowValue]:
+        return self._scaled("get_total_requirements")
+
+    @override
+    def get_total_requirements_of(
+        self, tech_flow: o.TechFlow
+    ) -> o.TechFlowValue:
+        return self._scaled("get_total_requirements_of", tech_flow)
+
+    @override
+    def get_scaling_factors(self) -> list[o.TechFlowValue]:
+        return self._scaled("get_scaling_factors")
+
+    @override
+    def get_scaled_tech_flows_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.TechFlowValue]:
+        return self._scaled("get_scaled_tech_flows_of", tech_flow)
+
+    @override
+    def get_unscaled_tech_flows_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.TechFlowValue]:
+        return self._plain("get_unscaled_tech_flows_of", tech_flow)
+
+    # endregion
+
+    # region: inventory results
+
+    @override
+    def get_total_flows(self) -> list[o.EnviFlowValue]:
+        return self._scaled("get_total_flows")
+
+    @override
+    def get_total_flow_value_of(self, envi_flow: o.EnviFlow) -> o.EnviFlowValue:
+        return self._scaled("get_total_flow_value_of", envi_flow)
+
+    @override
+    def get_flow_contributions_of(
+        self, envi_flow: o.EnviFlow
+    ) -> list[o.TechFlowValue]:
+        return self._scaled("get_flow_contributions_of", envi_flow)
+
+    @override
+    def get_direct_interventions_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.EnviFlowValue]:
+        return self._scaled("get_direct_interventions_of", tech_flow)
+
+    @override
+    def get_direct_intervention_of(
+        self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
+    ) -> o.EnviFlowValue:
+        return self._scaled("get_direct_intervention_of", envi_flow, tech_flow)
+
+    @override
+    def get_flow_intensities_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.EnviFlowValue]:
+        return self._plain("get_flow_intensities_of", tech_flow)
+
+    @override
+    def get_flow_intensity_of(
+        self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
+    ) -> o.EnviFlowValue:
+        return self._plain("get_flow_intensity_of", envi_flow, tech_flow)
+
+    @override
+    def get_total_interventions_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.EnviFlowValue]:
+        return self._scaled("get_total_interventions_of", tech_flow)
+
+    @override
+    def get_total_intervention_of(
+        self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
+    ) -> o.EnviFlowValue:
+        return self._scaled("get_total_intervention_of", envi_flow, tech_flow)
+
+    @override
+    def get_upstream_interventions_of(
+        self, envi_flow: o.EnviFlow, path: list[o.TechFlow] | str
+    ) -> list[o.UpstreamNode]:
+        return self._scaled("get_upstream_interventions_of", envi_flow, path)
+
+    @override
+    def get_grouped_flow_results_of(
+        self, envi_flow: o.EnviFlow
+    ) -> list[o.GroupValue]:
+        return self._scaled("get_grouped_flow_results_of", envi_flow)
+
+    # endregion
+
+    # region: impacts
+
+    @override
+    def get_total_impacts(self) -> list[o.ImpactValue]:
+        return self._scaled("get_total_impacts")
+
+    @override
+    def get_total_impact_value_of(
+        self, impact_category: o.Ref
+    ) -> o.ImpactValue:
+        return self._scaled("get_total_impact_value_of", impact_category)
+
+    @override
+    def get_normalized_impacts(self) -> list[o.ImpactValue]:
+        return self._scaled("get_normalized_impacts")
+
+    @override
+    def get_weighted_impacts(self) -> list[o.ImpactValue]:
+        return self._scaled("get_weighted_impacts")
+
+    @override
+    def get_impact_contributions_of(
+        self, impact_category: o.Ref
+    ) -> list[o.TechFlowValue]:
+        return self._scaled("get_impact_contributions_of", impact_category)
+
+    @override
+    def get_direct_impacts_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.ImpactValue]:
+        return self._scaled("get_direct_impacts_of", tech_flow)
+
+    @override
+    def get_direct_impact_of(
+        self, impact_category: o.Ref, tech_flow: o.TechFlow
+    ) -> o.ImpactValue:
+        return self._scaled("get_direct_impact_of", impact_category, tech_flow)
+
+    @override
+    def get_impact_intensities_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.ImpactValue]:
+        return self._plain("get_impact_intensities_of", tech_flow)
+
+    @override
+    def get_impact_intensity_of(
+        self, impact_category: o.Ref, tech_flow: o.TechFlow
+    ) -> o.ImpactValue:
+        return self._plain(
+            "get_impact_intensity_of", impact_category, tech_flow
+        )
+
+    @override
+    def get_total_impacts_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.ImpactValue]:
+        return self._scaled("get_total_impacts_of", tech_flow)
+
+    @override
+    def get_total_impact_of(
+        self, impact_category: o.Ref, tech_flow: o.TechFlow
+    ) -> o.ImpactValue:
+        return self._scaled("get_total_impact_of", impact_category, tech_flow)
+
+    @override
+    def get_impact_factors_of(
+        self, impact_category: o.Ref
+    ) -> list[o.EnviFlowValue]:
+        return self._plain("get_impact_factors_of", impact_category)
+
+    @override
+    def get_impact_factor_of(
+        self, impact_category: o.Ref, envi_flow: o.EnviFlow
+    ) -> o.EnviFlowValue:
+        return self._plain("get_impact_factor_of", impact_category, envi_flow)
+
+    @override
+    def get_flow_impacts_of(
+        self, impact_category: o.Ref
+    ) -> list[o.EnviFlowValue]:
+        return self._scaled("get_flow_impacts_of", impact_category)
+
+    @override
+    def get_flow_impact_of(
+        self, impact_category: o.Ref, envi_flow: o.EnviFlow
+    ) -> o.EnviFlowValue:
+        return self._scaled("get_flow_impact_of", impact_category, envi_flow)
+
+    @override
+    def get_upstream_impacts_of(
+        self, impact_category: o.Ref, path: list[o.TechFlow] | str
+    ) -> list[o.UpstreamNode]:
+        return self._scaled("get_upstream_impacts_of", impact_category, path)
+
+    @override
+    def get_grouped_impact_results_of(
+        self, impact: o.Ref
+    ) -> list[o.GroupValue]:
+        return self._scaled("get_grouped_impact_results_of", impact)
+
+    # endregion
+
+    # region: costs
+
+    @override
+    def get_total_costs(self) -> o.CostValue:
+        return self._scaled("get_total_costs")
+
+    @override
+    def get_cost_contributions(self) -> list[o.TechFlowValue]:
+        return self._scaled("get_cost_contributions")
+
+    @override
+    def get_direct_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
+        return self._scaled("get_direct_costs_of", tech_flow)
+
+    @override
+    def get_cost_intensities_of(self, tech_flow: o.TechFlow) -> o.CostValue:
+        return self._plain("get_cost_intensities_of", tech_flow)
+
+    @override
+    def get_total_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
+        return self._scaled("get_total_costs_of", tech_flow)
+
+    @override
+    def get_upstream_costs_of(
+        self, path: list[o.TechFlow] | str
+    ) -> list[o.UpstreamNode]:
+        return self._scaled("get_upstream_costs_of", path)
+
+    @override
+    def get_grouped_cost_results(self) -> list[o.GroupValue]:
+        return self._scaled("get_grouped_cost_results")
+
+    # endregion
+
+    @override
+    def get_sankey_graph(self, config: o.SankeyRequest) -> o.SankeyGraph:
+        g = self.rescaler.result.get_sankey_graph(config)
+        nodes = [
+            dataclasses.replace(
+                node,
+                direct_result=_times(node.direct_result, self.factor),
+                total_result=_times(node.total_result, self.factor),
+            )
+            for node in g.nodes or []
+        ]
+        return dataclasses.replace(g, nodes=nodes)
+
+
+def _scale(value: Any, factor: float) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, o.UpstreamNode):
+        return dataclasses.replace(
+            value,
+            result=_times(value.result, factor),
+            direct_contribution=_times(value.direct_contribution, factor),
+            required_amount=_times(value.required_amount, factor),
+        )
+    return dataclasses.replace(value, amount=_times(value.amount, factor))
+
+
+def _times(value: float | None, factor: float) -> float | None:
+    return value * factor if value is not None else None
+
+
+def _amount_of(value: Any) -> float:
+    if value is None:
+        return 0.0
+    if isinstance(value, o.UpstreamNode):
+        return value.result or 0.0
+    return value.amount or 0.0
+
+
+def _key_of(arg: Any) -> Any:
+    if isinstance(arg, (str, int, float)):
+        return arg
+    if isinstance(arg, list):
+        return "/".join(tech_key(tf) for tf in arg)
+    if isinstance(arg, o.TechFlow):
+        return tech_key(arg)
+    if isinstance(arg, o.EnviFlow):
+        return envi_key(arg)
+    if isinstance(arg, o.Ref):
+        return arg.id
+    return repr(arg)
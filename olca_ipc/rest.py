@@ -1,51 +1,217 @@
+import copy
 import logging as log
-from typing import Any, Callable, Type, TypeVar, cast, override
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Type,
+    TypeVar,
+    cast,
+    override,
+)
 
 import olca_schema as o
-import requests
 
-from . import FileData
-from .protocol import E, ProtoClient, ProtoResult
+from .decoding import ListOf, ProcessDecoder, copy_constructed
+from .flight import SingleFlight
+from .metrics import Metrics, route_of, size_of
+from .protocol import (
+    E,
+    FileData,
+    FileStream,
+    ProtoClient,
+    ProtoResult,
+    envi_key,
+    tech_key,
+)
+
+if TYPE_CHECKING:
+    import requests
 
 T = TypeVar("T")
 
 
 class RestClient(ProtoClient):
-    def __init__(self, endpoint: str, **kwargs):
+    """
+    A client to communicate with an openLCA REST server. When a `Metrics`
+    instance is given, the calls of the client are recorded in it. With
+    `coalesce`, which is off by default, concurrent GET requests of the same
+    resource share one request; each caller constructs its own objects from
+    the response. Requests after a change through the client do not join
+    requests from before it. With a `ProcessDecoder`, large responses are
+    decoded in worker processes. Further keyword arguments are passed to the
+    requests of the `requests` library.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        metrics: Metrics | None = None,
+        coalesce: bool = False,
+        decoder: ProcessDecoder | None = None,
+        **kwargs,
+    ):
+        import requests  # deferred until a client is created
+
         self.endpoint = endpoint if endpoint.endswith("/") else endpoint + "/"
+        self.metrics = metrics
         self.req_args = kwargs
+        self._s = requests.Session()
+        self._flight = SingleFlight() if coalesce else None
+        flight = self._flight
+        if flight is not None:
+            # reads after a change must not join reads from before it
+            self.add_change_listener(lambda _: flight.forget())
+        self.decoder = decoder
+
+    def _send(
+        self,
+        verb: str,
+        path: str,
+        data: Any | None = None,
+        stream: FileStream | None = None,
+    ) -> "requests.Response":
+        url = self.endpoint + path
+        args = self.req_args
+        if stream is not None:
+            args = dict(self.req_args)
+            args["headers"] = {
+                **(args.get("headers") or {}),
+                "Content-Type": "application/json",
+            }
+            args["data"] = stream.body_of(data)
+            data = None
+        if self.metrics is None:
+            return self._s.request(verb, url, json=data, **args)
+        start = time.perf_counter()
+        resp = self._s.request(verb, url, json=data, **args)
+        self.metrics.record_call(
+            route_of(verb, path),
+            time.perf_counter() - start,
+            request_bytes=size_of(resp.request.body),
+            response_bytes=len(resp.content),
+            error=resp.status_code != 200,
+        )
+        return resp
+
+    def _read(
+        self,
+        verb: str,
+        path: str,
+        resp: "requests.Response",
+        transform: Callable[[Any], T],
+    ) -> T:
+        if self.decoder is not None and self.decoder.accepts(len(resp.content)):
+            start = time.perf_counter()
+            value = self.decoder.decode(resp.content, transform)
+            if self.metrics is not None:
+                self.metrics.record_decode(
+                    route_of(verb, path), time.perf_counter() - start
+                )
+            return value
+        return self._construct(
+            verb, path, transform, self._decode(verb, path, resp)
+        )
+
+    def _decode(self, verb: str, path: str, resp: "requests.Response") -> Any:
+        if self.metrics is None:
+            return resp.json()
+        start = time.perf_counter()
+        data = resp.json()
+        self.metrics.record_decode(
+            route_of(verb, path), time.perf_counter() - start
+        )
+        return data
+
+    def _construct(
+        self, verb: str, path: str, transform: Callable[[Any], T], data: Any
+    ) -> T:
+        if self.metrics is None:
+            return transform(data)
+        start = time.perf_counter()
+        value = transform(data)
+        self.metrics.record_construct(
+            route_of(verb, path), time.perf_counter() - start
+        )
+        return value
+
+    def _fetch(
+        self, path: str, transform: Callable[[Any], Any] | None = None
+    ) -> tuple[Any, str | None, bool]:
+        """
+        Performs a GET request and returns a tuple (data, error,
+        constructed). When a transformation is given, the data may be
+        constructed with it already by the decoder of the client;
+        `constructed` is then true. Concurrent requests of the same path
+        share one request, when enabled.
+        """
+        # raw data is returned to the caller and is copied; otherwise, the
+        # callers construct their own objects from the shared data
+        copies = copy.deepcopy if transform is None else copy_constructed
+        if self.decoder is None:
+            transform = None
+        if self._flight is None:
+            return self._fetch_now(path, transform)
+        value, shared = self._flight.do(
+            (path, transform),
+            lambda: self._fetch_now(path, transform),
+            copies,
+        )
+        if shared and self.metrics is not None:
+            self.metrics.record_coalesced(route_of("GET", path))
+        return value
+
+    def _fetch_now(
+        self, path: str, transform: Callable[[Any], Any] | None
+    ) -> tuple[Any, str | None, bool]:
+        resp = self._send("GET", path)
+        if _not_ok(resp):
+            return None, resp.text, False
+        if (
+            transform is not None
+            and self.decoder is not None
+            and self.decoder.accepts(len(resp.content))
+        ):
+            return self._read("GET", path, resp, transform), None, True
+        return self._decode("GET", path, resp), None, False
 
     def _get(self, path, transform: Callable[[Any], T]) -> T | None:
-        resp = requests.get(self.endpoint + path, **self.req_args)
-        if _not_ok(resp):
-            log.error("ERROR: GET %s failed: %s", path, resp.text)
+        data, err, constructed = self._fetch(path, transform)
+        if err is not None:
+            log.error("ERROR: GET %s failed: %s", path, err)
             return None
-        return transform(resp.json())
+        if constructed:
+            return data
+        return self._construct("GET", path, transform, data)
 
     def _get_each(self, path, transform: Callable[[Any], T]) -> list[T]:
-        resp = requests.get(self.endpoint + path, **self.req_args)
-        if _not_ok(resp):
-            log.error("ERROR: GET %s failed: %s", path, resp.text)
+        each = ListOf(transform)
+        data, err, constructed = self._fetch(path, each)
+        if err is not None:
+            log.error("ERROR: GET %s failed: %s", path, err)
             return []
-        return [transform(x) for x in resp.json()]
+        if constructed:
+            return data
+        return self._construct("GET", path, each, data)
 
     def _post(
         self, path, transform: Callable[[Any], T], data: Any | None = None
     ) -> T | None:
-        resp = requests.post(self.endpoint + path, json=data, **self.req_args)
+        resp = self._send("POST", path, data)
         if _not_ok(resp):
             log.error("ERROR: POST %s failed: %s", path, resp.text)
             return None
-        return transform(resp.json())
+        return self._read("POST", path, resp, transform)
 
     def _post_each(
         self, path, transform: Callable[[Any], T], data: Any | None = None
     ) -> list[T]:
-        resp = requests.post(self.endpoint + path, json=data, **self.req_args)
+        resp = self._send("POST", path, data)
         if _not_ok(resp):
             log.error("ERROR: POST %s failed: %s", path, resp.text)
             return []
-        return [transform(x) for x in resp.json()]
+        return self._read("POST", path, resp, ListOf(transform))
 
     @override
     def get(
@@ -61,8 +227,26 @@ class RestClient(ProtoClient):
             path = f"data/{_path_of(model_type)}/{uid}"
         else:
             path = f"data/{_path_of(model_type)}/name/{name}"
+        if uid and self._entity_cache is not None:
+            data = self._entity_cache.get(
+                model_type.__name__,
+                uid,
+                lambda: self._data_of(path),
+                lambda: self._data_of(f"{path}/info"),
+            )
+            if data is None:
+                return None
+            entity = self._construct("GET", path, model_type.from_dict, data)
+            return cast(E, entity)
         return cast(E, self._get(path, model_type.from_dict))
 
+    def _data_of(self, path: str) -> Any | None:
+        data, err, _ = self._fetch(path)
+        if err is not None:
+            log.error("ERROR: GET %s failed: %s", path, err)
+            return None
+        return data
+
     @override
     def get_all(self, model_type: Type[E]) -> list[E]:
         xs = self._get_each(
@@ -121,27 +305,27 @@ class RestClient(ProtoClient):
 
     @override
     def put(self, model: o.RootEntity) -> o.Ref | None:
-        resp = requests.put(
-            f"{self.endpoint}data/{_path_of(model.__class__)}",
-            json=model.to_dict(),
-            **self.req_args,
-        )
+        path = f"data/{_path_of(model.__class__)}"
+        resp = self._send("PUT", path, model.to_dict())
         if _not_ok(resp):
             log.error("failed to upload entity: %s", resp.text)
             return None
-        return o.Ref.from_dict(resp.json())
+        ref = self._read("PUT", path, resp, o.Ref.from_dict)
+        self._notify_change(ref)
+        return ref
 
     @override
     def put_source_file(
-        self, source: o.Source | o.Ref, file_data: FileData
+        self, source: o.Source | o.Ref, file_data: FileData | FileStream
     ) -> bool:
-        resp = requests.post(
-            f"{self.endpoint}data/put-source-file",
-            json={
+        resp = self._send(
+            "POST",
+            "data/put-source-file",
+            {
                 "source": o.as_ref(source).to_dict(),
                 "file": file_data.to_dict(),
             },
-            **self.req_args,
+            file_data if isinstance(file_data, FileStream) else None,
         )
         if _not_ok(resp):
             log.error("failed to upload source file: %s", resp.text)
@@ -157,7 +341,10 @@ class RestClient(ProtoClient):
         params: dict[str, Any] = {"process": o.as_ref(process).to_dict()}
         if config is not None:
             params["config"] = config.to_dict()
-        return self._post("data/create-system", o.Ref.from_dict, params)
+        system = self._post("data/create-system", o.Ref.from_dict, params)
+        if system is not None:
+            self._notify_change(system)
+        return system
 
     @override
     def delete(self, model: o.RootEntity | o.Ref) -> o.Ref | None:
@@ -170,12 +357,14 @@ class RestClient(ProtoClient):
             if char.isupper() and len(path) > 0:
                 path += "-"
             path += char
-        url = f"{self.endpoint}data/{path.lower()}/{model.id}"
-        resp = requests.delete(url, **self.req_args)
+        path = f"data/{path.lower()}/{model.id}"
+        resp = self._send("DELETE", path)
         if _not_ok(resp):
             log.error("failed to delete model: %s", resp.text)
             return None
-        return o.Ref.from_dict(resp.json())
+        deleted = self._read("DELETE", path, resp, o.Ref.from_dict)
+        self._notify_change(deleted)
+        return deleted
 
     @override
     def calculate(self, setup: o.CalculationSetup) -> ProtoResult:
@@ -261,7 +450,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> o.TechFlowValue:
         v = self._get(
-            f"total-requirements-of/{_tech_id(tech_flow)}",
+            f"total-requirements-of/{tech_key(tech_flow)}",
             o.TechFlowValue.from_dict,
         )
         if v is None:
@@ -277,7 +466,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.TechFlowValue]:
         return self._get_each(
-            f"scaled-tech-flows-of/{_tech_id(tech_flow)}",
+            f"scaled-tech-flows-of/{tech_key(tech_flow)}",
             o.TechFlowValue.from_dict,
         )
 
@@ -286,7 +475,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.TechFlowValue]:
         return self._get_each(
-            f"unscaled-tech-flows-of/{_tech_id(tech_flow)}",
+            f"unscaled-tech-flows-of/{tech_key(tech_flow)}",
             o.TechFlowValue.from_dict,
         )
 
@@ -301,7 +490,7 @@ class RestResult(ProtoResult):
     @override
     def get_total_flow_value_of(self, envi_flow: o.EnviFlow) -> o.EnviFlowValue:
         v = self._get(
-            f"total-flow-value-of/{_envi_id(envi_flow)}",
+            f"total-flow-value-of/{envi_key(envi_flow)}",
             o.EnviFlowValue.from_dict,
         )
         if v is None:
@@ -313,7 +502,7 @@ class RestResult(ProtoResult):
         self, envi_flow: o.EnviFlow
     ) -> list[o.TechFlowValue]:
         return self._get_each(
-            f"flow-contributions-of/{_envi_id(envi_flow)}",
+            f"flow-contributions-of/{envi_key(envi_flow)}",
             o.TechFlowValue.from_dict,
         )
 
@@ -322,7 +511,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.EnviFlowValue]:
         return self._get_each(
-            f"direct-interventions-of/{_tech_id(tech_flow)}",
+            f"direct-interventions-of/{tech_key(tech_flow)}",
             o.EnviFlowValue.from_dict,
         )
 
@@ -331,7 +520,7 @@ class RestResult(ProtoResult):
         self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
     ) -> o.EnviFlowValue:
         val = self._get(
-            f"direct-intervention-of/{_envi_id(envi_flow)}/{_tech_id(tech_flow)}",
+            f"direct-intervention-of/{envi_key(envi_flow)}/{tech_key(tech_flow)}",
             o.EnviFlowValue.from_dict,
         )
         if val is None:
@@ -343,7 +532,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.EnviFlowValue]:
         return self._get_each(
-            f"flow-intensities-of/{_tech_id(tech_flow)}",
+            f"flow-intensities-of/{tech_key(tech_flow)}",
             o.EnviFlowValue.from_dict,
         )
 
@@ -352,7 +541,7 @@ class RestResult(ProtoResult):
         self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
     ) -> o.EnviFlowValue:
         val = self._get(
-            f"flow-intensity-of/{_envi_id(envi_flow)}/{_tech_id(tech_flow)}",
+            f"flow-intensity-of/{envi_key(envi_flow)}/{tech_key(tech_flow)}",
             o.EnviFlowValue.from_dict,
         )
         if val is None:
@@ -364,7 +553,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.EnviFlowValue]:
         return self._get_each(
-            f"total-interventions-of/{_tech_id(tech_flow)}",
+            f"total-interventions-of/{tech_key(tech_flow)}",
             o.EnviFlowValue.from_dict,
         )
 
@@ -373,7 +562,7 @@ class RestResult(ProtoResult):
         self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
     ) -> o.EnviFlowValue:
         val = self._get(
-            f"total-intervention-of/{_envi_id(envi_flow)}/{_tech_id(tech_flow)}",
+            f"total-intervention-of/{envi_key(envi_flow)}/{tech_key(tech_flow)}",
             o.EnviFlowValue.from_dict,
         )
         if val is None:
@@ -382,13 +571,13 @@ class RestResult(ProtoResult):
 
     @override
     def get_upstream_interventions_of(
-        self, envi_flow: o.EnviFlow, path: list[o.TechFlow]
+        self, envi_flow: o.EnviFlow, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         params: dict[str, Any] = {
             "path": _encode_path(path),
         }
         return self._post_each(
-            f"upstream-interventions-of/{_envi_id(envi_flow)}",
+            f"upstream-interventions-of/{envi_key(envi_flow)}",
             o.UpstreamNode.from_dict,
             params,
         )
@@ -398,7 +587,7 @@ class RestResult(ProtoResult):
         self, envi_flow: o.EnviFlow
     ) -> list[o.GroupValue]:
         return self._get_each(
-            f"grouped-flow-results-of/{_envi_id(envi_flow)}",
+            f"grouped-flow-results-of/{envi_key(envi_flow)}",
             o.GroupValue.from_dict,
         )
 
@@ -444,7 +633,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.ImpactValue]:
         return self._get_each(
-            f"direct-impacts-of/{_tech_id(tech_flow)}",
+            f"direct-impacts-of/{tech_key(tech_flow)}",
             o.ImpactValue.from_dict,
         )
 
@@ -453,7 +642,7 @@ class RestResult(ProtoResult):
         self, impact_category: o.Ref, tech_flow: o.TechFlow
     ) -> o.ImpactValue:
         val = self._get(
-            f"direct-impact-of/{impact_category.id}/{_tech_id(tech_flow)}",
+            f"direct-impact-of/{impact_category.id}/{tech_key(tech_flow)}",
             o.ImpactValue.from_dict,
         )
         if val is None:
@@ -465,7 +654,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.ImpactValue]:
         return self._get_each(
-            f"impact-intensities-of/{_tech_id(tech_flow)}",
+            f"impact-intensities-of/{tech_key(tech_flow)}",
             o.ImpactValue.from_dict,
         )
 
@@ -474,7 +663,7 @@ class RestResult(ProtoResult):
         self, impact_category: o.Ref, tech_flow: o.TechFlow
     ) -> o.ImpactValue:
         val = self._get(
-            f"impact-intensity-of/{impact_category.id}/{_tech_id(tech_flow)}",
+            f"impact-intensity-of/{impact_category.id}/{tech_key(tech_flow)}",
             o.ImpactValue.from_dict,
         )
         if val is None:
@@ -486,7 +675,7 @@ class RestResult(ProtoResult):
         self, tech_flow: o.TechFlow
     ) -> list[o.ImpactValue]:
         return self._get_each(
-            f"total-impacts-of/{_tech_id(tech_flow)}", o.ImpactValue.from_dict
+            f"total-impacts-of/{tech_key(tech_flow)}", o.ImpactValue.from_dict
         )
 
     @override
@@ -494,7 +683,7 @@ class RestResult(ProtoResult):
         self, impact_category: o.Ref, tech_flow: o.TechFlow
     ) -> o.ImpactValue:
         val = self._get(
-            f"total-impact-of/{impact_category.id}/{_tech_id(tech_flow)}",
+            f"total-impact-of/{impact_category.id}/{tech_key(tech_flow)}",
             o.ImpactValue.from_dict,
         )
         if val is None:
@@ -515,7 +704,7 @@ class RestResult(ProtoResult):
         self, impact_category: o.Ref, envi_flow: o.EnviFlow
     ) -> o.EnviFlowValue:
         val = self._get(
-            f"impact-factor-of/{impact_category.id}/{_envi_id(envi_flow)}",
+            f"impact-factor-of/{impact_category.id}/{envi_key(envi_flow)}",
             o.EnviFlowValue.from_dict,
         )
         if val is None:
@@ -535,7 +724,7 @@ class RestResult(ProtoResult):
         self, impact_category: o.Ref, envi_flow: o.EnviFlow
     ) -> o.EnviFlowValue:
         val = self._get(
-            f"flow-impact-of/{impact_category.id}/{_envi_id(envi_flow)}",
+            f"flow-impact-of/{impact_category.id}/{envi_key(envi_flow)}",
             o.EnviFlowValue.from_dict,
         )
         if val is None:
@@ -544,7 +733,7 @@ class RestResult(ProtoResult):
 
     @override
     def get_upstream_impacts_of(
-        self, impact_category: o.Ref, path: list[o.TechFlow]
+        self, impact_category: o.Ref, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         params: dict[str, Any] = {
             "path": _encode_path(path),
@@ -582,7 +771,7 @@ class RestResult(ProtoResult):
     @override
     def get_direct_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
         val = self._get(
-            f"direct-costs-of/{_tech_id(tech_flow)}", o.CostValue.from_dict
+            f"direct-costs-of/{tech_key(tech_flow)}", o.CostValue.from_dict
         )
         if val is None:
             return o.CostValue(amount=0)
@@ -591,7 +780,7 @@ class RestResult(ProtoResult):
     @override
     def get_cost_intensities_of(self, tech_flow: o.TechFlow) -> o.CostValue:
         val = self._get(
-            f"cost-intensities-of/{_tech_id(tech_flow)}",
+            f"cost-intensities-of/{tech_key(tech_flow)}",
             o.CostValue.from_dict,
         )
         if val is None:
@@ -601,7 +790,7 @@ class RestResult(ProtoResult):
     @override
     def get_total_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
         val = self._get(
-            f"total-costs-of/{_tech_id(tech_flow)}", o.CostValue.from_dict
+            f"total-costs-of/{tech_key(tech_flow)}", o.CostValue.from_dict
         )
         if val is None:
             return o.CostValue(amount=0)
@@ -609,7 +798,7 @@ class RestResult(ProtoResult):
 
     @override
     def get_upstream_costs_of(
-        self, path: list[o.TechFlow]
+        self, path: list[o.TechFlow] | str
     ) -> list[o.UpstreamNode]:
         params: dict[str, Any] = {
             "path": _encode_path(path),
@@ -650,31 +839,13 @@ class RestResult(ProtoResult):
         )
 
 
-def _not_ok(resp: requests.Response) -> bool:
+def _not_ok(resp: "requests.Response") -> bool:
     if resp.status_code == 200:
         return False
     log.error("response status != 200; message=%s", resp.text)
     return True
 
 
-def _tech_id(tech_flow: o.TechFlow) -> str:
-    tech_id = ""
-    if tech_flow.provider and tech_flow.provider.id:
-        tech_id = tech_flow.provider.id
-    if tech_flow.flow and tech_flow.flow.id:
-        tech_id += "::" + tech_flow.flow.id
-    return tech_id
-
-
-def _envi_id(envi_flow: o.EnviFlow) -> str:
-    envi_id = ""
-    if envi_flow.flow and envi_flow.flow.id:
-        envi_id = envi_flow.flow.id
-    if envi_flow.location and envi_flow.location.id:
-        envi_id += "::" + envi_flow.location.id
-    return envi_id
-
-
 def _path_of(model_type: Type[E]) -> str | None:
     if model_type is None:
         log.error("no model type given")
@@ -719,18 +890,9 @@ def _path_of(model_type: Type[E]) -> str | None:
             return None
 
 
-def _encode_path(path: list[o.TechFlow]) -> str | None:
+def _encode_path(path: list[o.TechFlow] | str) -> str | None:
     if path is None or len(path) == 0:
         return None
-    p = None
-    for tf in path:
-        segment = ""
-        if tf.provider and tf.provider.id:
-            segment += tf.provider.id
-        if tf.flow and tf.flow.id:
-            segment += "::" + tf.flow.id
-        if p is None:
-            p = segment
-        else:
-            p += "/" + segment
-    return p
+    if isinstance(path, str):
+        return path
+    return "/".join(tech_key(tf) for tf in path)
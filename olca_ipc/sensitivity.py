@@ -0,0 +1,236 @@
+"""
+Sensitivities of the impact results with respect to the matrix entries.
+
+The sensitivities are calculated on the matrices that were reconstructed
+from a result (see `olca_ipc.matrix`), for all entries of the technology
+and intervention matrix at once. With `h = C B s` and `A s = f`, the
+derivatives are:
+
+* `dh / dA[i, j] = -L[:, i] * s[j]` with `L = C B A^-1`
+* `dh / dB[l, j] = C[:, l] * s[j]`
+
+`L` is calculated with one adjoint solve on the LU factorization of `A` for
+all impact categories. The elasticities `(a / h) * dh / da` are returned as
+a `(parameter * indicator)` array:
+
+```python
+import olca_ipc.matrix as matrix
+import olca_ipc.sensitivity as sensitivity
+
+model = matrix.LocalModel.of(result)
+sens = sensitivity.of(model)
+for param, value in sens.rank(k=10):
+    print(param.kind, param.row, param.col, value)
+```
+
+This requires NumPy and SciPy to be installed.
+"""
+
+from dataclasses import dataclass
+from typing import Literal, cast
+
+import numpy as np
+import olca_schema as o
+import scipy.sparse as sparse
+
+from .matrix import LocalModel
+
+
+@dataclass
+class Parameter:
+    """
+    A matrix entry: `tech` for the technology matrix `A` or `envi` for the
+    intervention matrix `B`, with its row and column index and value.
+    """
+
+    kind: Literal["tech", "envi"]
+    row: int
+    col: int
+    value: float
+
+    def row_flow(self, model: LocalModel) -> o.TechFlow | o.EnviFlow:
+        if self.kind == "tech":
+            return model.tech_flows[self.row]
+        return model.envi_flows[self.row]
+
+    def col_flow(self, model: LocalModel) -> o.TechFlow:
+        return model.tech_flows[self.col]
+
+
+class Sensitivities:
+    """
+    The derivatives and elasticities of `k` impact categories for `p`
+    parameters, each stored as a `p * k` array.
+    """
+
+    def __init__(
+        self,
+        model: LocalModel,
+        kinds: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        values: np.ndarray,
+        impacts: np.ndarray,
+        derivatives: np.ndarray,
+    ):
+        self.model = model
+        self.kinds = kinds
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.impacts = impacts
+        self.derivatives = derivatives
+        scaled = derivatives * values[:, np.newaxis]
+        self.elasticities = np.divide(
+            scaled,
+            impacts[np.newaxis, :],
+            out=np.zeros_like(scaled),
+            where=impacts[np.newaxis, :] != 0,
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def parameter(self, p: int) -> Parameter:
+        return Parameter(
+            kind="tech" if self.kinds[p] else "envi",
+            row=int(self.rows[p]),
+            col=int(self.cols[p]),
+            value=float(self.values[p]),
+        )
+
+    def rank(
+        self, impact: o.Ref | int | None = None, k: int = 10
+    ) -> list[tuple[Parameter, float]]:
+        """
+        Returns the `k` parameters with the largest absolute elasticities
+        for the given impact category, or over all impact categories when no
+        impact category is given.
+        """
+        if self.elasticities.shape[1] == 0:
+            return []
+        if impact is None:
+            best = np.abs(self.elasticities).argmax(axis=1)
+            signed = self.elasticities[np.arange(len(self)), best]
+        else:
+            signed = self.elasticities[:, self._impact_index_of(impact)]
+        scores = np.abs(signed)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.parameter(int(p)), float(signed[p])) for p in top]
+
+    def _impact_index_of(self, impact: o.Ref | int) -> int:
+        if isinstance(impact, int):
+            return impact
+        k = self.model.impact_index.get(impact.id or "")
+        if k is None:
+            raise ValueError(f"impact category {impact.id} is not in the model")
+        return k
+
+
+def of(
+    model: LocalModel,
+    amount: float | None = None,
+    tech: bool = True,
+    envi: bool = True,
+    diagonal: bool = False,
+) -> Sensitivities:
+    """
+    Calculates the sensitivities of all impact categories of the model for
+    the non-zero entries of the technology matrix (without the diagonal,
+    unless `diagonal` is set) and the intervention matrix.
+    """
+    s = model.scaling_vector(amount)
+    C = model.impact_matrix
+    h = C @ (model.envi_matrix @ s)
+
+    kinds, rows, cols, values, derivatives = [], [], [], [], []
+    if tech:
+        A = model.tech_matrix.tocoo()
+        mask = A.data != 0
+        if not diagonal:
+            mask &= A.row != A.col
+        r, c, v = A.row[mask], A.col[mask], A.data[mask]
+        # L^T = A^-T (C B)^T, one adjoint solve for all impact categories
+        CB = cast(sparse.csr_matrix, C @ model.envi_matrix).toarray()
+        if CB.shape[0] > 0:
+            L = model.lu.solve(np.ascontiguousarray(CB.T), trans="T").T
+        else:
+            L = np.zeros((0, len(s)))
+        derivatives.append((-L[:, r] * s[c]).T)
+        kinds.append(np.ones(len(v), dtype=bool))
+        rows.append(r)
+        cols.append(c)
+        values.append(v)
+    if envi:
+        B = model.envi_matrix.tocoo()
+        mask = B.data != 0
+        r, c, v = B.row[mask], B.col[mask], B.data[mask]
+        derivatives.append((C[:, r].toarray() * s[c]).T)
+        kinds.append(np.zeros(len(v), dtype=bool))
+        rows.append(r)
+        cols.append(c)
+        values.append(v)
+
+    k = len(h)
+    return Sensitivities(
+        model,
+        np.concatenate(kinds) if kinds else np.zeros(0, dtype=bool),
+        np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+        np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64),
+        np.concatenate(values) if values else np.zeros(0),
+        h,
+        np.vstack(derivatives) if derivatives else np.zeros((0, k)),
+    )
+
+
+def perturb(
+    model: LocalModel,
+    parameters: list[Parameter],
+    change: float = 0.1,
+    amount: float | None = None,
+    chunk_size: int = 256,
+) -> np.ndarray:
+    """
+    Calculates the exact impact results when each of the given parameters
+    is changed independently by the given relative amount, returned as a
+    `(parameter * indicator)` array. Changes of the technology matrix are
+    rank-one updates that are solved with the Sherman-Morrison formula on
+    the existing factorization, in chunks of the given size.
+    """
+    s = model.scaling_vector(amount)
+    C = model.impact_matrix
+    CB = C @ model.envi_matrix
+    h = C @ (model.envi_matrix @ s)
+    results = np.tile(h, (len(parameters), 1))
+
+    tech = [
+        (p, param) for p, param in enumerate(parameters) if param.kind == "tech"
+    ]
+    size = max(1, chunk_size)
+    for start in range(0, len(tech), size):
+        chunk = tech[start : start + size]
+        E = np.zeros((len(s), len(chunk)))
+        for c, (_, param) in enumerate(chunk):
+            E[param.row, c] = 1
+        X = model.lu.solve(E)  # A^-1 e_i for each parameter
+        CBX = CB @ X
+        for c, (p, param) in enumerate(chunk):
+            delta = change * param.value
+            denominator = 1 + delta * X[param.col, c]
+            if denominator == 0:
+                results[p, :] = np.nan
+                continue
+            factor = delta * s[param.col] / denominator
+            results[p, :] = h - CBX[:, c] * factor
+
+    for p, param in enumerate(parameters):
+        if param.kind != "envi":
+            continue
+        delta = change * param.value
+        column = C[:, param.row].toarray().ravel()
+        results[p, :] = h + column * delta * s[param.col]
+    return results
@@ -0,0 +1,779 @@
+"""
+Offline snapshots of calculation results.
+
+A snapshot is a directory with an index file (`index.json`) that contains the
+tech. flows, envi. flows, and impact categories of a result and a set of
+NumPy arrays (`.npy` files) with the numbers of that result. The arrays are
+memory-mapped when a snapshot is read again, so that large results can be
+analysed without loading everything into memory and without a running
+server:
+
+```python
+import olca_ipc.snapshot as snapshot
+
+snapshot.snapshot(result, "path/to/snapshot")
+result.dispose()
+
+r = snapshot.SnapshotResult("path/to/snapshot")
+for v in r.get_total_impacts():
+    print(v.impact_category.name, v.amount)
+```
+
+The matrices are stored with the indicators in the rows and the tech. flows
+in the columns, e.g. `direct_interventions.npy` is an `m * n` matrix with the
+direct interventions of the `n` tech. flows for the `m` envi. flows. The
+unscaled tech. flows (the columns of the technology matrix) are stored as
+coordinate triples because they are typically very sparse.
+"""
+
+import json
+import logging as log
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Literal, cast, override
+
+import numpy as np
+import olca_schema as o
+
+from .protocol import ProtoResult, envi_key, tech_key
+
+_Ref = o.Ref | o.EnviFlow | Literal["costs"]
+
+_VERSION = 1
+
+
+def snapshot(
+    result: ProtoResult,
+    path: str | os.PathLike[str],
+    upstream: Iterable[_Ref] = (),
+    upstream_depth: int = 3,
+    grouped: bool = False,
+    concurrency: int = 4,
+) -> Path:
+    """
+    Fetches the complete result into the given directory and returns the path
+    of that directory. Optionally, the upstream trees of the given indicators
+    are stored up to the given depth and the grouped results of all
+    indicators (if the result has analysis groups).
+    """
+    folder = Path(path)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    tech_flows = result.get_tech_flows()
+    envi_flows = result.get_envi_flows()
+    impacts = result.get_impact_categories()
+    tech_idx = {tech_key(tf): i for i, tf in enumerate(tech_flows)}
+    envi_idx = {envi_key(ef): i for i, ef in enumerate(envi_flows)}
+    impact_idx = {cast(str, i.id): j for j, i in enumerate(impacts)}
+    n, m, k = len(tech_flows), len(envi_flows), len(impacts)
+
+    # totals
+    _save_vector(
+        folder / "total_requirements.npy",
+        n,
+        tech_idx,
+        result.get_total_requirements(),
+    )
+    _save_vector(
+        folder / "scaling_factors.npy",
+        n,
+        tech_idx,
+        result.get_scaling_factors(),
+    )
+    _save_vector(
+        folder / "total_flows.npy", m, envi_idx, result.get_total_flows()
+    )
+    if k > 0:
+        _save_vector(
+            folder / "total_impacts.npy",
+            k,
+            impact_idx,
+            result.get_total_impacts(),
+        )
+        _save_vector(
+            folder / "normalized_impacts.npy",
+            k,
+            impact_idx,
+            result.get_normalized_impacts(),
+        )
+        _save_vector(
+            folder / "weighted_impacts.npy",
+            k,
+            impact_idx,
+            result.get_weighted_impacts(),
+        )
+    total_costs = result.get_total_costs()
+
+    # tech. flow columns: direct results, intensities, and upstream totals
+    matrices = {
+        name: np.lib.format.open_memmap(
+            folder / f"{name}.npy", mode="w+", dtype=np.float64, shape=shape
+        )
+        for name, shape in (
+            ("direct_interventions", (m, n)),
+            ("flow_intensities", (m, n)),
+            ("total_interventions", (m, n)),
+            ("direct_impacts", (k, n)),
+            ("impact_intensities", (k, n)),
+            ("total_impacts_of", (k, n)),
+            ("direct_costs", (n,)),
+            ("cost_intensities", (n,)),
+            ("total_costs_of", (n,)),
+        )
+    }
+    tech_entries: list[tuple[int, int, float]] = []
+
+    def fetch_column(j: int):
+        tf = tech_flows[j]
+        for name, values in (
+            ("direct_interventions", result.get_direct_interventions_of(tf)),
+            ("flow_intensities", result.get_flow_intensities_of(tf)),
+            ("total_interventions", result.get_total_interventions_of(tf)),
+        ):
+            _put_column(matrices[name], j, envi_idx, values)
+        if k > 0:
+            for name, values in (
+                ("direct_impacts", result.get_direct_impacts_of(tf)),
+                ("impact_intensities", result.get_impact_intensities_of(tf)),
+                ("total_impacts_of", result.get_total_impacts_of(tf)),
+            ):
+                _put_column(matrices[name], j, impact_idx, values)
+        matrices["direct_costs"][j] = _amount(result.get_direct_costs_of(tf))
+        matrices["cost_intensities"][j] = _amount(
+            result.get_cost_intensities_of(tf)
+        )
+        matrices["total_costs_of"][j] = _amount(result.get_total_costs_of(tf))
+        for v in result.get_unscaled_tech_flows_of(tf):
+            i = tech_idx.get(tech_key(cast(o.TechFlow, v.tech_flow)))
+            if i is not None and v.amount:
+                tech_entries.append((i, j, v.amount))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for _ in pool.map(fetch_column, range(n)):
+            pass
+    for matrix in matrices.values():
+        matrix.flush()
+    matrices.clear()
+
+    # sorted by column, so that the entries of a tech. flow can be found
+    # with a binary search when reading the snapshot
+    tech_entries.sort(key=lambda e: (e[1], e[0]))
+    np.save(
+        folder / "tech_rows.npy",
+        np.array([e[0] for e in tech_entries], dtype=np.int32),
+    )
+    np.save(
+        folder / "tech_cols.npy",
+        np.array([e[1] for e in tech_entries], dtype=np.int32),
+    )
+    np.save(
+        folder / "tech_values.npy",
+        np.array([e[2] for e in tech_entries], dtype=np.float64),
+    )
+
+    # characterization factors and flow impacts
+    factors = np.lib.format.open_memmap(
+        folder / "impact_factors.npy", mode="w+", dtype=np.float64, shape=(k, m)
+    )
+    flow_impacts = np.lib.format.open_memmap(
+        folder / "flow_impacts.npy", mode="w+", dtype=np.float64, shape=(k, m)
+    )
+    for i, impact in enumerate(impacts):
+        _put_row(factors, i, envi_idx, result.get_impact_factors_of(impact))
+        _put_row(flow_impacts, i, envi_idx, result.get_flow_impacts_of(impact))
+    factors.flush()
+    flow_impacts.flush()
+    del factors, flow_impacts
+
+    index: dict[str, Any] = {
+        "version": _VERSION,
+        "demand": _dict_of(result.get_demand()),
+        "techFlows": [tf.to_dict() for tf in tech_flows],
+        "enviFlows": [ef.to_dict() for ef in envi_flows],
+        "impactCategories": [i.to_dict() for i in impacts],
+        "totalCosts": total_costs.to_dict(),
+    }
+
+    if grouped:
+        index["groups"] = {
+            "costs": [g.to_dict() for g in result.get_grouped_cost_results()],
+            "flows": {
+                envi_key(ef): [
+                    g.to_dict() for g in result.get_grouped_flow_results_of(ef)
+                ]
+                for ef in envi_flows
+            },
+            "impacts": {
+                cast(str, i.id): [
+                    g.to_dict() for g in result.get_grouped_impact_results_of(i)
+                ]
+                for i in impacts
+            },
+        }
+
+    trees: dict[str, dict[str, list[dict[str, Any]]]] = {}
+    for ref in upstream:
+        trees[_indicator_key(ref)] = _fetch_tree(result, ref, upstream_depth)
+    if len(trees) > 0:
+        with open(folder / "upstream.json", "w", encoding="utf-8") as f:
+            json.dump(trees, f)
+
+    with open(folder / "index.json", "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    return folder
+
+
+class SnapshotResult(ProtoResult):
+    """
+    Implements the read side of the result protocol against a snapshot
+    directory. The arrays are memory-mapped on first access and released
+    again when the snapshot result is disposed.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        with open(self.path / "index.json", "r", encoding="utf-8") as f:
+            self._index: dict[str, Any] = json.load(f)
+        if self._index.get("version") != _VERSION:
+            raise ValueError(f"unsupported snapshot version in {self.path}")
+        self._tech_flows = [
+            o.TechFlow.from_dict(d) for d in self._index["techFlows"]
+        ]
+        self._envi_flows = [
+            o.EnviFlow.from_dict(d) for d in self._index["enviFlows"]
+        ]
+        self._impacts = [
+            o.Ref.from_dict(d) for d in self._index["impactCategories"]
+        ]
+        self._tech_idx = {
+            tech_key(tf): i for i, tf in enumerate(self._tech_flows)
+        }
+        self._envi_idx = {
+            envi_key(ef): i for i, ef in enumerate(self._envi_flows)
+        }
+        self._impact_idx = {
+            cast(str, i.id): j for j, i in enumerate(self._impacts)
+        }
+        self._arrays: dict[str, np.ndarray] = {}
+        self._trees: dict[str, dict[str, list[dict[str, Any]]]] | None = None
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Returns the memory-mapped array with the given name, e.g.
+        `direct_interventions`.
+        """
+        a = self._arrays.get(name)
+        if a is not None:
+            return a
+        file = self.path / f"{name}.npy"
+        if not file.exists():
+            a = np.zeros(0, dtype=np.float64)
+        else:
+            a = np.load(file, mmap_mode="r")
+        self._arrays[name] = a
+        return a
+
+    @override
+    def get_state(self) -> o.ResultState:
+        return o.ResultState(id=str(self.path), is_ready=True)
+
+    @override
+    def simulate_next(self) -> o.ResultState:
+        return o.ResultState(
+            id=str(self.path), error="snapshots cannot be simulated"
+        )
+
+    @override
+    def dispose(self):
+        self._arrays.clear()
+        self._trees = None
+
+    @override
+    def get_demand(self) -> o.TechFlowValue | None:
+        d = self._index.get("demand")
+        return o.TechFlowValue.from_dict(d) if d else None
+
+    @override
+    def get_tech_flows(self) -> list[o.TechFlow]:
+        return list(self._tech_flows)
+
+    @override
+    def get_envi_flows(self) -> list[o.EnviFlow]:
+        return list(self._envi_flows)
+
+    @override
+    def get_impact_categories(self) -> list[o.Ref]:
+        return list(self._impacts)
+
+    # region: tech-flows
+
+    @override
+    def get_total_requirements(self) -> list[o.TechFlowValue]:
+        return self._tech_values(self.array("total_requirements"))
+
+    @override
+    def get_total_requirements_of(
+        self, tech_flow: o.TechFlow
+    ) -> o.TechFlowValue:
+        j = self._tech_idx.get(tech_key(tech_flow))
+        amount = 0.0
+        if j is not None:
+            amount = float(self.array("total_requirements")[j])
+        return o.TechFlowValue(amount=amount, tech_flow=tech_flow)
+
+    @override
+    def get_scaling_factors(self) -> list[o.TechFlowValue]:
+        return self._tech_values(self.array("scaling_factors"))
+
+    @override
+    def get_scaled_tech_flows_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.TechFlowValue]:
+        j = self._tech_idx.get(tech_key(tech_flow))
+        if j is None:
+            return []
+        s = float(self.array("scaling_factors")[j])
+        return [
+            o.TechFlowValue(amount=(v.amount or 0.0) * s, tech_flow=v.tech_flow)
+            for v in self.get_unscaled_tech_flows_of(tech_flow)
+        ]
+
+    @override
+    def get_unscaled_tech_flows_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.TechFlowValue]:
+        j = self._tech_idx.get(tech_key(tech_flow))
+        if j is None:
+            return []
+        # the entries are sorted by column, see `snapshot`
+        cols = self.array("tech_cols")
+        start, end = np.searchsorted(cols, [j, j + 1])
+        rows = self.array("tech_rows")
+        values = self.array("tech_values")
+        return [
+            o.TechFlowValue(
+                amount=float(values[i]), tech_flow=self._tech_flows[rows[i]]
+            )
+            for i in range(start, end)
+        ]
+
+    # endregion
+
+    # region: inventory results
+
+    @override
+    def get_total_flows(self) -> list[o.EnviFlowValue]:
+        return self._envi_values(self.array("total_flows"))
+
+    @override
+    def get_total_flow_value_of(self, envi_flow: o.EnviFlow) -> o.EnviFlowValue:
+        i = self._envi_idx.get(envi_key(envi_flow))
+        amount = 0.0
+        if i is not None:
+            amount = float(self.array("total_flows")[i])
+        return o.EnviFlowValue(amount=amount, envi_flow=envi_flow)
+
+    @override
+    def get_flow_contributions_of(
+        self, envi_flow: o.EnviFlow
+    ) -> list[o.TechFlowValue]:
+        i = self._envi_idx.get(envi_key(envi_flow))
+        if i is None:
+            return []
+        return self._tech_values(self.array("direct_interventions")[i, :])
+
+    @override
+    def get_direct_interventions_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.EnviFlowValue]:
+        return self._envi_column("direct_interventions", tech_flow)
+
+    @override
+    def get_direct_intervention_of(
+        self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
+    ) -> o.EnviFlowValue:
+        return self._envi_cell("direct_interventions", envi_flow, tech_flow)
+
+    @override
+    def get_flow_intensities_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.EnviFlowValue]:
+        return self._envi_column("flow_intensities", tech_flow)
+
+    @override
+    def get_flow_intensity_of(
+        self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
+    ) -> o.EnviFlowValue:
+        return self._envi_cell("flow_intensities", envi_flow, tech_flow)
+
+    @override
+    def get_total_interventions_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.EnviFlowValue]:
+        return self._envi_column("total_interventions", tech_flow)
+
+    @override
+    def get_total_intervention_of(
+        self, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
+    ) -> o.EnviFlowValue:
+        return self._envi_cell("total_interventions", envi_flow, tech_flow)
+
+    @override
+    def get_upstream_interventions_of(
+        self, envi_flow: o.EnviFlow, path: list[o.TechFlow] | str
+    ) -> list[o.UpstreamNode]:
+        return self._upstream_nodes(envi_flow, path)
+
+    @override
+    def get_grouped_flow_results_of(
+        self, envi_flow: o.EnviFlow
+    ) -> list[o.GroupValue]:
+        groups = self._index.get("groups", {}).get("flows", {})
+        return [
+            o.GroupValue.from_dict(d)
+            for d in groups.get(envi_key(envi_flow), [])
+        ]
+
+    # endregion
+
+    # region: impacts
+
+    @override
+    def get_total_impacts(self) -> list[o.ImpactValue]:
+        return self._impact_values(self.array("total_impacts"))
+
+    @override
+    def get_total_impact_value_of(
+        self, impact_category: o.Ref
+    ) -> o.ImpactValue:
+        return self._impact_value("total_impacts", impact_category)
+
+    @override
+    def get_normalized_impacts(self) -> list[o.ImpactValue]:
+        return self._impact_values(self.array("normalized_impacts"))
+
+    @override
+    def get_weighted_impacts(self) -> list[o.ImpactValue]:
+        return self._impact_values(self.array("weighted_impacts"))
+
+    @override
+    def get_impact_contributions_of(
+        self, impact_category: o.Ref
+    ) -> list[o.TechFlowValue]:
+        i = self._impact_idx.get(cast(str, impact_category.id))
+        if i is None:
+            return []
+        return self._tech_values(self.array("direct_impacts")[i, :])
+
+    @override
+    def get_direct_impacts_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.ImpactValue]:
+        return self._impact_column("direct_impacts", tech_flow)
+
+    @override
+    def get_direct_impact_of(
+        self, impact_category: o.Ref, tech_flow: o.TechFlow
+    ) -> o.ImpactValue:
+        return self._impact_cell("direct_impacts", impact_category, tech_flow)
+
+    @override
+    def get_impact_intensities_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.ImpactValue]:
+        return self._impact_column("impact_intensities", tech_flow)
+
+    @override
+    def get_impact_intensity_of(
+        self, impact_category: o.Ref, tech_flow: o.TechFlow
+    ) -> o.ImpactValue:
+        return self._impact_cell(
+            "impact_intensities", impact_category, tech_flow
+        )
+
+    @override
+    def get_total_impacts_of(
+        self, tech_flow: o.TechFlow
+    ) -> list[o.ImpactValue]:
+        return self._impact_column("total_impacts_of", tech_flow)
+
+    @override
+    def get_total_impact_of(
+        self, impact_category: o.Ref, tech_flow: o.TechFlow
+    ) -> o.ImpactValue:
+        return self._impact_cell("total_impacts_of", impact_category, tech_flow)
+
+    @override
+    def get_impact_factors_of(
+        self, impact_category: o.Ref
+    ) -> list[o.EnviFlowValue]:
+        i = self._impact_idx.get(cast(str, impact_category.id))
+        if i is None:
+            return []
+        return self._envi_values(self.array("impact_factors")[i, :])
+
+    @override
+    def get_impact_factor_of(
+        self, impact_category: o.Ref, envi_flow: o.EnviFlow
+    ) -> o.EnviFlowValue:
+        return self._factor_cell("impact_factors", impact_category, envi_flow)
+
+    @override
+    def get_flow_impacts_of(
+        self, impact_category: o.Ref
+    ) -> list[o.EnviFlowValue]:
+        i = self._impact_idx.get(cast(str, impact_category.id))
+        if i is None:
+            return []
+        return self._envi_values(self.array("flow_impacts")[i, :])
+
+    @override
+    def get_flow_impact_of(
+        self, impact_category: o.Ref, envi_flow: o.EnviFlow
+    ) -> o.EnviFlowValue:
+        return self._factor_cell("flow_impacts", impact_category, envi_flow)
+
+    @override
+    def get_upstream_impacts_of(
+        self, impact_category: o.Ref, path: list[o.TechFlow] | str
+    ) -> list[o.UpstreamNode]:
+        return self._upstream_nodes(impact_category, path)
+
+    @override
+    def get_grouped_impact_results_of(
+        self, impact: o.Ref
+    ) -> list[o.GroupValue]:
+        groups = self._index.get("groups", {}).get("impacts", {})
+        return [
+            o.GroupValue.from_dict(d)
+            for d in groups.get(cast(str, impact.id), [])
+        ]
+
+    # endregion
+
+    # region: costs
+
+    @override
+    def get_total_costs(self) -> o.CostValue:
+        return o.CostValue.from_dict(self._index["totalCosts"])
+
+    @override
+    def get_cost_contributions(self) -> list[o.TechFlowValue]:
+        return self._tech_values(self.array("direct_costs"))
+
+    @override
+    def get_direct_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
+        return self._cost_value("direct_costs", tech_flow)
+
+    @override
+    def get_cost_intensities_of(self, tech_flow: o.TechFlow) -> o.CostValue:
+        return self._cost_value("cost_intensities", tech_flow)
+
+    @override
+    def get_total_costs_of(self, tech_flow: o.TechFlow) -> o.CostValue:
+        return self._cost_value("total_costs_of", tech_flow)
+
+    @override
+    def get_upstream_costs_of(
+        self, path: list[o.TechFlow] | str
+    ) -> list[o.UpstreamNode]:
+        return self._upstream_nodes("costs", path)
+
+    @override
+    def get_grouped_cost_results(self) -> list[o.GroupValue]:
+        groups = self._index.get("groups", {}).get("costs", [])
+        return [o.GroupValue.from_dict(d) for d in groups]
+
+    # endregion
+
+    @override
+    def get_sankey_graph(self, config: o.SankeyRequest) -> o.SankeyGraph:
+        raise RuntimeError("Sankey graphs are not stored in result snapshots")
+
+    def _tech_values(self, amounts: np.ndarray) -> list[o.TechFlowValue]:
+        return [
+            o.TechFlowValue(amount=float(a), tech_flow=tf)
+            for a, tf in zip(amounts, self._tech_flows)
+        ]
+
+    def _envi_values(self, amounts: np.ndarray) -> list[o.EnviFlowValue]:
+        return [
+            o.EnviFlowValue(amount=float(a), envi_flow=ef)
+            for a, ef in zip(amounts, self._envi_flows)
+        ]
+
+    def _impact_values(self, amounts: np.ndarray) -> list[o.ImpactValue]:
+        return [
+            o.ImpactValue(amount=float(a), impact_category=i)
+            for a, i in zip(amounts, self._impacts)
+        ]
+
+    def _envi_column(
+        self, name: str, tech_flow: o.TechFlow
+    ) -> list[o.EnviFlowValue]:
+        j = self._tech_idx.get(tech_key(tech_flow))
+        if j is None:
+            return []
+        return self._envi_values(self.array(name)[:, j])
+
+    def _impact_column(
+        self, name: str, tech_flow: o.TechFlow
+    ) -> list[o.ImpactValue]:
+        j = self._tech_idx.get(tech_key(tech_flow))
+        if j is None:
+            return []
+        return self._impact_values(self.array(name)[:, j])
+
+    def _envi_cell(
+        self, name: str, envi_flow: o.EnviFlow, tech_flow: o.TechFlow
+    ) -> o.EnviFlowValue:
+        i = self._envi_idx.get(envi_key(envi_flow))
+        j = self._tech_idx.get(tech_key(tech_flow))
+        amount = 0.0
+        if i is not None and j is not None:
+            amount = float(self.array(name)[i, j])
+        return o.EnviFlowValue(amount=amount, envi_flow=envi_flow)
+
+    def _impact_cell(
+        self, name: str, impact: o.Ref, tech_flow: o.TechFlow
+    ) -> o.ImpactValue:
+        i = self._impact_idx.get(cast(str, impact.id))
+        j = self._tech_idx.get(tech_key(tech_flow))
+        amount = 0.0
+        if i is not None and j is not None:
+            amount = float(self.array(name)[i, j])
+        return o.ImpactValue(amount=amount, impact_category=impact)
+
+    def _factor_cell(
+        self, name: str, impact: o.Ref, envi_flow: o.EnviFlow
+    ) -> o.EnviFlowValue:
+        i = self._impact_idx.get(cast(str, impact.id))
+        j = self._envi_idx.get(envi_key(envi_flow))
+        amount = 0.0
+        if i is not None and j is not None:
+            amount = float(self.array(name)[i, j])
+        return o.EnviFlowValue(amount=amount, envi_flow=envi_flow)
+
+    def _impact_value(self, name: str, impact: o.Ref) -> o.ImpactValue:
+        i = self._impact_idx.get(cast(str, impact.id))
+        amount = 0.0
+        if i is not None:
+            amount = float(self.array(name)[i])
+        return o.ImpactValue(amount=amount, impact_category=impact)
+
+    def _cost_value(self, name: str, tech_flow: o.TechFlow) -> o.CostValue:
+        j = self._tech_idx.get(tech_key(tech_flow))
+        currency = self._index["totalCosts"].get("currency")
+        amount = 0.0
+        if j is not None:
+            amount = float(self.array(name)[j])
+        return o.CostValue(
+            amount=amount,
+            currency=o.Ref.from_dict(currency) if currency else None,
+        )
+
+    def _upstream_nodes(
+        self, ref: _Ref, path: list[o.TechFlow] | str
+    ) -> list[o.UpstreamNode]:
+        if self._trees is None:
+            file = self.path / "upstream.json"
+            if not file.exists():
+                self._trees = {}
+            else:
+                with open(file, "r", encoding="utf-8") as f:
+                    self._trees = json.load(f)
+        tree = self._trees.get(_indicator_key(ref))
+        if tree is None:
+            log.warning("no upstream tree stored for %s", _indicator_key(ref))
+            return []
+        nodes = tree.get(_path_key(path))
+        if nodes is None:
+            return []
+        return [o.UpstreamNode.from_dict(d) for d in nodes]
+
+
+def _fetch_tree(
+    result: ProtoResult, ref: _Ref, max_depth: int
+) -> dict[str, list[dict[str, Any]]]:
+    tree: dict[str, list[dict[str, Any]]] = {}
+    queue: list[list[o.TechFlow]] = [[]]
+    while len(queue) > 0:
+        path = queue.pop()
+        if ref == "costs":
+            nodes = result.get_upstream_costs_of(path)
+        elif isinstance(ref, o.EnviFlow):
+            nodes = result.get_upstream_interventions_of(ref, path)
+        else:
+            nodes = result.get_upstream_impacts_of(ref, path)
+        tree[_path_key(path)] = [n.to_dict() for n in nodes]
+        if len(path) >= max_depth:
+            continue
+        for node in nodes:
+            queue.append(path + [cast(o.TechFlow, node.tech_flow)])
+    return tree
+
+
+def _save_vector(
+    file: Path, size: int, index: dict[str, int], values: list[Any]
+):
+    vector = np.zeros(size, dtype=np.float64)
+    for v in values:
+        i = index.get(_key_of(v))
+        if i is not None:
+            vector[i] = _amount(v)
+    np.save(file, vector)
+
+
+def _put_column(
+    matrix: np.ndarray, j: int, index: dict[str, int], values: list[Any]
+):
+    for v in values:
+        i = index.get(_key_of(v))
+        if i is not None:
+            matrix[i, j] = _amount(v)
+
+
+def _put_row(
+    matrix: np.ndarray, i: int, index: dict[str, int], values: list[Any]
+):
+    for v in values:
+        j = index.get(_key_of(v))
+        if j is not None:
+            matrix[i, j] = _amount(v)
+
+
+def _key_of(value: Any) -> str:
+    if isinstance(value, o.TechFlowValue):
+        return tech_key(cast(o.TechFlow, value.tech_flow))
+    if isinstance(value, o.EnviFlowValue):
+        return envi_key(cast(o.EnviFlow, value.envi_flow))
+    if isinstance(value, o.ImpactValue):
+        return cast(str, cast(o.Ref, value.impact_category).id)
+    return ""
+
+
+def _amount(value: Any) -> float:
+    if value is None or value.amount is None:
+        return 0.0
+    return float(value.amount)
+
+
+def _dict_of(value: Any) -> dict[str, Any] | None:
+    return value.to_dict() if value is not None else None
+
+
+def _indicator_key(ref: _Ref) -> str:
+    if ref == "costs":
+        return "costs"
+    if isinstance(ref, o.EnviFlow):
+        return "flow:" + envi_key(ref)
+    if isinstance(ref, o.Ref):
+        return "impact:" + cast(str, ref.id)
+    raise ValueError("unsupported reference type for upstream results: " + ref)
+
+
+def _path_key(path: list[o.TechFlow] | str) -> str:
+    if isinstance(path, str):
+        return path
+    return "/".join(tech_key(tf) for tf in path)
@@ -0,0 +1,928 @@
+"""
+A local stand-in for an openLCA IPC server.
+
+The stand-in server implements the JSON-RPC methods of `ipc.Client` and the
+REST routes of `RestClient` on synthetic data of a configurable size, so that
+the client overhead can be measured without an openLCA instance:
+
+```python
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+model = SyntheticModel(tech_flows=1000, envi_flows=200, impacts=20)
+with StandInServer(model, latency=0.002) as server:
+    client = server.ipc_client()  # or server.rest_client()
+    result = client.calculate(o.CalculationSetup())
+    impacts = result.get_total_impacts()
+```
+
+The technology matrix of the synthetic model is lower triangular with a unit
+diagonal: a process only takes inputs from processes with a higher index.
+Thus, all results can be calculated with simple substitutions in pure
+Python. The demand is always one unit of the first tech. flow; the targets
+of the calculation setups are ignored. Costs are always zero and Sankey
+graphs are not supported.
+"""
+
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+from .ipc import Client
+from .rest import RestClient
+
+_Args = tuple[str, ...]
+
+
+class SyntheticModel:
+    """
+    A random, but reproducible, product system with the given number of tech.
+    flows, envi. flows, and impact categories. Each process has `links`
+    inputs from other processes (when possible) and `interventions` envi.
+    flows; each impact category has factors for the given share of the envi.
+    flows.
+    """
+
+    def __init__(
+        self,
+        tech_flows: int = 100,
+        envi_flows: int = 50,
+        impacts: int = 10,
+        links: int = 3,
+        interventions: int = 5,
+        factor_share: float = 0.5,
+        seed: int = 42,
+    ):
+        rand = random.Random(seed)
+
+        def uid() -> str:
+            return str(uuid.UUID(int=rand.getrandbits(128), version=4))
+
+        self.tech_flows: list[dict[str, Any]] = []
+        for j in range(tech_flows):
+            self.tech_flows.append(
+                {
+                    "provider": {
+                        "@type": "Process",
+                        "@id": uid(),
+                        "name": f"process {j}",
+                        "processType": "UNIT_PROCESS",
+                    },
+                    "flow": {
+                        "@type": "Flow",
+                        "@id": uid(),
+                        "name": f"product {j}",
+                        "flowType": "PRODUCT_FLOW",
+                        "refUnit": "kg",
+                    },
+                }
+            )
+        self.envi_flows: list[dict[str, Any]] = []
+        for i in range(envi_flows):
+            self.envi_flows.append(
+                {
+                    "flow": {
+                        "@type": "Flow",
+                        "@id": uid(),
+                        "name": f"emission {i}",
+                        "flowType": "ELEMENTARY_FLOW",
+                        "refUnit": "kg",
+                    },
+                    "isInput": False,
+                }
+            )
+        self.impacts: list[dict[str, Any]] = []
+        for k in range(impacts):
+            self.impacts.append(
+                {
+                    "@type": "ImpactCategory",
+                    "@id": uid(),
+                    "name": f"impact {k}",
+                    "refUnit": "kg eq.",
+                }
+            )
+
+        # inputs[j] = [(i, a)] with A[i, j] = -a and i > j
+        self.inputs: list[list[tuple[int, float]]] = []
+        for j in range(tech_flows):
+            candidates = range(j + 1, tech_flows)
+            count = min(links, len(candidates))
+            providers = rand.sample(candidates, count) if count > 0 else []
+            share = 1 / max(1, count)
+            self.inputs.append(
+                [(i, rand.uniform(0.05, 0.5) * share) for i in providers]
+            )
+        # emissions[j] = [(e, b)] with B[e, j] = b
+        self.emissions: list[list[tuple[int, float]]] = []
+        for _ in range(tech_flows):
+            count = min(interventions, envi_flows)
+            self.emissions.append(
+                [
+                    (e, rand.uniform(0.1, 10))
+                    for e in rand.sample(range(envi_flows), count)
+                ]
+            )
+        # factors[k] = [(e, c)] with C[k, e] = c
+        self.factors: list[list[tuple[int, float]]] = []
+        for _ in range(impacts):
+            count = max(1, int(envi_flows * factor_share)) if envi_flows else 0
+            self.factors.append(
+                [
+                    (e, rand.uniform(0.1, 100))
+                    for e in rand.sample(range(envi_flows), count)
+                ]
+            )
+
+        self.tech_index = {
+            f"{tf['provider']['@id']}::{tf['flow']['@id']}": j
+            for j, tf in enumerate(self.tech_flows)
+        }
+        self.envi_index = {
+            ef["flow"]["@id"]: i for i, ef in enumerate(self.envi_flows)
+        }
+        self.impact_index = {
+            impact["@id"]: k for k, impact in enumerate(self.impacts)
+        }
+
+        self.scaling = self.solve(0)
+        self.total_flows = self.interventions_of(self.scaling)
+        self.total_impacts = self.impacts_of(self.total_flows)
+        self._intensities: dict[int, list[float]] = {}
+        self._upstream: dict[str, list[float]] = {}
+
+    @property
+    def size(self) -> tuple[int, int, int]:
+        return len(self.tech_flows), len(self.envi_flows), len(self.impacts)
+
+    def solve(self, j: int) -> list[float]:
+        """Solves `A x = e_j` by forward substitution."""
+        x = [0.0] * len(self.tech_flows)
+        x[j] = 1.0
+        for col in range(j, len(x)):
+            xc = x[col]
+            if xc == 0:
+                continue
+            for i, a in self.inputs[col]:
+                x[i] += a * xc
+        return x
+
+    def interventions_of(self, s: list[float]) -> list[float]:
+        """Returns `B s`."""
+        g = [0.0] * len(self.envi_flows)
+        for j, sj in enumerate(s):
+            if sj == 0:
+                continue
+            for e, b in self.emissions[j]:
+                g[e] += b * sj
+        return g
+
+    def impacts_of(self, g: list[float]) -> list[float]:
+        """Returns `C g`."""
+        return [sum(c * g[e] for e, c in row) for row in self.factors]
+
+    def intensities_of(self, j: int) -> list[float]:
+        """Returns the column `j` of `M = B A^-1`."""
+        m = self._intensities.get(j)
+        if m is None:
+            m = self.interventions_of(self.solve(j))
+            self._intensities[j] = m
+        return m
+
+    def direct_of(self, j: int) -> list[float]:
+        """Returns the scaled column `j` of `B`."""
+        g = [0.0] * len(self.envi_flows)
+        for e, b in self.emissions[j]:
+            g[e] = b * self.scaling[j]
+        return g
+
+    def upstream_totals(self, key: str, direct: list[float]) -> list[float]:
+        """
+        Returns the total results per unit of the tech. flows for the given
+        direct results per unit, `t = d A^-1`, by backward substitution.
+        """
+        t = self._upstream.get(key)
+        if t is not None:
+            return t
+        t = list(direct)
+        for j in range(len(t) - 1, -1, -1):
+            for i, a in self.inputs[j]:
+                t[j] += a * t[i]
+        self._upstream[key] = t
+        return t
+
+    def direct_row(self, envi: int | None, impact: int | None) -> list[float]:
+        """
+        Returns the direct results per unit of the tech. flows for an envi.
+        flow or impact category, a row of `B` or `C B`.
+        """
+        d = [0.0] * len(self.tech_flows)
+        if envi is None and impact is None:
+            return d
+        factors = dict(self.factors[impact]) if impact is not None else None
+        for j, emissions in enumerate(self.emissions):
+            for e, b in emissions:
+                if factors is None:
+                    if e == envi:
+                        d[j] += b
+                else:
+                    d[j] += b * factors.get(e, 0.0)
+        return d
+
+
+class _Result:
+    """Implements the result queries on the synthetic model."""
+
+    def __init__(self, model: SyntheticModel, uid: str):
+        self.model = model
+        self.uid = uid
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "@id": self.uid,
+            "isReady": True,
+            "isScheduled": False,
+            "time": int(time.time() * 1000),
+        }
+
+    def call(self, op: str, args: dict[str, Any]) -> Any:
+        handler = _OPS.get(op)
+        if handler is None:
+            raise KeyError(f"unknown method: {op}")
+        return handler[1](self, **args)
+
+    # region: helpers
+
+    def _tf(self, j: int, amount: float) -> dict[str, Any]:
+        return {"techFlow": self.model.tech_flows[j], "amount": amount}
+
+    def _ef(self, e: int, amount: float) -> dict[str, Any]:
+        return {"enviFlow": self.model.envi_flows[e], "amount": amount}
+
+    def _iv(self, k: int, amount: float) -> dict[str, Any]:
+        return {"impactCategory": self.model.impacts[k], "amount": amount}
+
+    def _tfs(self, values: list[float]) -> list[dict[str, Any]]:
+        return [self._tf(j, v) for j, v in enumerate(values)]
+
+    def _efs(self, values: list[float]) -> list[dict[str, Any]]:
+        return [self._ef(e, v) for e, v in enumerate(values) if v != 0]
+
+    def _ivs(self, values: list[float]) -> list[dict[str, Any]]:
+        return [self._iv(k, v) for k, v in enumerate(values)]
+
+    def _upstream(
+        self, key: str, envi: int | None, impact: int | None, path: Any
+    ) -> list[dict[str, Any]]:
+        m = self.model
+        direct = m.direct_row(envi, impact)
+        totals = m.upstream_totals(key, direct)
+
+        def node(j: int, amount: float) -> dict[str, Any]:
+            return {
+                "techFlow": m.tech_flows[j],
+                "result": totals[j] * amount,
+                "directContribution": direct[j] * amount,
+                "requiredAmount": amount,
+            }
+
+        segments = [s for s in (path or "").split("/") if s]
+        if len(segments) == 0:
+            return [node(0, 1.0)]
+        j = m.tech_index.get(segments[0])
+        if j is None:
+            return []
+        amount = 1.0
+        for segment in segments[1:]:
+            i = m.tech_index.get(segment)
+            a = next((a for k, a in m.inputs[j] if k == i), None)
+            if i is None or a is None:
+                return []
+            amount *= a
+            j = i
+        return [node(i, a * amount) for i, a in m.inputs[j]]
+
+    # endregion
+
+    def demand(self):
+        return self._tf(0, 1.0)
+
+    def tech_flows(self):
+        return self.model.tech_flows
+
+    def envi_flows(self):
+        return self.model.envi_flows
+
+    def impact_categories(self):
+        return self.model.impacts
+
+    def total_requirements(self):
+        return self._tfs(self.model.scaling)
+
+    def total_requirements_of(self, tech: int):
+        return self._tf(tech, self.model.scaling[tech])
+
+    def scaling_factors(self):
+        return self._tfs(self.model.scaling)
+
+    def scaled_tech_flows_of(self, tech: int):
+        s = self.model.scaling[tech]
+        return self._unscaled(tech, s)
+
+    def unscaled_tech_flows_of(self, tech: int):
+        return self._unscaled(tech, 1.0)
+
+    def _unscaled(self, tech: int, factor: float):
+        values = [self._tf(tech, factor)]
+        for i, a in self.model.inputs[tech]:
+            values.append(self._tf(i, -a * factor))
+        return values
+
+    def total_flows(self):
+        return self._efs(self.model.total_flows)
+
+    def total_flow_value_of(self, envi: int):
+        return self._ef(envi, self.model.total_flows[envi])
+
+    def flow_contributions_of(self, envi: int):
+        m = self.model
+        values = []
+        for j, emissions in enumerate(m.emissions):
+            b = sum(v for e, v in emissions if e == envi)
+            values.append(self._tf(j, b * m.scaling[j]))
+        return values
+
+    def direct_interventions_of(self, tech: int):
+        return self._efs(self.model.direct_of(tech))
+
+    def direct_intervention_of(self, envi: int, tech: int):
+        return self._ef(envi, self.model.direct_of(tech)[envi])
+
+    def flow_intensities_of(self, tech: int):
+        return self._efs(self.model.intensities_of(tech))
+
+    def flow_intensity_of(self, envi: int, tech: int):
+        return self._ef(envi, self.model.intensities_of(tech)[envi])
+
+    def total_interventions_of(self, tech: int):
+        s = self.model.scaling[tech]
+        return self._efs([v * s for v in self.model.intensities_of(tech)])
+
+    def total_intervention_of(self, envi: int, tech: int):
+        s = self.model.scaling[tech]
+        return self._ef(envi, self.model.intensities_of(tech)[envi] * s)
+
+    def upstream_interventions_of(self, envi: int, path: Any = None):
+        return self._upstream(f"e{envi}", envi, None, path)
+
+    def total_impacts(self):
+        return self._ivs(self.model.total_impacts)
+
+    def total_impact_value_of(self, impact: int):
+        return self._iv(impact, self.model.total_impacts[impact])
+
+    def impact_contributions_of(self, impact: int):
+        m = self.model
+        factors = dict(m.factors[impact])
+        values = []
+        for j, emissions in enumerate(m.emissions):
+            v = sum(b * factors.get(e, 0.0) for e, b in emissions)
+            values.append(self._tf(j, v * m.scaling[j]))
+        return values
+
+    def direct_impacts_of(self, tech: int):
+        return self._ivs(self.model.impacts_of(self.model.direct_of(tech)))
+
+    def direct_impact_of(self, impact: int, tech: int):
+        return self.direct_impacts_of(tech)[impact]
+
+    def impact_intensities_of(self, tech: int):
+        return self._ivs(self.model.impacts_of(self.model.intensities_of(tech)))
+
+    def impact_intensity_of(self, impact: int, tech: int):
+        return self.impact_intensities_of(tech)[impact]
+
+    def total_impacts_of(self, tech: int):
+        s = self.model.scaling[tech]
+        m = self.model.impacts_of(self.model.intensities_of(tech))
+        return self._ivs([v * s for v in m])
+
+    def total_impact_of(self, impact: int, tech: int):
+        return self.total_impacts_of(tech)[impact]
+
+    def impact_factors_of(self, impact: int):
+        return [self._ef(e, c) for e, c in self.model.factors[impact]]
+
+    def impact_factor_of(self, impact: int, envi: int):
+        c = dict(self.model.factors[impact]).get(envi, 0.0)
+        return self._ef(envi, c)
+
+    def flow_impacts_of(self, impact: int):
+        g = self.model.total_flows
+        return [self._ef(e, c * g[e]) for e, c in self.model.factors[impact]]
+
+    def flow_impact_of(self, impact: int, envi: int):
+        c = dict(self.model.factors[impact]).get(envi, 0.0)
+        return self._ef(envi, c * self.model.total_flows[envi])
+
+    def upstream_impacts_of(self, impact: int, path: Any = None):
+        return self._upstream(f"i{impact}", None, impact, path)
+
+    def total_costs(self):
+        return {"amount": 0.0}
+
+    def cost_contributions(self):
+        return self._tfs([0.0] * len(self.model.tech_flows))
+
+    def direct_costs_of(self, tech: int):
+        return {"amount": 0.0}
+
+    def cost_intensities_of(self, tech: int):
+        return {"amount": 0.0}
+
+    def total_costs_of(self, tech: int):
+        return {"amount": 0.0}
+
+    def upstream_costs_of(self, path: Any = None):
+        return self._upstream("costs", None, None, path)
+
+    def grouped_results(self, **_):
+        return []
+
+
+# the result operations with the types of their REST path arguments
+_OPS: dict[str, tuple[_Args, Callable[..., Any]]] = {
+    "demand": ((), _Result.demand),
+    "tech-flows": ((), _Result.tech_flows),
+    "envi-flows": ((), _Result.envi_flows),
+    "impact-categories": ((), _Result.impact_categories),
+    "total-requirements": ((), _Result.total_requirements),
+    "total-requirements-of": (("tech",), _Result.total_requirements_of),
+    "scaling-factors": ((), _Result.scaling_factors),
+    "scaled-tech-flows-of": (("tech",), _Result.scaled_tech_flows_of),
+    "unscaled-tech-flows-of": (("tech",), _Result.unscaled_tech_flows_of),
+    "total-flows": ((), _Result.total_flows),
+    "total-flow-value-of": (("envi",), _Result.total_flow_value_of),
+    "flow-contributions-of": (("envi",), _Result.flow_contributions_of),
+    "direct-interventions-of": (("tech",), _Result.direct_interventions_of),
+    "direct-intervention-of": (
+        ("envi", "tech"),
+        _Result.direct_intervention_of,
+    ),
+    "flow-intensities-of": (("tech",), _Result.flow_intensities_of),
+    "flow-intensity-of": (("envi", "tech"), _Result.flow_intensity_of),
+    "total-interventions-of": (("tech",), _Result.total_interventions_of),
+    "total-intervention-of": (
+        ("envi", "tech"),
+        _Result.total_intervention_of,
+    ),
+    "upstream-interventions-of": (
+        ("envi",),
+        _Result.upstream_interventions_of,
+    ),
+    "grouped-flow-results-of": (("envi",), _Result.grouped_results),
+    "total-impacts": ((), _Result.total_impacts),
+    "normalized-impacts": ((), _Result.total_impacts),
+    "weighted-impacts": ((), _Result.total_impacts),
+    "total-impact-value-of": (("impact",), _Result.total_impact_value_of),
+    "impact-contributions-of": (("impact",), _Result.impact_contributions_of),
+    "direct-impacts-of": (("tech",), _Result.direct_impacts_of),
+    "direct-impact-of": (("impact", "tech"), _Result.direct_impact_of),
+    "impact-intensities-of": (("tech",), _Result.impact_intensities_of),
+    "impact-intensity-of": (("impact", "tech"), _Result.impact_intensity_of),
+    "total-impacts-of": (("tech",), _Result.total_impacts_of),
+    "total-impact-of": (("impact", "tech"), _Result.total_impact_of),
+    "impact-factors-of": (("impact",), _Result.impact_factors_of),
+    "impact-factor-of": (("impact", "envi"), _Result.impact_factor_of),
+    "flow-impacts-of": (("impact",), _Result.flow_impacts_of),
+    "flow-impact-of": (("impact", "envi"), _Result.flow_impact_of),
+    "upstream-impacts-of": (("impact",), _Result.upstream_impacts_of),
+    "grouped-impact-results-of": (("impact",), _Result.grouped_results),
+    "total-costs": ((), _Result.total_costs),
+    "cost-contributions": ((), _Result.cost_contributions),
+    "direct-costs-of": (("tech",), _Result.direct_costs_of),
+    "cost-intensities-of": (("tech",), _Result.cost_intensities_of),
+    "total-costs-of": (("tech",), _Result.total_costs_of),
+    "upstream-costs-of": ((), _Result.upstream_costs_of),
+    "grouped-cost-results": ((), _Result.grouped_results),
+}
+
+# JSON-RPC methods that have another name than the REST route
+_RPC_ALIASES = {
+    "total-impacts/normalized": "normalized-impacts",
+    "total-impacts/weighted": "weighted-impacts",
+    "total-impacts-of-one": "impact-intensities-of",
+}
+
+
+class _Error(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class StandInServer:
+    """
+    Serves the synthetic model over HTTP on localhost, for both protocols.
+    The `latency` in seconds is added to each response; it can also be a
+    function that returns the latency for a method or route.
+    """
+
+    def __init__(
+        self,
+        model: SyntheticModel | None = None,
+        port: int = 0,
+        latency: float | Callable[[str], float] = 0.0,
+    ):
+        self.model = model or SyntheticModel()
+        self.latency = latency
+        self.results: dict[str, _Result] = {}
+        self.entities: dict[str, dict[str, Any]] = {}
+        self.files: dict[str, dict[str, bytes]] = {}
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self._http.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self._http.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "StandInServer":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._http.serve_forever, daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._http.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._http.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def ipc_client(self, **kwargs) -> Client:
+        return Client(self.url, **kwargs)
+
+    def rest_client(self, **kwargs) -> RestClient:
+        return RestClient(self.url, **kwargs)
+
+    def _wait(self, key: str):
+        latency = self.latency(key) if callable(self.latency) else self.latency
+        if latency > 0:
+            time.sleep(latency)
+
+    # region: data
+
+    def _descriptors(self, type_name: str) -> list[dict[str, Any]]:
+        m = self.model
+        match type_name:
+            case "Process":
+                return [tf["provider"] for tf in m.tech_flows]
+            case "Flow":
+                return [tf["flow"] for tf in m.tech_flows] + [
+                    ef["flow"] for ef in m.envi_flows
+                ]
+            case "ImpactCategory":
+                return m.impacts
+        return [
+            e for e in self.entities.values() if e.get("@type") == type_name
+        ]
+
+    def _get_entity(
+        self, type_name: str, uid: str | None, name: str | None = None
+    ) -> dict[str, Any]:
+        stored = self.entities.get(uid or "")
+        if stored is not None:
+            return stored
+        for d in self._descriptors(type_name):
+            if d["@id"] == uid or (name is not None and d.get("name") == name):
+                return d
+        raise _Error(404, f"{type_name} {uid or name} not found")
+
+    def _put(self, entity: dict[str, Any]) -> dict[str, Any]:
+        uid = entity.get("@id") or str(uuid.uuid4())
+        entity["@id"] = uid
+        with self._lock:
+            self.entities[uid] = entity
+        return _ref_of(entity)
+
+    def _delete(self, type_name: str, uid: str) -> dict[str, Any]:
+        with self._lock:
+            entity = self.entities.pop(uid, None)
+        if entity is None:
+            raise _Error(404, f"{type_name} {uid} not found")
+        return _ref_of(entity)
+
+    def _put_source_file(self, params: dict[str, Any]) -> str:
+        source_id = (params.get("source") or {}).get("@id")
+        file = params.get("file") or {}
+        if not source_id or not file.get("name"):
+            raise _Error(400, "no source or file name given")
+        content = base64.b64decode(file.get("content") or "")
+        with self._lock:
+            self.files.setdefault(source_id, {})[file["name"]] = content
+        return "ok"
+
+    def _calculate(self) -> dict[str, Any]:
+        r = _Result(self.model, str(uuid.uuid4()))
+        with self._lock:
+            self.results[r.uid] = r
+        return r.state()
+
+    def _result(self, uid: str) -> _Result:
+        r = self.results.get(uid)
+        if r is None:
+            raise _Error(404, f"no result with ID {uid}")
+        return r
+
+    def _providers(self, flow_id: str | None) -> list[dict[str, Any]]:
+        if not flow_id:
+            return self.model.tech_flows
+        return [
+            tf for tf in self.model.tech_flows if tf["flow"]["@id"] == flow_id
+        ]
+
+    def _dispose(self, uid: str) -> dict[str, Any]:
+        with self._lock:
+            r = self.results.pop(uid, None)
+        return {"@id": uid, "isReady": False} if r is None else r.state()
+
+    # endregion
+
+    # region: JSON-RPC
+
+    def rpc(self, method: str, params: Any) -> Any:
+        params = params or {}
+        match method:
+            case "data/get":
+                return self._get_entity(
+                    params.get("@type"), params.get("@id"), params.get("name")
+                )
+            case "data/get/all" | "data/get/descriptors":
+                return self._descriptors(params.get("@type"))
+            case "data/get/descriptor":
+                return _ref_of(
+                    self._get_entity(
+                        params.get("@type"),
+                        params.get("@id"),
+                        params.get("name"),
+                    )
+                )
+            case "data/get/providers":
+                return self._providers(params.get("@id"))
+            case "data/get/parameters":
+                return []
+            case "data/put":
+                return self._put(params)
+            case "data/put/source-file":
+                return self._put_source_file(params)
+            case "data/delete":
+                return self._delete(params.get("@type"), params.get("@id"))
+            case "result/calculate" | "result/simulate":
+                return self._calculate()
+            case "result/state" | "result/simulate/next":
+                return self._result(params.get("@id")).state()
+            case "result/dispose":
+                return self._dispose(params.get("@id"))
+        if not method.startswith("result/"):
+            raise _Error(404, f"unknown method: {method}")
+        op = method[7:]
+        op = _RPC_ALIASES.get(op, op)
+        spec = _OPS.get(op)
+        if spec is None:
+            raise _Error(404, f"unknown method: {method}")
+        r = self._result(params.get("@id"))
+        args: dict[str, Any] = {}
+        for arg in spec[0]:
+            args[arg] = self._index_of(arg, params)
+        if "path" in params:
+            args["path"] = params["path"]
+        return r.call(op, args)
+
+    def _index_of(self, arg: str, params: dict[str, Any]) -> int:
+        m = self.model
+        match arg:
+            case "tech":
+                tf = params.get("techFlow") or {}
+                key = (
+                    f"{(tf.get('provider') or {}).get('@id')}::"
+                    f"{(tf.get('flow') or {}).get('@id')}"
+                )
+                index = m.tech_index.get(key)
+            case "envi":
+                ef = params.get("enviFlow") or {}
+                index = m.envi_index.get((ef.get("flow") or {}).get("@id"))
+            case _:
+                imp = params.get("impactCategory") or {}
+                index = m.impact_index.get(imp.get("@id"))
+        if index is None:
+            raise _Error(400, f"invalid {arg} parameter")
+        return index
+
+    # endregion
+
+    # region: REST
+
+    def rest(self, verb: str, path: str, body: Any) -> Any:
+        segments = [s for s in path.split("?", 1)[0].split("/") if s]
+        if len(segments) == 0:
+            raise _Error(404, "no route")
+        if segments[0] == "data":
+            return self._rest_data(verb, segments[1:], body)
+        if segments[0] != "result":
+            raise _Error(404, f"unknown route: {path}")
+        rest = segments[1:]
+        if rest in (["calculate"], ["simulate"]):
+            return self._calculate()
+        if len(rest) < 2:
+            raise _Error(404, f"unknown route: {path}")
+        uid, op, args = rest[0], rest[1], rest[2:]
+        match op:
+            case "state":
+                return self._result(uid).state()
+            case "simulate":
+                return self._result(uid).state()
+            case "dispose":
+                return self._dispose(uid)
+        spec = _OPS.get(op)
+        if spec is None or len(spec[0]) != len(args):
+            raise _Error(404, f"unknown route: {path}")
+        r = self._result(uid)
+        kwargs: dict[str, Any] = {}
+        for arg, value in zip(spec[0], args):
+            kwargs[arg] = self._rest_index_of(arg, value)
+        if isinstance(body, dict) and "path" in body:
+            kwargs["path"] = body["path"]
+        return r.call(op, kwargs)
+
+    def _rest_index_of(self, arg: str, value: str) -> int:
+        m = self.model
+        match arg:
+            case "tech":
+                index = m.tech_index.get(value)
+            case "envi":
+                index = m.envi_index.get(value.split("::", 1)[0])
+            case _:
+                index = m.impact_index.get(value)
+        if index is None:
+            raise _Error(400, f"invalid {arg} parameter: {value}")
+        return index
+
+    def _rest_data(self, verb: str, segments: list[str], body: Any) -> Any:
+        if len(segments) == 0:
+            raise _Error(404, "no route")
+        if segments[0] == "providers":
+            return self._providers(segments[1] if len(segments) > 1 else None)
+        if segments[0] == "put-source-file":
+            return self._put_source_file(body)
+        if segments[0] == "create-system":
+            raise _Error(501, f"{segments[0]} is not supported")
+        type_name = _TYPES.get(segments[0])
+        if type_name is None:
+            raise _Error(404, f"unknown type: {segments[0]}")
+        rest = segments[1:]
+        if verb == "PUT":
+            return self._put(body)
+        if verb == "DELETE" and len(rest) == 1:
+            return self._delete(type_name, rest[0])
+        if len(rest) == 0:
+            return [_ref_of(d) for d in self._descriptors(type_name)]
+        if rest == ["all"]:
+            return self._descriptors(type_name)
+        if rest[0] == "name" and len(rest) >= 2:
+            entity = self._get_entity(type_name, None, rest[1])
+        else:
+            entity = self._get_entity(type_name, rest[0])
+        if rest[-1] == "info":
+            return _ref_of(entity)
+        if rest[-1] == "parameters":
+            return []
+        return entity
+
+    # endregion
+
+
+_TYPES = {
+    "actors": "Actor",
+    "currencies": "Currency",
+    "dq-systems": "DQSystem",
+    "epds": "Epd",
+    "flows": "Flow",
+    "flow-properties": "FlowProperty",
+    "impact-categories": "ImpactCategory",
+    "impact-methods": "ImpactMethod",
+    "locations": "Location",
+    "parameters": "Parameter",
+    "processes": "Process",
+    "product-systems": "ProductSystem",
+    "projects": "Project",
+    "results": "Result",
+    "social-indicators": "SocialIndicator",
+    "sources": "Source",
+    "unit-groups": "UnitGroup",
+    # the delete routes of the REST client
+    "actor": "Actor",
+    "currency": "Currency",
+    "d-q-system": "DQSystem",
+    "epd": "Epd",
+    "flow": "Flow",
+    "flow-property": "FlowProperty",
+    "impact-category": "ImpactCategory",
+    "impact-method": "ImpactMethod",
+    "location": "Location",
+    "parameter": "Parameter",
+    "process": "Process",
+    "product-system": "ProductSystem",
+    "project": "Project",
+    "result": "Result",
+    "social-indicator": "SocialIndicator",
+    "source": "Source",
+    "unit-group": "UnitGroup",
+}
+
+
+def _ref_of(entity: dict[str, Any]) -> dict[str, Any]:
+    ref = {"@type": entity.get("@type"), "@id": entity.get("@id")}
+    for field in ("name", "version", "lastChange"):
+        if field in entity:
+            ref[field] = entity[field]
+    return ref
+
+
+def _handler(server: StandInServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _body(self) -> Any:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length == 0:
+                return None
+            return json.loads(self.rfile.read(length))
+
+        def _send(self, status: int, data: Any):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _rest(self, verb: str):
+            path = self.path.lstrip("/")
+            try:
+                body = self._body()
+                server._wait(f"{verb} {path}")
+                self._send(200, server.rest(verb, path, body))
+            except _Error as e:
+                self._send(e.status, e.message)
+            except Exception as e:
+                self._send(500, str(e))
+
+        def do_GET(self):
+            self._rest("GET")
+
+        def do_PUT(self):
+            self._rest("PUT")
+
+        def do_DELETE(self):
+            self._rest("DELETE")
+
+        def do_POST(self):
+            if self.path not in ("", "/"):
+                self._rest("POST")
+                return
+            req = self._body() or {}
+            method = req.get("method", "")
+            resp: dict[str, Any] = {"jsonrpc": "2.0", "id": req.get("id")}
+            try:
+                server._wait(method)
+                resp["result"] = server.rpc(method, req.get("params"))
+            except _Error as e:
+                resp["error"] = {"code": e.status, "message": e.message}
+            except Exception as e:
+                resp["error"] = {"code": 500, "message": str(e)}
+            self._send(200, resp)
+
+    return Handler
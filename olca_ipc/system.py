@@ -0,0 +1,157 @@
+"""
+In-memory graphs of product systems.
+
+`fetch_system_graph` downloads a product system, all of its processes, and
+the flows of these processes concurrently and builds an indexed graph of
+them:
+
+```python
+import olca_ipc.system as system
+
+graph = system.fetch_system_graph(client, system_ref)
+for provider_id in graph.providers_of(process_id):
+    print(graph.processes[provider_id].name)
+for link in graph.links_of(process_id):
+    exchange = graph.linked_exchange(link)
+```
+
+The adjacency of the graph is derived from the process links of the system:
+a link connects a provider with the process that consumes its product (or
+treats its waste) via the exchange with the linked internal ID.
+"""
+
+import logging as log
+from typing import Iterable, cast
+
+import olca_schema as o
+
+from .protocol import ProtoClient
+
+
+class SystemGraph:
+    """
+    A product system with its processes and flows. `processes` and `flows`
+    map the IDs to the entities; `missing` contains the IDs of processes
+    that could not be fetched. Providers that are not processes, like
+    sub-systems or results, are part of the adjacency but not of
+    `processes`.
+    """
+
+    def __init__(
+        self,
+        system: o.ProductSystem,
+        processes: dict[str, o.Process],
+        flows: dict[str, o.Flow],
+        missing: list[str] | None = None,
+    ):
+        self.system = system
+        self.processes = processes
+        self.flows = flows
+        self.missing = missing or []
+        self.links: list[o.ProcessLink] = system.process_links or []
+
+        # provider -> links to its consumers, consumer -> links to providers
+        self._downstream: dict[str, list[o.ProcessLink]] = {}
+        self._upstream: dict[str, list[o.ProcessLink]] = {}
+        for link in self.links:
+            provider = _id_of(link.provider)
+            consumer = _id_of(link.process)
+            self._downstream.setdefault(provider, []).append(link)
+            self._upstream.setdefault(consumer, []).append(link)
+
+        self._exchanges: dict[tuple[str, int], o.Exchange] = {}
+        for pid, process in processes.items():
+            for e in process.exchanges or []:
+                if e.internal_id is not None:
+                    self._exchanges[(pid, e.internal_id)] = e
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+    def providers_of(self, process_id: str) -> list[str]:
+        """Returns the IDs of the providers that are linked to a process."""
+        return _unique(
+            _id_of(link.provider) for link in self._upstream.get(process_id, [])
+        )
+
+    def consumers_of(self, process_id: str) -> list[str]:
+        """Returns the IDs of the processes that are linked to a provider."""
+        return _unique(
+            _id_of(link.process)
+            for link in self._downstream.get(process_id, [])
+        )
+
+    def links_of(self, process_id: str) -> list[o.ProcessLink]:
+        """Returns the links of the linked exchanges of a process."""
+        return self._upstream.get(process_id, [])
+
+    def exchange_of(
+        self, process_id: str, internal_id: int
+    ) -> o.Exchange | None:
+        return self._exchanges.get((process_id, internal_id))
+
+    def linked_exchange(self, link: o.ProcessLink) -> o.Exchange | None:
+        """Returns the exchange of the consuming process of a link."""
+        if link.exchange is None or link.exchange.internal_id is None:
+            return None
+        return self.exchange_of(_id_of(link.process), link.exchange.internal_id)
+
+
+def fetch_system_graph(
+    client: ProtoClient,
+    system: o.Ref | o.ProductSystem | str,
+    flows: bool = True,
+    concurrency: int = 8,
+) -> SystemGraph | None:
+    """
+    Fetches the product system, its processes, and, when `flows` is set,
+    the flows of their exchanges with at most `concurrency` parallel
+    requests and returns them as an indexed graph.
+    """
+    if isinstance(system, o.ProductSystem):
+        product_system = system
+    else:
+        uid = system if isinstance(system, str) else system.id
+        product_system = client.get(o.ProductSystem, uid)
+        if product_system is None:
+            log.error("could not fetch product system %s", uid)
+            return None
+
+    process_ids = _unique(
+        _id_of(ref)
+        for ref in product_system.processes or []
+        if ref.ref_type in (None, o.RefType.Process)
+    )
+    processes: dict[str, o.Process] = {}
+    missing: list[str] = []
+    for uid, process in client.get_many(o.Process, process_ids, concurrency):
+        if process is None:
+            missing.append(uid)
+        else:
+            processes[uid] = process
+    if len(missing) > 0:
+        log.warning("could not fetch %i processes of the system", len(missing))
+
+    flow_map: dict[str, o.Flow] = {}
+    if flows:
+        flow_ids = _unique(
+            _id_of(e.flow)
+            for process in processes.values()
+            for e in process.exchanges or []
+            if e.flow is not None
+        )
+        for uid, flow in client.get_many(o.Flow, flow_ids, concurrency):
+            if flow is not None:
+                flow_map[uid] = flow
+
+    return SystemGraph(product_system, processes, flow_map, missing)
+
+
+def _id_of(ref: o.Ref | None) -> str:
+    if ref is None or ref.id is None:
+        return ""
+    return cast(str, ref.id)
+
+
+def _unique(ids: Iterable[str]) -> list[str]:
+    return [uid for uid in dict.fromkeys(ids) if uid]
@@ -1,72 +1,879 @@
-from typing import Literal, cast
+import abc
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from abc import abstractmethod
+from array import array
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    Generic,
+    Iterator,
+    Literal,
+    Sequence,
+    TypeVar,
+    cast,
+)
 
 import olca_schema as o
 
-from .protocol import ProtoResult
+from .protocol import ProtoResult, tech_key
 
 _Ref = o.Ref | o.EnviFlow | Literal["costs"]
 
 
-class Node:
+class _Tree:
+    """
+    The state that is shared by all nodes of a tree: the result, the
+    indicator, and the tech. flows of the nodes. A tech. flow typically occurs
+    in many nodes of a tree, so we keep a single instance for each tech. flow
+    together with its encoded path segment. The `head` contains the tech.
+    flows above the root node when a tree starts at an inner path.
+    """
+
+    __slots__ = ("result", "ref", "head", "_tech_flows")
+
     def __init__(
         self,
-        result: ProtoResult,
+        result: ProtoResult | None,
         ref: _Ref,
-        node: o.UpstreamNode,
-        path: list[o.TechFlow],
+        head: tuple[o.TechFlow, ...] = (),
     ):
-        self._result = result
-        self._ref = ref
-        self._node = node
-        self._path = path
-        self._childs: list["Node"] | None = None
+        self.result = result
+        self.ref: _Ref = ref
+        self.head = head
+        self._tech_flows: dict[str, tuple[o.TechFlow, str]] = {}
 
-    @property
-    def result(self) -> float:
-        return cast(float, self._node.result)
+    def intern(self, tech_flow: o.TechFlow) -> tuple[o.TechFlow, str]:
+        segment = tech_key(tech_flow)
+        entry = self._tech_flows.get(segment)
+        if entry is None:
+            entry = self._tech_flows.setdefault(segment, (tech_flow, segment))
+        return entry
+
+
+class _MultiTree(_Tree):
+    """
+    The state of a tree with multiple indicators. The executor that fetches
+    the child nodes of a node for the indicators is created on first use
+    and is shared by all nodes of the tree.
+    """
+
+    __slots__ = ("refs", "concurrency", "_pool", "_pool_lock")
+
+    def __init__(
+        self, result: ProtoResult, refs: tuple[_Ref, ...], concurrency: int
+    ):
+        super().__init__(result, refs[0])
+        self.refs: tuple[_Ref, ...] = refs
+        self.concurrency = concurrency
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                workers = min(self.concurrency, len(self.refs))
+                self._pool = ThreadPoolExecutor(max_workers=workers)
+            return self._pool
+
+    def fetch(self, path: list[o.TechFlow] | str) -> list[list[o.UpstreamNode]]:
+        """Fetches the upstream nodes of the path for each indicator."""
+        if len(self.refs) == 1 or self.concurrency <= 1:
+            return [_fetch_next(self.result, ref, path) for ref in self.refs]
+        pool = self.pool()
+        futures = [
+            pool.submit(_fetch_next, self.result, ref, path)
+            for ref in self.refs
+        ]
+        return [f.result() for f in futures]
+
+
+_C = TypeVar("_C", bound="_NodeBase[Any]")
+
+
+class _NodeBase(abc.ABC, Generic[_C]):
+    """
+    The common structure of the nodes of an upstream tree. A node only stores
+    its values, a pointer to its parent, and its encoded path segment; the
+    path of a node is reconstructed from its parents when needed. The type
+    parameter is the type of the parent and child nodes.
+    """
+
+    __slots__ = (
+        "_tree",
+        "_parent",
+        "_tech_flow",
+        "_segment",
+        "_encoded",
+        "_required",
+        "_childs",
+    )
+
+    def __init__(
+        self,
+        tree: _Tree,
+        tech_flow: o.TechFlow,
+        required: float,
+        parent: _C | None,
+    ):
+        self._tree = tree
+        self._parent = parent
+        self._tech_flow, self._segment = tree.intern(tech_flow)
+        self._encoded: str | None = None
+        self._required = required
+        self._childs: list[_C] | None = None
 
     @property
     def provider(self) -> o.Ref:
-        return cast(o.Ref, self._node.tech_flow.provider)
+        return cast(o.Ref, self._tech_flow.provider)
 
     @property
     def product(self) -> o.Ref:
-        return cast(o.Ref, self._node.tech_flow.flow)
+        return cast(o.Ref, self._tech_flow.flow)
 
     @property
-    def direct_contribution(self) -> float:
-        return cast(float, self._node.direct_contribution)
+    def tech_flow(self) -> o.TechFlow:
+        return self._tech_flow
 
     @property
     def required_amount(self) -> float:
-        return cast(float, self._node.required_amount)
+        return self._required
+
+    @property
+    def parent(self) -> _C | None:
+        return self._parent
+
+    @property
+    def depth(self) -> int:
+        depth = len(self._tree.head)
+        node = self._parent
+        while node is not None:
+            depth += 1
+            node = node._parent
+        return depth
+
+    @property
+    def path(self) -> list[o.TechFlow]:
+        """The tech. flows from the root to this node."""
+        head = list(self._tree.head)
+        return head + [n._tech_flow for n in self.path_nodes]
+
+    @property
+    def path_nodes(self) -> list[_C]:
+        """The nodes from the root to this node."""
+        nodes: list[_C] = []
+        node = cast(_C | None, self)
+        while node is not None:
+            nodes.append(node)
+            node = node._parent
+        nodes.reverse()
+        return nodes
+
+    @property
+    @abstractmethod
+    def childs(self) -> list[_C]:
+        pass
+
+    def _encoded_path(self) -> str:
+        # the parent of an expanded node was expanded before, so its encoded
+        # path is already cached and this is a single concatenation
+        if self._encoded is not None:
+            return self._encoded
+        if self._parent is None:
+            head = [tech_key(tf) for tf in self._tree.head]
+            self._encoded = "/".join(head + [self._segment])
+        else:
+            self._encoded = self._parent._encoded_path() + "/" + self._segment
+        return self._encoded
+
+    @abstractmethod
+    def _fetch_on(self, pool: Executor) -> list[Future[list[o.UpstreamNode]]]:
+        """Submits the requests for the child nodes to the executor."""
+        pass
+
+    @abstractmethod
+    def _adopt(self, fetched: list[list[o.UpstreamNode]]) -> list[_C]:
+        """Creates the child nodes from the fetched upstream nodes."""
+        pass
+
+    @abstractmethod
+    def _thresholds(self, min_share: float, min_result: float) -> Any:
+        pass
+
+    @abstractmethod
+    def _is_below(self, thresholds: Any) -> bool:
+        pass
+
+
+class Node(_NodeBase["Node"]):
+    """A node in the upstream tree of a single indicator."""
+
+    __slots__ = ("_result", "_direct")
+
+    def __init__(
+        self,
+        result: ProtoResult,
+        ref: _Ref,
+        node: o.UpstreamNode,
+        path: list[o.TechFlow] | None = None,
+    ):
+        """
+        Creates a node of the upstream tree of the given result and
+        indicator. The `path` contains the tech. flows from the root to this
+        node, including the tech. flow of the node; without a path, the
+        node is the root of the tree.
+        """
+        head = tuple(path[:-1]) if path else ()
+        self._init(_Tree(result, ref, head), node, None)
+
+    @classmethod
+    def _of(
+        cls, tree: _Tree, node: o.UpstreamNode, parent: "Node | None"
+    ) -> "Node":
+        created = cls.__new__(cls)
+        created._init(tree, node, parent)
+        return created
+
+    def _init(self, tree: _Tree, node: o.UpstreamNode, parent: "Node | None"):
+        super().__init__(
+            tree,
+            cast(o.TechFlow, node.tech_flow),
+            cast(float, node.required_amount),
+            parent,
+        )
+        self._result = cast(float, node.result)
+        self._direct = cast(float, node.direct_contribution)
+
+    @property
+    def result(self) -> float:
+        return self._result
+
+    @property
+    def direct_contribution(self) -> float:
+        return self._direct
+
+    @property
+    def _path(self) -> list[o.TechFlow]:
+        return self.path
 
     @property
     def childs(self) -> list["Node"]:
         if self._childs is not None:
             return self._childs
-        self._childs = []
-        ref = self._ref
-        for u in _fetch_next(self._result, ref, self._path):
-            self._childs.append(
-                Node(
-                    self._result,
-                    ref,
-                    u,
-                    self._path + [cast(o.TechFlow, u.tech_flow)],
-                )
-            )
+        tree = self._tree
+        return self._adopt(
+            [_fetch_next(tree.result, tree.ref, self._encoded_path())]
+        )
+
+    def _fetch_on(self, pool: Executor) -> list[Future[list[o.UpstreamNode]]]:
+        tree = self._tree
+        path = self._encoded_path()
+        return [pool.submit(_fetch_next, tree.result, tree.ref, path)]
+
+    def _adopt(self, fetched: list[list[o.UpstreamNode]]) -> list["Node"]:
+        [nodes] = fetched
+        self._childs = [Node._of(self._tree, u, self) for u in nodes]
+        return self._childs
+
+    def _thresholds(self, min_share: float, min_result: float) -> float:
+        return max(abs(self._result) * min_share, min_result)
+
+    def _is_below(self, thresholds: float) -> bool:
+        return thresholds > 0 and abs(self._result) < thresholds
+
+
+class MultiNode(_NodeBase["MultiNode"]):
+    """
+    A node in the upstream tree of multiple indicators. It contains a vector
+    of results and direct contributions with a value for each indicator of
+    the tree, in the same order as `refs`.
+    """
+
+    __slots__ = ("_results", "_directs")
+
+    def __init__(
+        self,
+        tree: _MultiTree,
+        tech_flow: o.TechFlow,
+        required: float,
+        results: tuple[float, ...],
+        directs: tuple[float, ...],
+        parent: "MultiNode | None" = None,
+    ):
+        super().__init__(tree, tech_flow, required, parent)
+        self._results = results
+        self._directs = directs
+
+    @property
+    def refs(self) -> tuple[_Ref, ...]:
+        return cast(_MultiTree, self._tree).refs
+
+    @property
+    def results(self) -> tuple[float, ...]:
+        return self._results
+
+    @property
+    def direct_contributions(self) -> tuple[float, ...]:
+        return self._directs
+
+    @property
+    def childs(self) -> list["MultiNode"]:
+        if self._childs is not None:
+            return self._childs
+        tree = cast(_MultiTree, self._tree)
+        return self._adopt(tree.fetch(self._encoded_path()))
+
+    def _fetch_on(self, pool: Executor) -> list[Future[list[o.UpstreamNode]]]:
+        tree = cast(_MultiTree, self._tree)
+        path = self._encoded_path()
+        return [
+            pool.submit(_fetch_next, tree.result, ref, path)
+            for ref in tree.refs
+        ]
+
+    def _adopt(self, fetched: list[list[o.UpstreamNode]]) -> list["MultiNode"]:
+        tree = cast(_MultiTree, self._tree)
+        self._childs = [
+            MultiNode(tree, *values, parent=self) for values in _merge(fetched)
+        ]
         return self._childs
 
+    def _thresholds(
+        self, min_share: float, min_result: float
+    ) -> tuple[float, ...]:
+        return tuple(max(abs(r) * min_share, min_result) for r in self._results)
+
+    def _is_below(self, thresholds: tuple[float, ...]) -> bool:
+        # negligible only when it is negligible for every indicator
+        for r, t in zip(self._results, thresholds):
+            if t <= 0 or abs(r) >= t:
+                return False
+        return True
+
+
+_N = TypeVar("_N", bound=_NodeBase[Any])
+
 
 def of(result: ProtoResult, ref: _Ref) -> Node:
     [root] = _fetch_next(result, ref, [])
-    return Node(result, ref, root, [cast(o.TechFlow, root.tech_flow)])
+    return Node._of(_Tree(result, ref), root, None)
+
+
+def of_all(
+    result: ProtoResult, refs: Sequence[_Ref], concurrency: int = 4
+) -> MultiNode:
+    """
+    Creates the root of an upstream tree for multiple indicators. The child
+    nodes of a node are fetched for all indicators together, concurrently
+    with the given number of threads, and are merged by their tech. flows.
+    """
+    if len(refs) == 0:
+        raise ValueError("no indicators given")
+    tree = _MultiTree(result, tuple(refs), concurrency)
+    [root] = _merge(tree.fetch([]))
+    return MultiNode(tree, *root)
+
+
+def expand(
+    root: _N,
+    max_depth: int = 5,
+    min_share: float = 0.0,
+    min_result: float = 0.0,
+    concurrency: int = 8,
+) -> _N:
+    """
+    Expands the tree breadth-first, a whole level at a time, up to the given
+    depth below the root. The child nodes of all nodes of a level are fetched
+    concurrently with the given number of threads and are cached in the nodes,
+    so that a later traversal of the expanded part of the tree does not need
+    to call the server again. Nodes with an absolute result below the
+    `min_share` of the absolute root result or below the absolute value
+    `min_result` are not expanded. For trees with multiple indicators, a node
+    is only skipped when this is the case for every indicator.
+    """
+    thresholds = root._thresholds(min_share, min_result)
+    frontier = [root]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for _ in range(max_depth):
+            candidates = [n for n in frontier if not n._is_below(thresholds)]
+            todo = [n for n in candidates if n._childs is None]
+            # the requests of all nodes of a level, and for trees with
+            # multiple indicators of all indicators, go into the same pool
+            requests = [(n, n._fetch_on(pool)) for n in todo]
+            for node, futures in requests:
+                node._adopt([f.result() for f in futures])
+            frontier = [c for n in candidates for c in n.childs]
+            if len(frontier) == 0:
+                break
+    return root
+
+
+def top_paths(
+    root: Node,
+    k: int = 10,
+    key: Literal["result", "direct_contribution"] = "result",
+    max_expansions: int = 1000,
+) -> list[list[Node]]:
+    """
+    Returns the `k` most important paths of the tree, starting at the root,
+    ordered by the absolute value of the `result` or `direct_contribution` of
+    the last node of a path. The root itself is the first path when ranking
+    by `result`. This is a best-first search: it always expands the node with
+    the largest absolute result next and stops as soon as no unexpanded node
+    can contain a better path. With this, typically only a small part of the
+    tree needs to be fetched from the server. The number of nodes that are
+    expanded is limited by `max_expansions`.
+
+    The search assumes that the results of the child nodes are not larger
+    than the result of their parent, which is the case when all
+    contributions have the same sign. With mixed signs, the returned paths
+    are a good approximation but not necessarily the top `k` paths.
+    """
+    if k <= 0:
+        return []
+    by_result = key == "result"
+    counter = itertools.count()
+    queue: list[tuple[float, int, Node]] = [
+        (-abs(root.result), next(counter), root)
+    ]
+    best: list[tuple[float, int, Node]] = []  # min-heap of the top k
+    expansions = 0
+    while len(queue) > 0:
+        bound, _, node = heapq.heappop(queue)
+        if len(best) >= k and -bound <= best[0][0]:
+            break
+        score = abs(node.result if by_result else node.direct_contribution)
+        if len(best) < k:
+            heapq.heappush(best, (score, next(counter), node))
+        elif score > best[0][0]:
+            heapq.heapreplace(best, (score, next(counter), node))
+        if by_result and len(best) >= k:
+            # all other candidates have smaller results
+            break
+        if expansions >= max_expansions and node._childs is None:
+            continue
+        if node._childs is None:
+            expansions += 1
+        for child in node.childs:
+            heapq.heappush(queue, (-abs(child.result), next(counter), child))
+    best.sort(key=lambda e: (-e[0], e[1]))
+    return [node.path_nodes for _, _, node in best]
+
+
+def walk(
+    root: _N,
+    order: Literal["dfs", "bfs"] = "dfs",
+    max_depth: int | None = None,
+    skip_cycles: bool = True,
+    fetch: bool = True,
+) -> Iterator[_N]:
+    """
+    Iterates over the nodes of the tree in depth-first (pre-order) or
+    breadth-first order, without recursion. The root has the depth 0 and
+    nodes below `max_depth` are not visited. With `skip_cycles`, the child
+    nodes of a node are not visited when the tech. flow of that node already
+    occurs on its path, which is the case in cyclic systems; the node itself
+    is still visited. With `fetch=False`, only the already expanded part of
+    the tree is visited and no calls to the server are made.
+    """
+    if order == "bfs":
+        yield from _bfs(root, max_depth, skip_cycles, fetch)
+    else:
+        yield from _dfs(root, max_depth, skip_cycles, fetch)
+
+
+def _dfs(
+    root: _N, max_depth: int | None, skip_cycles: bool, fetch: bool
+) -> Iterator[_N]:
+    on_path: set[str] = set()
+    # the boolean flag marks the exit of a node, when its segment
+    # is removed from the current path again
+    stack: list[tuple[_N, int, bool]] = [(root, 0, False)]
+    while len(stack) > 0:
+        node, depth, leaving = stack.pop()
+        if leaving:
+            on_path.discard(node._segment)
+            continue
+        yield node
+        if max_depth is not None and depth >= max_depth:
+            continue
+        if skip_cycles and node._segment in on_path:
+            continue
+        childs = _childs_of(node, fetch)
+        if len(childs) == 0:
+            continue
+        if skip_cycles:
+            on_path.add(node._segment)
+            stack.append((node, depth, True))
+        for child in reversed(childs):
+            stack.append((child, depth + 1, False))
+
+
+def _bfs(
+    root: _N, max_depth: int | None, skip_cycles: bool, fetch: bool
+) -> Iterator[_N]:
+    queue: deque[tuple[_N, int]] = deque([(root, 0)])
+    while len(queue) > 0:
+        node, depth = queue.popleft()
+        yield node
+        if max_depth is not None and depth >= max_depth:
+            continue
+        if skip_cycles and _is_cycle(node):
+            continue
+        for child in _childs_of(node, fetch):
+            queue.append((child, depth + 1))
+
+
+def _childs_of(node: _N, fetch: bool) -> list[_N]:
+    if fetch:
+        return node.childs
+    return node._childs if node._childs is not None else []
+
+
+def _is_cycle(node: _NodeBase[Any]) -> bool:
+    segment = node._segment
+    parent = node._parent
+    while parent is not None:
+        if parent._segment == segment:
+            return True
+        parent = parent._parent
+    return False
+
+
+@dataclass
+class FlatTree:
+    """
+    A tree in a flat, columnar form. The node `i` has the parent node
+    `parent[i]` (`-1` for the root), the provider `providers[provider[i]]`,
+    and the flow `flows[flow[i]]`. Parents always come before their child
+    nodes.
+    """
+
+    parent: array = field(default_factory=lambda: array("q"))
+    provider: array = field(default_factory=lambda: array("q"))
+    flow: array = field(default_factory=lambda: array("q"))
+    result: array = field(default_factory=lambda: array("d"))
+    direct_contribution: array = field(default_factory=lambda: array("d"))
+    required_amount: array = field(default_factory=lambda: array("d"))
+    providers: list[o.Ref] = field(default_factory=list)
+    flows: list[o.Ref] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "parent": self.parent.tolist(),
+            "provider": self.provider.tolist(),
+            "flow": self.flow.tolist(),
+            "result": self.result.tolist(),
+            "directContribution": self.direct_contribution.tolist(),
+            "requiredAmount": self.required_amount.tolist(),
+            "providers": [p.to_dict() for p in self.providers],
+            "flows": [f.to_dict() for f in self.flows],
+        }
+
+    def to_json(self, path: str | os.PathLike[str]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    def to_npz(self, path: str | os.PathLike[str]):
+        """
+        Writes the columns into a NumPy `.npz` file; this requires NumPy to
+        be installed. The providers and flows are stored by their IDs and
+        names.
+        """
+        import numpy as np
+
+        np.savez_compressed(
+            path,
+            parent=np.frombuffer(self.parent, dtype=np.int64),
+            provider=np.frombuffer(self.provider, dtype=np.int64),
+            flow=np.frombuffer(self.flow, dtype=np.int64),
+            result=np.frombuffer(self.result, dtype=np.float64),
+            direct_contribution=np.frombuffer(
+                self.direct_contribution, dtype=np.float64
+            ),
+            required_amount=np.frombuffer(
+                self.required_amount, dtype=np.float64
+            ),
+            provider_ids=np.array([p.id or "" for p in self.providers]),
+            provider_names=np.array([p.name or "" for p in self.providers]),
+            flow_ids=np.array([f.id or "" for f in self.flows]),
+            flow_names=np.array([f.name or "" for f in self.flows]),
+        )
+
+
+def flatten(
+    root: Node,
+    order: Literal["dfs", "bfs"] = "dfs",
+    max_depth: int | None = None,
+    skip_cycles: bool = True,
+    fetch: bool = False,
+) -> FlatTree:
+    """
+    Converts the tree into its flat, columnar form. By default, only the
+    already expanded part of the tree is converted; see `walk` for the
+    parameters.
+    """
+    flat = FlatTree()
+    indices: dict[int, int] = {}
+    providers: dict[str, int] = {}
+    flows: dict[str, int] = {}
+    for node in walk(root, order, max_depth, skip_cycles, fetch):
+        indices[id(node)] = len(flat.parent)
+        parent = node._parent
+        flat.parent.append(-1 if parent is None else indices[id(parent)])
+        flat.provider.append(
+            _index_of(node.provider, providers, flat.providers)
+        )
+        flat.flow.append(_index_of(node.product, flows, flat.flows))
+        flat.result.append(node.result)
+        flat.direct_contribution.append(node.direct_contribution)
+        flat.required_amount.append(node.required_amount)
+    return flat
+
+
+def _index_of(ref: o.Ref, index: dict[str, int], refs: list[o.Ref]) -> int:
+    key = ref.id if ref and ref.id else ""
+    i = index.get(key)
+    if i is None:
+        i = len(refs)
+        index[key] = i
+        refs.append(ref)
+    return i
+
+
+_MAGIC = b"OLCAUTREE"
+_VERSION = 1
+
+
+def save(root: Node, path: str | os.PathLike[str]):
+    """
+    Writes the expanded part of the tree into a compact binary file. The
+    file contains a small JSON header with the indicator and the tech. flows
+    of the tree, followed by the node values as packed arrays. When the given
+    node is not the root of a full tree, the tech. flows above it are stored
+    as the head of the saved tree. Trees with multiple indicators are not
+    supported.
+    """
+    tech_flows: list[o.TechFlow] = []
+    tech_index: dict[str, int] = {}
+    indices: dict[int, int] = {}
+    parent = array("q")
+    tech = array("q")
+    result = array("d")
+    direct = array("d")
+    required = array("d")
+    expanded = array("B")
+    for node in walk(root, "bfs", skip_cycles=False, fetch=False):
+        indices[id(node)] = len(parent)
+        p = node._parent
+        parent.append(-1 if node is root or p is None else indices[id(p)])
+        i = tech_index.get(node._segment)
+        if i is None:
+            i = len(tech_flows)
+            tech_index[node._segment] = i
+            tech_flows.append(node._tech_flow)
+        tech.append(i)
+        result.append(node._result)
+        direct.append(node._direct)
+        required.append(node._required)
+        expanded.append(0 if node._childs is None else 1)
+
+    header = json.dumps(
+        {
+            "indicator": _indicator_dict(root._tree.ref),
+            "head": [tf.to_dict() for tf in root.path[:-1]],
+            "techFlows": [tf.to_dict() for tf in tech_flows],
+            "count": len(parent),
+        }
+    ).encode("utf-8")
+    columns = [parent, tech, result, direct, required, expanded]
+    if sys.byteorder != "little":
+        for column in columns:
+            column.byteswap()
+    payload = b"".join(c.tobytes() for c in columns)
+    with open(path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<HI", _VERSION, len(header)))
+        f.write(header)
+        f.write(zlib.compress(payload))
+
+
+def load(
+    path: str | os.PathLike[str], result: ProtoResult | None = None
+) -> Node:
+    """
+    Loads a tree that was written with `save`. When a result is given, nodes
+    that were not expanded in the saved tree are fetched lazily from that
+    result; otherwise, accessing them raises an error.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(_MAGIC):
+        raise ValueError(f"{path} is not an upstream tree file")
+    offset = len(_MAGIC)
+    version, header_size = struct.unpack_from("<HI", data, offset)
+    if version != _VERSION:
+        raise ValueError(f"unsupported upstream tree version {version}")
+    offset += struct.calcsize("<HI")
+    header = json.loads(data[offset : offset + header_size])
+    payload = zlib.decompress(data[offset + header_size :])
+
+    count: int = header["count"]
+    columns = []
+    pos = 0
+    for typecode in ("q", "q", "d", "d", "d", "B"):
+        column = array(typecode)
+        size = count * column.itemsize
+        column.frombytes(payload[pos : pos + size])
+        pos += size
+        if sys.byteorder != "little":
+            column.byteswap()
+        columns.append(column)
+    parent, tech, values, direct, required, expanded = columns
+
+    head = tuple(o.TechFlow.from_dict(d) for d in header.get("head", []))
+    tree = _Tree(result, _indicator_of(header["indicator"]), head)
+    tech_flows = [o.TechFlow.from_dict(d) for d in header["techFlows"]]
+    nodes: list[Node] = []
+    for i in range(count):
+        p = nodes[parent[i]] if parent[i] >= 0 else None
+        node = Node._of(
+            tree,
+            o.UpstreamNode(
+                tech_flow=tech_flows[tech[i]],
+                result=values[i],
+                direct_contribution=direct[i],
+                required_amount=required[i],
+            ),
+            p,
+        )
+        if expanded[i]:
+            node._childs = []
+        if p is not None:
+            cast(list[Node], p._childs).append(node)
+        nodes.append(node)
+    if len(nodes) == 0:
+        raise ValueError(f"{path} contains no tree")
+    return nodes[0]
+
+
+def cache_key(setup: o.CalculationSetup, ref: _Ref) -> str:
+    """
+    Returns a hash of the calculation setup and indicator of a tree that can
+    be used as the key of that tree in a cache.
+    """
+    text = json.dumps(
+        {"setup": setup.to_dict(), "indicator": _indicator_dict(ref)},
+        sort_keys=True,
+    )
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TreeCache:
+    """
+    A folder with saved upstream trees, keyed by the calculation setup and
+    indicator of a tree:
+
+    ```python
+    cache = utree.TreeCache("path/to/trees")
+    root = cache.of(result, setup, impact, max_depth=6)
+    ```
+    """
+
+    def __init__(self, folder: str | os.PathLike[str]):
+        self.folder = Path(folder)
+
+    def file_of(self, setup: o.CalculationSetup, ref: _Ref) -> Path:
+        return self.folder / f"{cache_key(setup, ref)}.utree"
+
+    def get(
+        self,
+        setup: o.CalculationSetup,
+        ref: _Ref,
+        result: ProtoResult | None = None,
+    ) -> Node | None:
+        file = self.file_of(setup, ref)
+        if not file.exists():
+            return None
+        return load(file, result)
+
+    def put(self, setup: o.CalculationSetup, ref: _Ref, root: Node):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        file = self.file_of(setup, ref)
+        tmp = file.with_suffix(".tmp")
+        save(root, tmp)
+        os.replace(tmp, file)
+
+    def of(
+        self,
+        result: ProtoResult,
+        setup: o.CalculationSetup,
+        ref: _Ref,
+        max_depth: int = 5,
+        min_share: float = 0.0,
+        min_result: float = 0.0,
+        concurrency: int = 8,
+    ) -> Node:
+        """
+        Returns the cached tree attached to the given result, or builds,
+        expands, and caches the tree when it is not in the cache yet.
+        """
+        root = self.get(setup, ref, result)
+        if root is not None:
+            return root
+        root = expand(
+            of(result, ref),
+            max_depth=max_depth,
+            min_share=min_share,
+            min_result=min_result,
+            concurrency=concurrency,
+        )
+        self.put(setup, ref, root)
+        return root
+
+
+def _indicator_dict(ref: _Ref) -> dict[str, Any]:
+    if ref == "costs":
+        return {"type": "costs"}
+    if isinstance(ref, o.EnviFlow):
+        return {"type": "flow", "value": ref.to_dict()}
+    if isinstance(ref, o.Ref):
+        return {"type": "impact", "value": ref.to_dict()}
+    raise ValueError("unsupported reference type for upstream results: " + ref)
+
+
+def _indicator_of(d: dict[str, Any]) -> _Ref:
+    match d.get("type"):
+        case "costs":
+            return "costs"
+        case "flow":
+            return o.EnviFlow.from_dict(d["value"])
+        case "impact":
+            return o.Ref.from_dict(d["value"])
+        case _:
+            raise ValueError(f"unsupported indicator: {d}")
 
 
 def _fetch_next(
-    result: ProtoResult, ref: _Ref, path: list[o.TechFlow]
+    result: ProtoResult | None, ref: _Ref, path: list[o.TechFlow] | str
 ) -> list[o.UpstreamNode]:
+    if result is None:
+        raise RuntimeError(
+            "the node was not expanded and the tree has no result attached"
+        )
     if ref == "costs":
         return result.get_upstream_costs_of(path)
     if isinstance(ref, o.EnviFlow):
@@ -74,3 +881,34 @@ def _fetch_next(
     if isinstance(ref, o.Ref):
         return result.get_upstream_impacts_of(ref, path)
     raise ValueError("unsupported reference type for upstream results: " + ref)
+
+
+def _merge(
+    fetched: list[list[o.UpstreamNode]],
+) -> list[tuple[o.TechFlow, float, tuple[float, ...], tuple[float, ...]]]:
+    """
+    Merges the upstream nodes that were fetched for the indicators of a tree
+    by their tech. flows. A node that is missing for an indicator has a zero
+    result for that indicator.
+    """
+    k = len(fetched)
+    merged: dict[str, tuple[o.TechFlow, float, list[float], list[float]]] = {}
+    for i, nodes in enumerate(fetched):
+        for u in nodes:
+            tech_flow = cast(o.TechFlow, u.tech_flow)
+            key = tech_key(tech_flow)
+            entry = merged.get(key)
+            if entry is None:
+                entry = (
+                    tech_flow,
+                    cast(float, u.required_amount),
+                    [0.0] * k,
+                    [0.0] * k,
+                )
+                merged[key] = entry
+            entry[2][i] = cast(float, u.result)
+            entry[3][i] = cast(float, u.direct_contribution)
+    return [
+        (tech_flow, required, tuple(results), tuple(directs))
+        for tech_flow, required, results, directs in merged.values()
+    ]
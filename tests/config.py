@@ -1,3 +1,4 @@
+import olca_schema as o
 import olca_ipc as ipc
 import olca_ipc.protocol as protocol
 import olca_ipc.rest as rest
@@ -13,3 +14,65 @@ if use_rest:
     )
 else:
     client = ipc.Client(8080)
+
+
+class LoopModel:
+    """
+    A small model with a loop: process P produces 1 kg of p and requires 1 kg
+    of q from process Q, which requires 0.5 kg of p from P. P emits 2 kg and
+    Q 4 kg of the elementary flow e; the impact category i of method M has a
+    factor of 0.5 for e. For 1 kg of p, the total inventory is 12 kg of e and
+    the total impact 6.
+    """
+
+    def __init__(self):
+        self.units = o.new_unit_group("Units of mass", "kg")
+        self.mass = o.new_flow_property("Mass", self.units)
+        self.e = o.new_elementary_flow("e", self.mass)
+        self.p = o.new_product("p", self.mass)
+        self.q = o.new_product("q", self.mass)
+
+        P = o.new_process("P")
+        Q = o.new_process("Q")
+        o.new_output(P, self.p, amount=1).is_quantitative_reference = True
+        o.new_input(P, self.q, amount=1).default_provider = Q.to_ref()
+        o.new_output(P, self.e, amount=2)
+        o.new_output(Q, self.q, amount=1).is_quantitative_reference = True
+        o.new_input(Q, self.p, amount=0.5).default_provider = P.to_ref()
+        o.new_output(Q, self.e, amount=4)
+        self.P = P
+        self.Q = Q
+
+        self.i = o.new_impact_category("i")
+        o.new_impact_factor(self.i, self.e, 0.5)
+        self.method = o.new_impact_method("M", self.i)
+
+        self.entities: list[o.RootEntity] = [
+            self.units,
+            self.mass,
+            self.e,
+            self.p,
+            self.q,
+            self.P,
+            self.Q,
+            self.i,
+            self.method,
+        ]
+
+    def put(self, *others: o.RootEntity):
+        """Inserts the model and the given other entities."""
+        self.entities.extend(others)
+        client.put_all(*self.entities)
+
+    def delete(self):
+        client.delete_all(*reversed(self.entities))
+
+    def calculate(self, amount: float | None = None) -> protocol.ProtoResult:
+        setup = o.CalculationSetup(
+            target=o.Ref(ref_type=o.RefType.Process, id=self.P.id),
+            impact_method=self.method.to_ref(),
+            amount=amount,
+        )
+        result = client.calculate(setup)
+        result.wait_until_ready()
+        return result
@@ -0,0 +1,151 @@
+import tempfile
+import unittest
+
+import olca_schema as o
+from olca_ipc.metrics import Metrics
+from olca_ipc.protocol import ProtoClient
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+def _clients(server: StandInServer, **kwargs) -> list[ProtoClient]:
+    return [server.ipc_client(**kwargs), server.rest_client(**kwargs)]
+
+
+def _units(version: str = "01.00.000") -> o.UnitGroup:
+    units = o.new_unit_group("Units of mass", "kg")
+    units.version = version
+    return units
+
+
+class EntityCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        model = SyntheticModel(tech_flows=10, envi_flows=5, impacts=1)
+        cls.server = StandInServer(model).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_hits(self):
+        for client in _clients(self.server):
+            units = _units()
+            client.put(units)
+            cache = client.enable_cache()
+            first = client.get(o.UnitGroup, units.id)
+            second = client.get(o.UnitGroup, units.id)
+            assert first is not None and second is not None
+            self.assertEqual(1, cache.misses)
+            self.assertEqual(1, cache.hits)
+            self.assertEqual(first, second)
+            self.assertIsNot(first, second)
+            self.assertEqual("kg", second.units[0].name)
+            client.delete(units)
+
+    def test_invalidation_by_put_and_delete(self):
+        for client in _clients(self.server):
+            units = _units()
+            client.put(units)
+            cache = client.enable_cache(revalidate=False)
+            client.get(o.UnitGroup, units.id)
+            self.assertEqual(1, len(cache))
+
+            units.name = "Mass units"
+            client.put(units)
+            self.assertEqual(0, len(cache))
+            updated = client.get(o.UnitGroup, units.id)
+            assert updated is not None
+            self.assertEqual("Mass units", updated.name)
+
+            client.delete(units)
+            self.assertEqual(0, len(cache))
+            self.assertIsNone(client.get(o.UnitGroup, units.id))
+
+    def test_revalidation(self):
+        for client, other in zip(_clients(self.server), _clients(self.server)):
+            units = _units("01.00.000")
+            client.put(units)
+            cache = client.enable_cache()
+            client.get(o.UnitGroup, units.id)
+
+            # a change through another client is detected by its version
+            units.version = "01.00.001"
+            other.put(units)
+            updated = client.get(o.UnitGroup, units.id)
+            assert updated is not None
+            self.assertEqual("01.00.001", updated.version)
+            self.assertEqual(1, cache.stale)
+            client.delete(units)
+
+    def test_size_limit(self):
+        for client in _clients(self.server):
+            groups = [_units() for _ in range(10)]
+            client.put_all(*groups)
+            size = len(groups[0].to_json())
+            cache = client.enable_cache(max_bytes=3 * size)
+            for g in groups:
+                client.get(o.UnitGroup, g.id)
+            self.assertTrue(len(cache) <= 3)
+            self.assertTrue(cache.size <= 3 * size)
+            self.assertTrue(cache.evictions >= 7)
+            client.delete_all(*groups)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for protocol in ("ipc", "rest"):
+                client, fresh, metrics = self._pair(protocol)
+                units = _units()
+                client.put(units)
+                client.enable_cache(directory=tmp)
+                client.get(o.UnitGroup, units.id)
+
+                # a new cache reads the entity from disk; only its
+                # descriptor is requested for the revalidation
+                cache = fresh.enable_cache(directory=tmp)
+                cached = fresh.get(o.UnitGroup, units.id)
+                assert cached is not None
+                self.assertEqual(units.name, cached.name)
+                self.assertEqual(1, cache.hits)
+                calls = sum(s.calls for s in metrics.snapshot().values())
+                self.assertEqual(1, calls)
+                client.delete(units)
+
+    def test_metrics_of_hits(self):
+        for protocol in ("ipc", "rest"):
+            _, client, metrics = self._pair(protocol)
+            units = _units()
+            client.put(units)
+            client.enable_cache(revalidate=False)
+            client.get(o.UnitGroup, units.id)
+            before = metrics.snapshot()
+
+            # a hit sends no request but the entity is still constructed
+            client.get(o.UnitGroup, units.id)
+            after = metrics.snapshot()
+            self.assertEqual(
+                sum(s.calls for s in before.values()),
+                sum(s.calls for s in after.values()),
+            )
+            self.assertTrue(
+                sum(s.construct_seconds for s in after.values())
+                > sum(s.construct_seconds for s in before.values())
+            )
+            client.delete(units)
+
+    def _pair(self, protocol: str) -> tuple[ProtoClient, ProtoClient, Metrics]:
+        metrics = Metrics()
+        if protocol == "ipc":
+            return (
+                self.server.ipc_client(),
+                self.server.ipc_client(metrics=metrics),
+                metrics,
+            )
+        return (
+            self.server.rest_client(),
+            self.server.rest_client(metrics=metrics),
+            metrics,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import olca_schema as o
+from olca_ipc.decoding import ListOf, ProcessDecoder
+from olca_ipc.metrics import Metrics
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+class ProcessDecoderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.decoder = ProcessDecoder(threshold=1024, max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.decoder.close()
+
+    def test_clients(self):
+        model = SyntheticModel(tech_flows=300, envi_flows=50, impacts=5)
+        with StandInServer(model) as server:
+            for protocol in ("ipc", "rest"):
+                if protocol == "ipc":
+                    plain = server.ipc_client()
+                    pooled = server.ipc_client(decoder=self.decoder)
+                else:
+                    plain = server.rest_client()
+                    pooled = server.rest_client(decoder=self.decoder)
+
+                self.assertEqual(
+                    plain.get_descriptors(o.Process),
+                    pooled.get_descriptors(o.Process),
+                )
+                self.assertEqual(plain.get_providers(), pooled.get_providers())
+
+                r1 = plain.calculate(o.CalculationSetup())
+                r2 = pooled.calculate(o.CalculationSetup())
+                reqs = r2.get_total_requirements()
+                self.assertEqual(300, len(reqs))
+                self.assertIsInstance(reqs[0], o.TechFlowValue)
+                self.assertEqual(r1.get_total_requirements(), reqs)
+                impact = r1.get_impact_categories()[0]
+                self.assertEqual(
+                    r1.get_impact_contributions_of(impact),
+                    r2.get_impact_contributions_of(impact),
+                )
+                r1.dispose()
+                r2.dispose()
+
+    def test_amounts(self):
+        values = [{"amount": float(i) / 3} for i in range(1000)]
+        content = json.dumps(values).encode()
+        amounts = self.decoder.amounts(content)
+        self.assertEqual(1000, len(amounts))
+        self.assertAlmostEqual(999 / 3, amounts[-1])
+
+        rpc = json.dumps({"jsonrpc": "2.0", "id": 1, "result": values[:5]})
+        self.assertEqual(5, len(self.decoder.amounts(rpc.encode())))
+
+    def test_coalesce(self):
+        self.assertEqual(ListOf(o.Ref.from_dict), ListOf(o.Ref.from_dict))
+        self.assertEqual(
+            hash(ListOf(o.Ref.from_dict)), hash(ListOf(o.Ref.from_dict))
+        )
+        model = SyntheticModel(tech_flows=300, envi_flows=50, impacts=5)
+        threads = 6
+        with StandInServer(model, latency=0.2) as server:
+            for protocol in ("ipc", "rest"):
+                metrics = Metrics()
+                if protocol == "ipc":
+                    client = server.ipc_client(
+                        metrics=metrics, coalesce=True, decoder=self.decoder
+                    )
+                else:
+                    client = server.rest_client(
+                        metrics=metrics, coalesce=True, decoder=self.decoder
+                    )
+                result = client.calculate(o.CalculationSetup())
+                result.wait_until_ready()
+                metrics.reset()
+
+                barrier = threading.Barrier(threads)
+
+                def tech_flows(barrier=barrier, result=result):
+                    barrier.wait()
+                    return result.get_tech_flows()
+
+                with ThreadPoolExecutor(threads) as pool:
+                    futures = [pool.submit(tech_flows) for _ in range(threads)]
+                    flows = [f.result() for f in futures]
+                for fs in flows:
+                    self.assertEqual(flows[0], fs)
+                # each caller gets its own instances
+                self.assertEqual(threads, len({id(fs[0]) for fs in flows}))
+                stats = next(iter(metrics.snapshot().values()))
+                self.assertEqual(threads, stats.calls + stats.coalesced)
+                self.assertLess(stats.calls, threads)
+
+                # the pickle check is kept once per transformation
+                memo_size = len(self.decoder._picklable)
+                for _ in range(10):
+                    result.get_tech_flows()
+                self.assertEqual(memo_size, len(self.decoder._picklable))
+                result.dispose()
+
+    def test_unpicklable_transform(self):
+        content = json.dumps(list(range(1000))).encode()
+        doubled = self.decoder.decode(content, lambda xs: [2 * x for x in xs])
+        self.assertEqual(1998, doubled[-1])
+        refs = self.decoder.decode(
+            json.dumps([{"@id": "a", "name": "A"}] * 100).encode(),
+            ListOf(o.Ref.from_dict),
+        )
+        self.assertEqual("A", refs[-1].name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import olca_schema as o
+from olca_ipc.flight import SingleFlight
+from olca_ipc.metrics import Metrics
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+_THREADS = 8
+
+
+class _SlowReads(StandInServer):
+    """Reads the data of a GET request before the response is delayed."""
+
+    def rpc(self, method, params):
+        value = super().rpc(method, params)
+        if method == "data/get":
+            time.sleep(0.3)
+        return value
+
+    def rest(self, verb, path, body):
+        value = super().rest(verb, path, body)
+        if verb == "GET" and path.startswith("data/"):
+            time.sleep(0.3)
+        return value
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_coalesce(self):
+        model = SyntheticModel(tech_flows=20, envi_flows=10, impacts=2)
+        with StandInServer(model, latency=0.2) as server:
+            for protocol in ("ipc", "rest"):
+                for coalesce in (True, False):
+                    metrics = Metrics()
+                    if protocol == "ipc":
+                        client = server.ipc_client(
+                            metrics=metrics, coalesce=coalesce
+                        )
+                    else:
+                        client = server.rest_client(
+                            metrics=metrics, coalesce=coalesce
+                        )
+                    result = client.calculate(o.CalculationSetup())
+                    result.wait_until_ready()
+                    metrics.reset()
+
+                    barrier = threading.Barrier(_THREADS)
+
+                    def envi_flows(barrier=barrier, result=result):
+                        barrier.wait()
+                        return result.get_envi_flows()
+
+                    with ThreadPoolExecutor(_THREADS) as pool:
+                        futures = [
+                            pool.submit(envi_flows) for _ in range(_THREADS)
+                        ]
+                        flows = [f.result() for f in futures]
+                    for fs in flows:
+                        self.assertEqual(10, len(fs))
+                        self.assertEqual(flows[0], fs)
+                    # each caller gets its own instances
+                    self.assertEqual(_THREADS, len({id(fs[0]) for fs in flows}))
+
+                    stats = next(iter(metrics.snapshot().values()))
+                    self.assertEqual(_THREADS, stats.calls + stats.coalesced)
+                    if coalesce:
+                        self.assertLess(stats.calls, _THREADS)
+                    else:
+                        self.assertEqual(_THREADS, stats.calls)
+                    result.dispose()
+
+    def test_read_after_write(self):
+        with _SlowReads(SyntheticModel()) as server:
+            for protocol in ("ipc", "rest"):
+                if protocol == "ipc":
+                    client = server.ipc_client(coalesce=True)
+                else:
+                    client = server.rest_client(coalesce=True)
+                flight = client._flight
+                assert flight is not None
+                units = o.new_unit_group("Units of mass", "kg")
+                client.put(units)
+                with ThreadPoolExecutor(1) as pool:
+                    before = pool.submit(client.get, o.UnitGroup, units.id)
+                    while flight.in_flight == 0:
+                        pass
+                    time.sleep(0.1)
+                    units.name = "Mass"
+                    client.put(units)
+                    after = client.get(o.UnitGroup, units.id)
+                    assert after is not None
+                    self.assertEqual("Mass", after.name)
+                    before.result()
+
+    def test_forget(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute() -> str:
+            started.set()
+            release.wait()
+            return "before"
+
+        leader = threading.Thread(target=lambda: flight.do("key", compute))
+        leader.start()
+        started.wait()
+        flight.forget()
+        value, shared = flight.do("key", lambda: "after")
+        self.assertEqual("after", value)
+        self.assertFalse(shared)
+        release.set()
+        leader.join()
+        self.assertEqual(0, flight.in_flight)
+
+    def test_shared_values_are_copied(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        values: list[list[int]] = []
+
+        def compute() -> list[int]:
+            started.set()
+            release.wait()
+            return [1, 2, 3]
+
+        def call():
+            value, _ = flight.do("key", compute, list)
+            values.append(value)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        while flight._calls["key"].waiters == 0:
+            pass
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual([[1, 2, 3], [1, 2, 3]], values)
+        self.assertIsNot(values[0], values[1])
+
+    def test_errors_are_shared(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors: list[Exception] = []
+
+        def fail():
+            started.set()
+            release.wait()
+            raise ValueError("failed")
+
+        def call():
+            try:
+                flight.do("key", fail)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        while flight._calls["key"].waiters == 0:
+            pass
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(2, len(errors))
+        self.assertEqual(0, flight.in_flight)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import uuid
+
+import olca_schema as o
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+class GetManyTest(unittest.TestCase):
+    def test_get_many(self):
+        model = SyntheticModel(tech_flows=10, envi_flows=5, impacts=1)
+        with StandInServer(model, latency=0.005) as server:
+            for client in (server.ipc_client(), server.rest_client()):
+                groups = [
+                    o.new_unit_group(f"Units {i}", "kg") for i in range(20)
+                ]
+                client.put_all(*groups)
+                ids: list[str] = []
+                for g in groups:
+                    assert g.id is not None
+                    ids.append(g.id)
+                missing = str(uuid.uuid4())
+                ids.insert(5, missing)
+
+                pulled = []
+
+                def lazy_ids(ids=ids, pulled=pulled):
+                    for uid in ids:
+                        pulled.append(uid)
+                        yield uid
+
+                results = client.get_many(o.UnitGroup, lazy_ids(), 4)
+                first_id, first = next(results)
+                assert first is not None
+                self.assertEqual(ids[0], first_id)
+                self.assertTrue(len(pulled) < len(ids))
+
+                rest = list(results)
+                self.assertEqual(ids, [first_id] + [uid for uid, _ in rest])
+                for uid, group in rest:
+                    if uid == missing:
+                        self.assertIsNone(group)
+                    else:
+                        assert group is not None
+                        self.assertEqual(uid, group.id)
+                self.assertEqual(groups[0].name, first.name)
+                client.delete_all(*groups)
+
+
+if __name__ == "__main__":
+    unittest.main()
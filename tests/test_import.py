@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+_ROOT = str(Path(__file__).resolve().parent.parent)
+
+# the import time of the package should stay well below this limit; it is
+# generous so that the test is stable on slow machines
+_MAX_IMPORT_SECONDS = 1.0
+
+
+def _run(code: str) -> str:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [_ROOT] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+    )
+    return subprocess.check_output(
+        [sys.executable, "-c", code], env=env, text=True
+    ).strip()
+
+
+class ImportTest(unittest.TestCase):
+    def test_lazy_modules(self):
+        out = _run(
+            "import sys, olca_ipc\n"
+            "mods = ['requests', 'olca_ipc.ipc', 'olca_ipc.rest',"
+            " 'olca_ipc.utree']\n"
+            "print(','.join(m for m in mods if m in sys.modules))"
+        )
+        self.assertEqual("", out)
+
+    def test_lazy_attributes(self):
+        out = _run(
+            "import olca_ipc as ipc\n"
+            "from olca_ipc import RestClient\n"
+            "print(ipc.Client.__module__, RestClient.__module__,"
+            " ipc.utree.__name__, 'Client' in dir(ipc))"
+        )
+        self.assertEqual("olca_ipc.ipc olca_ipc.rest olca_ipc.utree True", out)
+
+    def test_import_time(self):
+        out = _run(
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "import olca_ipc\n"
+            "print(time.perf_counter() - start)"
+        )
+        self.assertLess(float(out), _MAX_IMPORT_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from typing import Sequence
+
+import olca_schema as o
+import olca_ipc.lcia as lcia
+
+from config import LoopModel, client
+
+_Value = o.ImpactValue | o.EnviFlowValue | o.TechFlowValue
+
+
+def _amounts(values: Sequence[_Value]) -> list[float]:
+    amounts: list[float] = []
+    for v in values:
+        assert v.amount is not None
+        amounts.append(v.amount)
+    return amounts
+
+
+class LocalLciaTest(unittest.TestCase):
+    def setUp(self):
+        self.model = LoopModel()
+        j = o.new_impact_category("j")
+        o.new_impact_factor(j, self.model.e, 2.0)
+        self.other = o.new_impact_method("N", j)
+        self.model.put(j, self.other)
+        self.result = self.model.calculate()
+
+    def tearDown(self):
+        self.result.dispose()
+        self.model.delete()
+
+    def test_of_result(self):
+        inventory = lcia.Inventory.of(self.result)
+        c = lcia.Characterization.of_result(self.result, inventory)
+        r = lcia.evaluate(inventory, c)
+        self.assertAlmostEqual(6.0, _amounts(r.get_total_impacts())[0])
+        contributions = r.get_impact_contributions_of(c.impacts[0])
+        self.assertAlmostEqual(6.0, sum(_amounts(contributions)))
+
+    def test_other_method(self):
+        inventory = lcia.Inventory.of(self.result)
+        methods = lcia.MethodCache(client)
+        c = methods.get(self.other.to_ref(), inventory)
+        self.assertIs(c, methods.get(self.other.to_ref(), inventory))
+
+        r = lcia.evaluate(inventory, c)
+        self.assertAlmostEqual(24.0, _amounts(r.get_total_impacts())[0])
+        flow_impacts = r.get_flow_impacts_of(c.impacts[0])
+        self.assertAlmostEqual(24.0, _amounts(flow_impacts)[0])
+        contributions = r.get_impact_contributions_of(c.impacts[0])
+        self.assertEqual(
+            [8.0, 16.0], sorted(round(a, 6) for a in _amounts(contributions))
+        )
+
+
+class InputFlowTest(unittest.TestCase):
+    def setUp(self):
+        units = o.new_unit_group("Units of mass", "kg")
+        mass = o.new_flow_property("Mass", units)
+        e = o.new_elementary_flow("e", mass)
+        r = o.new_elementary_flow("r", mass)
+        p = o.new_product("p", mass)
+
+        P = o.new_process("P")
+        o.new_output(P, p, amount=1).is_quantitative_reference = True
+        o.new_output(P, e, amount=2)
+        o.new_input(P, r, amount=3)
+
+        i = o.new_impact_category("i")
+        o.new_impact_factor(i, e, 0.5)
+        o.new_impact_factor(i, r, 1.5)
+        self.method = o.new_impact_method("M", i)
+
+        j = o.new_impact_category("j")
+        o.new_impact_factor(j, r, 2.0)
+        self.other = o.new_impact_method("N", j)
+
+        self.entities = [units, mass, e, r, p, P, i, self.method, j]
+        self.entities.append(self.other)
+        client.put_all(*self.entities)
+
+        setup = o.CalculationSetup(
+            target=o.Ref(ref_type=o.RefType.Process, id=P.id),
+            impact_method=self.method.to_ref(),
+        )
+        self.result = client.calculate(setup)
+        self.result.wait_until_ready()
+
+    def tearDown(self):
+        self.result.dispose()
+        self.entities.reverse()
+        client.delete_all(*self.entities)
+
+    def test_input_flows(self):
+        inventory = lcia.Inventory.of(self.result)
+        expected = _amounts(self.result.get_total_impacts())[0]
+        self.assertAlmostEqual(5.5, expected)
+
+        c = lcia.Characterization.of_result(self.result, inventory)
+        r = lcia.evaluate(inventory, c)
+        self.assertAlmostEqual(expected, _amounts(r.get_total_impacts())[0])
+
+        methods = lcia.MethodCache(client)
+        c = methods.get(self.method.to_ref(), inventory)
+        r = lcia.evaluate(inventory, c)
+        self.assertAlmostEqual(expected, _amounts(r.get_total_impacts())[0])
+
+        c = methods.get(self.other.to_ref(), inventory)
+        r = lcia.evaluate(inventory, c)
+        self.assertAlmostEqual(6.0, _amounts(r.get_total_impacts())[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
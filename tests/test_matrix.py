@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+
+import numpy as np
+import olca_ipc.matrix as matrix
+
+from config import LoopModel
+
+
+class LocalModelTest(unittest.TestCase):
+    def setUp(self):
+        self.model = LoopModel()
+        self.model.put()
+        self.result = self.model.calculate()
+
+    def tearDown(self):
+        self.result.dispose()
+        self.model.delete()
+
+    def test_local_model(self):
+        model = matrix.LocalModel.of(self.result)
+        self.assertEqual((2, 2), model.tech_matrix.shape)
+        self.assertAlmostEqual(12.0, model.total_flows()[0])
+        self.assertAlmostEqual(6.0, model.total_impacts()[0])
+        self.assertAlmostEqual(18.0, model.total_impacts(amount=3)[0])
+
+        s = model.solve(np.eye(2))
+        self.assertEqual((2, 2), s.shape)
+
+    def test_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model = matrix.LocalModel.cached(self.result, tmp)
+            loaded = matrix.LocalModel.cached(self.result, tmp)
+            self.assertEqual(model.tech_index, loaded.tech_index)
+            self.assertAlmostEqual(
+                model.total_impacts()[0], loaded.total_impacts()[0]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
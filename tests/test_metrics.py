@@ -0,0 +1,65 @@
+import unittest
+from typing import cast
+
+import olca_schema as o
+import olca_ipc as ipc
+import olca_ipc.rest as rest
+from olca_ipc.metrics import Metrics, route_of, size_of
+
+from config import client
+
+_client = cast(ipc.Client | rest.RestClient, client)
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        _client.metrics = self.metrics
+
+    def tearDown(self):
+        _client.metrics = None
+
+    def test_record_calls(self):
+        units = o.new_unit_group("Units of mass", "kg")
+        client.put(units)
+        for _ in range(3):
+            client.get(o.UnitGroup, units.id)
+        client.delete(units)
+
+        stats = self.metrics.snapshot()
+        get = next(s for key, s in stats.items() if "get" in key.lower())
+        self.assertEqual(3, get.calls)
+        self.assertEqual(0, get.errors)
+        self.assertEqual(3, sum(get.buckets))
+        self.assertTrue(get.response_bytes > 0)
+        self.assertTrue(get.transport_seconds > 0)
+        self.assertTrue(get.construct_seconds > 0)
+
+        text = self.metrics.to_prometheus()
+        self.assertIn("olca_ipc_calls_total", text)
+        self.assertIn('phase="construct"', text)
+
+        self.metrics.reset()
+        self.assertEqual(0, len(self.metrics.snapshot()))
+
+    def test_route_of(self):
+        uid = "0fb0b3c6-1b7c-4b3b-9a4d-1234567890ab"
+        self.assertEqual(
+            "GET data/processes/{id}", route_of("GET", f"data/processes/{uid}")
+        )
+        self.assertEqual(
+            "POST result/{id}/total-flows-of/{id}",
+            route_of("POST", f"result/{uid}/total-flows-of/{uid}::{uid}"),
+        )
+        self.assertEqual(
+            "GET data/flows/name/{name}", route_of("GET", "data/flows/name/CO2")
+        )
+
+    def test_size_of(self):
+        self.assertEqual(3, size_of(b"abc"))
+        self.assertEqual(0, size_of(None))
+        self.assertEqual(0, size_of(iter([b"abc"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
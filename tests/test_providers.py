@@ -0,0 +1,70 @@
+import unittest
+
+import olca_schema as o
+from olca_ipc.metrics import Metrics
+from olca_ipc.providers import ProviderIndex
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+class ProviderIndexTest(unittest.TestCase):
+    def test_index(self):
+        model = SyntheticModel(tech_flows=20, envi_flows=5, impacts=1)
+        with StandInServer(model) as server:
+            for protocol in ("ipc", "rest"):
+                metrics = Metrics()
+                if protocol == "ipc":
+                    client = server.ipc_client(metrics=metrics)
+                else:
+                    client = server.rest_client(metrics=metrics)
+                tech_flows = client.get_providers()
+                metrics.reset()
+
+                index = ProviderIndex(client)
+                self.assertEqual(len(tech_flows), len(index))
+                for tf in tech_flows:
+                    assert tf.flow is not None and tf.provider is not None
+                    providers = index.providers_of(tf.flow)
+                    self.assertEqual(tf.provider.id, providers[0].provider.id)
+                self.assertNotIn("no-flow", index)
+                self.assertEqual(1, _calls(metrics))
+
+                # candidates for the product inputs of a process
+                flow = tech_flows[3].flow
+                assert flow is not None
+                process = o.Process(
+                    id="6d4c0e8c-0c3e-4c5b-9d0c-3f2b9a0e7c11",
+                    name="Consumer",
+                    exchanges=[
+                        o.Exchange(internal_id=1, flow=flow, is_input=True),
+                        o.Exchange(internal_id=2, flow=flow, is_input=False),
+                    ],
+                )
+                assert process.id is not None
+                candidates = index.candidates_of([process])
+                self.assertEqual([(process.id, 1)], list(candidates.keys()))
+                candidate = candidates[(process.id, 1)][0]
+                self.assertEqual(tech_flows[3].provider, candidate.provider)
+
+                # changes of processes trigger a rebuild on the next lookup
+                metrics.reset()
+                client.put(process)
+                index.providers_of(flow)
+                index.providers_of(flow)
+                client.delete(process)
+                self.assertEqual(3, _calls(metrics))  # put, rebuild, delete
+                index.providers_of(flow)
+                self.assertEqual(4, _calls(metrics))
+
+                index.close()
+                client.put(process)
+                index.providers_of(flow)
+                self.assertEqual(5, _calls(metrics))
+                client.delete(process)
+
+
+def _calls(metrics: Metrics) -> int:
+    return sum(s.calls for s in metrics.snapshot().values())
+
+
+if __name__ == "__main__":
+    unittest.main()
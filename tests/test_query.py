@@ -0,0 +1,101 @@
+import unittest
+from typing import cast
+
+import olca_schema as o
+from olca_ipc.protocol import ProtoResult
+from olca_ipc.query import QueryPlan
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+def _top(values, n=3):
+    return sorted(values, key=lambda v: -abs(v.amount or 0))[:n]
+
+
+class QueryPlanTest(unittest.TestCase):
+    def test_execute(self):
+        model = SyntheticModel(tech_flows=20, envi_flows=10, impacts=4)
+        with StandInServer(model) as server:
+            for client in (server.ipc_client(), server.rest_client()):
+                result = client.calculate(o.CalculationSetup())
+                result.wait_until_ready()
+
+                plan = QueryPlan()
+                impacts = plan.call("impacts", ProtoResult.get_total_impacts)
+                top = plan.compute("top", _top, impacts)
+                contributions = plan.each(
+                    "contributions",
+                    "get_impact_contributions_of",
+                    top,
+                    item=lambda v: v.impact_category,
+                )
+                top_techs = plan.compute(
+                    "top_techs",
+                    lambda cs: [v.tech_flow for v in _top(cs[0], 2)],
+                    contributions,
+                )
+                plan.each("direct", "get_direct_impacts_of", top_techs)
+                plan.call("flows", lambda r: r.get_envi_flows())
+                self.assertEqual(
+                    [["impacts", "flows"], ["contributions"], ["direct"]],
+                    plan.waves(),
+                )
+
+                out = plan.execute(result, concurrency=4)
+                expected = _top(result.get_total_impacts())
+                self.assertEqual(expected, out["top"])
+                self.assertEqual(3, len(out["contributions"]))
+                for value, cs in zip(expected, out["contributions"]):
+                    self.assertEqual(
+                        result.get_impact_contributions_of(
+                            value.impact_category
+                        ),
+                        cs,
+                    )
+                self.assertEqual(2, len(out["direct"]))
+                self.assertEqual(
+                    result.get_direct_impacts_of(out["top_techs"][0]),
+                    out["direct"][0],
+                )
+                self.assertEqual(result.get_envi_flows(), out["flows"])
+                result.dispose()
+
+    def test_invalid_plans(self):
+        plan = QueryPlan()
+        plan.call("impacts", "get_total_impacts")
+        with self.assertRaises(ValueError):
+            plan.call("impacts", "get_total_flows")
+        other = QueryPlan().call("flows", "get_total_flows")
+        with self.assertRaises(ValueError):
+            plan.each("values", "get_total_flow_value_of", other)
+
+    def test_failed_query(self):
+        def fail(_):
+            raise RuntimeError("failed")
+
+        plan = QueryPlan()
+        plan.call("failed", fail)
+        plan.call("other", lambda _: 42)
+        out = plan.execute(cast(ProtoResult, None))
+        self.assertIsNone(out["failed"])
+        self.assertEqual(42, out["other"])
+        self.assertEqual({"failed"}, out.failed)
+
+    def test_failed_upstream_query(self):
+        def fail(_):
+            raise RuntimeError("failed")
+
+        plan = QueryPlan()
+        impacts = plan.call("impacts", fail)
+        top = plan.compute("top", _top, impacts)
+        plan.each("contributions", lambda _, x: x, top)
+        other = plan.call("other", lambda _: [1.0, 2.0])
+        plan.compute("sum", sum, other)
+        out = plan.execute(cast(ProtoResult, None))
+        self.assertEqual({"impacts", "top", "contributions"}, out.failed)
+        self.assertIsNone(out["top"])
+        self.assertIsNone(out["contributions"])
+        self.assertEqual(3.0, out["sum"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+import uuid
+
+import olca_schema as o
+import olca_ipc as ipc
+import olca_ipc.replay as replay
+import olca_ipc.utree as utree
+from olca_ipc import FileStream
+from olca_ipc.rest import RestClient
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+def _workload(client) -> tuple[float, int, list[float]]:
+    result = client.calculate(o.CalculationSetup())
+    result.wait_until_ready()
+    impact = result.get_impact_categories()[0]
+    total = result.get_total_impact_value_of(impact).amount
+    root = utree.expand(utree.of(result, impact), max_depth=3)
+    nodes = sum(1 for _ in utree.walk(root, fetch=False))
+    simulation = client.simulate(o.CalculationSetup())
+    values = []
+    for _ in range(3):
+        simulation.simulate_next()
+        values.append(simulation.get_total_impacts()[0].amount)
+    return total, nodes, values
+
+
+class ReplayTest(unittest.TestCase):
+    def test_record_replay(self):
+        model = SyntheticModel(tech_flows=40, envi_flows=10, impacts=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            for protocol in ("ipc", "rest"):
+                file = os.path.join(tmp, f"{protocol}.rec.gz")
+                with StandInServer(model) as server:
+                    url = server.url
+                    live = (
+                        server.ipc_client()
+                        if protocol == "ipc"
+                        else server.rest_client()
+                    )
+                    with replay.record(live, file) as recording:
+                        expected = _workload(live)
+                self.assertTrue(len(recording) > 0)
+                recorded = replay.Recording.load(file)
+                self.assertEqual(len(recording), len(recorded))
+
+                # the server is stopped now
+                if protocol == "ipc":
+                    offline = ipc.Client(url)
+                else:
+                    offline = RestClient(url)
+                replay.replay(offline, recorded)
+                self.assertEqual(expected, _workload(offline))
+
+    def test_streamed_upload(self):
+        model = SyntheticModel(tech_flows=10, envi_flows=5, impacts=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.pdf")
+            with open(path, "wb") as f:
+                f.write(os.urandom(100_000))
+            source = o.Source(id=str(uuid.uuid4()), name="Report")
+            for protocol in ("ipc", "rest"):
+                with StandInServer(model) as server:
+                    url = server.url
+                    live = (
+                        server.ipc_client()
+                        if protocol == "ipc"
+                        else server.rest_client()
+                    )
+                    with replay.record(live) as recording:
+                        stream = FileStream(path, chunk_size=3000)
+                        self.assertTrue(live.put_source_file(source, stream))
+
+                # the file content is only recorded by its length and hash
+                [upload] = recording.exchanges
+                self.assertTrue(len(upload.request) < 1000)
+                self.assertIn(b"stream:", upload.request)
+
+                if protocol == "ipc":
+                    offline = ipc.Client(url)
+                else:
+                    offline = RestClient(url)
+                replay.replay(offline, recording)
+                stream = FileStream(path, chunk_size=6000)
+                self.assertTrue(offline.put_source_file(source, stream))
+
+    def test_strict_replay(self):
+        client = ipc.Client(1)
+        replay.replay(client, replay.Recording())
+        with self.assertRaises(RuntimeError):
+            client.rpc_call("result/state", {"@id": "x"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import olca_ipc.rescale as rescale
+
+from config import LoopModel
+
+
+class RescaleTest(unittest.TestCase):
+    def setUp(self):
+        self.model = LoopModel()
+        self.model.put()
+        self.result = self.model.calculate(amount=2)
+
+    def tearDown(self):
+        self.result.dispose()
+        self.model.delete()
+
+    def test_view(self):
+        rescaler = rescale.Rescaler(self.result)
+        view = rescaler.view(4)
+        self.assertEqual(4, view.get_demand().amount)
+        flow = view.get_total_flows()[0].amount
+        impact = view.get_total_impacts()[0].amount
+        assert flow is not None and impact is not None
+        self.assertAlmostEqual(48, flow)
+        self.assertAlmostEqual(24, impact)
+
+        # intensities do not depend on the demand
+        tech_flow = view.get_tech_flows()[0]
+        intensities = view.get_flow_intensities_of(tech_flow)
+        expected = self.result.get_flow_intensities_of(tech_flow)[0].amount
+        actual = intensities[0].amount
+        assert expected is not None and actual is not None
+        self.assertAlmostEqual(expected, actual)
+
+    def test_dispose_view(self):
+        rescaler = rescale.Rescaler(self.result)
+        view = rescaler.view(4)
+        other = rescaler.view(8)
+        view.get_tech_flows().clear()
+        view.dispose()
+        self.assertEqual(2, len(other.get_tech_flows()))
+        flow = other.get_total_flows()[0].amount
+        assert flow is not None
+        self.assertAlmostEqual(96, flow)
+
+    def test_batch(self):
+        rescaler = rescale.Rescaler(self.result)
+        impacts = rescaler.total_impacts([1, 2, 10])
+        self.assertEqual((3, 1), impacts.shape)
+        for expected, actual in zip([6, 12, 60], impacts[:, 0]):
+            self.assertAlmostEqual(expected, actual)
+
+
+if __name__ == "__main__":
+    unittest.main()
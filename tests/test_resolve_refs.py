@@ -0,0 +1,60 @@
+import unittest
+
+import olca_schema as o
+from olca_ipc.metrics import Metrics
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+class ResolveRefsTest(unittest.TestCase):
+    def test_resolve_refs(self):
+        model = SyntheticModel(tech_flows=10, envi_flows=5, impacts=1)
+        with StandInServer(model) as server:
+            for protocol in ("ipc", "rest"):
+                metrics = Metrics()
+                if protocol == "ipc":
+                    client = server.ipc_client(metrics=metrics)
+                else:
+                    client = server.rest_client(metrics=metrics)
+
+                units = o.new_unit_group("Units of mass", "kg")
+                mass = o.new_flow_property("Mass", units)
+                steel = o.new_product("Steel", mass)
+                co2 = o.new_elementary_flow("CO2", mass)
+                process = o.new_process("Steel production")
+                output = o.new_output(process, steel, 1.0)
+                output.is_quantitative_reference = True
+                for _ in range(5):
+                    o.new_output(process, co2, 0.5)
+                client.put_all(units, mass, steel, co2, process)
+                process = client.get(o.Process, process.id)
+                assert process is not None
+                assert units.id is not None and mass.id is not None
+                metrics.reset()
+
+                refs = client.resolve_refs([process])
+                self.assertEqual({steel.id, co2.id}, set(refs.keys()))
+                self.assertEqual(2, _calls(metrics))
+
+                metrics.reset()
+                refs = client.resolve_refs([process], depth=3)
+                self.assertEqual(
+                    {steel.id, co2.id, mass.id, units.id}, set(refs.keys())
+                )
+                self.assertIsInstance(refs[units.id], o.UnitGroup)
+                # the flows are fetched once, despite the 6 exchanges
+                self.assertEqual(4, _calls(metrics))
+
+                # references to given entities are not fetched
+                metrics.reset()
+                refs = client.resolve_refs([steel, mass])
+                self.assertIs(mass, refs[mass.id])
+                self.assertEqual(1, _calls(metrics))
+                client.delete_all(process, co2, steel, mass, units)
+
+
+def _calls(metrics: Metrics) -> int:
+    return sum(s.calls for s in metrics.snapshot().values())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+import olca_ipc.matrix as matrix
+import olca_ipc.sensitivity as sensitivity
+
+from config import LoopModel
+
+
+class SensitivityTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = LoopModel()
+        self.loop.put()
+        self.result = self.loop.calculate()
+        self.model = matrix.LocalModel.of(self.result)
+
+    def tearDown(self):
+        self.result.dispose()
+        self.loop.delete()
+
+    def test_elasticities(self):
+        sens = sensitivity.of(self.model)
+        # 2 tech. inputs and 2 interventions
+        self.assertEqual((4, 1), sens.elasticities.shape)
+        top, value = sens.rank(k=1)[0]
+        self.assertEqual("tech", top.kind)
+        # the input of q into P: h = (1 + 2a) / (1 - 0.5a) with a = 1
+        self.assertEqual((1, 0), (top.row, top.col))
+        self.assertAlmostEqual(10 / 6, value)
+
+    def test_perturb(self):
+        sens = sensitivity.of(self.model)
+        params = [sens.parameter(p) for p in range(len(sens))]
+        eps = 1e-6
+        perturbed = sensitivity.perturb(self.model, params, change=eps)
+        fd = (perturbed - sens.impacts) / (eps * sens.values[:, np.newaxis])
+        np.testing.assert_allclose(fd, sens.derivatives, rtol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+
+import olca_ipc.snapshot as snapshot
+import olca_ipc.utree as utree
+
+from config import LoopModel
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_snapshot(self):
+        model = LoopModel()
+        model.put()
+        result = model.calculate()
+        envi_flow = next(
+            filter(lambda ei: ei.flow.id == model.e.id, result.get_envi_flows())
+        )
+        tech_flow = next(
+            filter(
+                lambda tf: tf.provider.id == model.Q.id,
+                result.get_tech_flows(),
+            )
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot.snapshot(result, tmp, upstream=[envi_flow])
+            result.dispose()
+
+            r = snapshot.SnapshotResult(tmp)
+            total = r.get_total_flows()[0].amount
+            impact = r.get_total_impacts()[0].amount
+            direct = r.get_direct_intervention_of(envi_flow, tech_flow).amount
+            intensity = r.get_flow_intensity_of(envi_flow, tech_flow).amount
+            assert total is not None and impact is not None
+            assert direct is not None and intensity is not None
+            self.assertAlmostEqual(12.0, total)
+            self.assertAlmostEqual(6.0, impact)
+            self.assertAlmostEqual(8.0, direct)
+            self.assertAlmostEqual(10.0, intensity)
+
+            root = utree.of(r, envi_flow)
+            self.assertAlmostEqual(12.0, root.result)
+            self.assertAlmostEqual(10.0, root.childs[0].result)
+            r.dispose()
+
+        model.delete()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import uuid
+
+import olca_schema as o
+from olca_ipc import FileData, FileStream
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+class SourceFileTest(unittest.TestCase):
+    def test_stream_body(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.bin")
+            for size in (0, 1, 2, 3, 1000):
+                with open(path, "wb") as f:
+                    f.write(os.urandom(size))
+                stream = FileStream(path, chunk_size=10)
+                body = stream.body_of({"file": stream.to_dict(), "n": 1})
+                data = b"".join(body)
+                self.assertEqual(len(body), len(data))
+                expected = FileData.from_file(path).content
+                self.assertIn(f'"content":"{expected}"'.encode(), data)
+
+    def test_upload(self):
+        model = SyntheticModel(tech_flows=10, envi_flows=5, impacts=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(5):
+                path = os.path.join(tmp, f"file{i}.pdf")
+                with open(path, "wb") as f:
+                    f.write(os.urandom(100_001 + i))
+                paths.append(path)
+
+            with StandInServer(model) as server:
+                for client in (server.ipc_client(), server.rest_client()):
+                    source_id = str(uuid.uuid4())
+                    source = o.Source(id=source_id, name="Report")
+                    client.put(source)
+
+                    stream = FileStream(paths[0], chunk_size=3000)
+                    self.assertTrue(client.put_source_file(source, stream))
+                    data = FileData.from_file(paths[1])
+                    self.assertTrue(client.put_source_file(source, data))
+
+                    results = client.put_source_files(
+                        [(source, p) for p in paths[2:]], concurrency=3
+                    )
+                    self.assertEqual([True, True, True], results)
+
+                    files = server.files[source_id]
+                    self.assertEqual(5, len(files))
+                    for path in paths:
+                        with open(path, "rb") as f:
+                            expected = f.read()
+                        name = os.path.basename(path)
+                        self.assertEqual(expected, files[name])
+                    client.delete(source)
+
+
+if __name__ == "__main__":
+    unittest.main()
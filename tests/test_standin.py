@@ -0,0 +1,68 @@
+import unittest
+
+import olca_schema as o
+import olca_ipc.utree as utree
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+class StandInServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        model = SyntheticModel(tech_flows=50, envi_flows=20, impacts=5)
+        cls.server = StandInServer(model).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_protocols(self):
+        clients = [self.server.ipc_client(), self.server.rest_client()]
+        totals = []
+        for client in clients:
+            result = client.calculate(o.CalculationSetup())
+            self.assertTrue(result.wait_until_ready().is_ready)
+            self.assertEqual(50, len(result.get_tech_flows()))
+            self.assertEqual(20, len(result.get_envi_flows()))
+            totals.append([v.amount for v in result.get_total_impacts()])
+            result.dispose()
+        self.assertEqual(totals[0], totals[1])
+
+    def test_results(self):
+        client = self.server.ipc_client()
+        result = client.calculate(o.CalculationSetup())
+        impact = result.get_impact_categories()[0]
+        total = result.get_total_impact_value_of(impact).amount
+        assert total is not None
+        contributions = result.get_impact_contributions_of(impact)
+        self.assertAlmostEqual(total, sum(v.amount or 0 for v in contributions))
+
+        root = utree.of(result, impact)
+        self.assertAlmostEqual(total, root.result)
+        upstream = sum(c.result for c in root.childs)
+        self.assertAlmostEqual(total, root.direct_contribution + upstream)
+
+    def test_data(self):
+        client = self.server.rest_client()
+        units = o.new_unit_group("Units of mass", "kg")
+        self.assertEqual(units.id, client.put(units).id)
+        unit_group = client.get(o.UnitGroup, units.id)
+        assert unit_group is not None
+        self.assertEqual("Units of mass", unit_group.name)
+        client.delete(units)
+        self.assertEqual(50, len(client.get_descriptors(o.Process)))
+
+    def test_providers(self):
+        clients = [self.server.ipc_client(), self.server.rest_client()]
+        flow = clients[0].get_providers()[0].flow
+        assert flow is not None
+        for client in clients:
+            self.assertEqual(50, len(client.get_providers()))
+            providers = client.get_providers(flow)
+            self.assertTrue(0 < len(providers) < 50)
+            for tf in providers:
+                assert tf.flow is not None
+                self.assertEqual(flow.id, tf.flow.id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+import olca_schema as o
+import olca_ipc.system as system
+from olca_ipc.standin import StandInServer, SyntheticModel
+
+
+class SystemGraphTest(unittest.TestCase):
+    def test_fetch_system_graph(self):
+        model = SyntheticModel(tech_flows=10, envi_flows=5, impacts=1)
+        with StandInServer(model) as server:
+            for client in (server.ipc_client(), server.rest_client()):
+                units = o.new_unit_group("Units of mass", "kg")
+                mass = o.new_flow_property("Mass", units)
+                steel = o.new_product("Steel", mass)
+                car = o.new_product("Car", mass)
+                co2 = o.new_elementary_flow("CO2", mass)
+
+                steel_prod = o.new_process("Steel production")
+                ref = o.new_output(steel_prod, steel, 1)
+                ref.is_quantitative_reference = True
+                o.new_output(steel_prod, co2, 2)
+
+                car_prod = o.new_process("Car production")
+                ref = o.new_output(car_prod, car, 1)
+                ref.is_quantitative_reference = True
+                steel_input = o.new_input(car_prod, steel, 800)
+
+                product_system = o.ProductSystem(
+                    id="0d1b6d48-5c43-4a3e-9a57-52ab9e3a3c0d",
+                    name="Car",
+                    ref_process=o.as_ref(car_prod),
+                    processes=[o.as_ref(car_prod), o.as_ref(steel_prod)],
+                    process_links=[
+                        o.ProcessLink(
+                            provider=o.as_ref(steel_prod),
+                            flow=o.as_ref(steel),
+                            process=o.as_ref(car_prod),
+                            exchange=o.ExchangeRef(
+                                internal_id=steel_input.internal_id
+                            ),
+                        )
+                    ],
+                )
+                entities = [units, mass, steel, car, co2]
+                entities += [steel_prod, car_prod, product_system]
+                client.put_all(*entities)
+
+                graph = system.fetch_system_graph(
+                    client, o.as_ref(product_system)
+                )
+                assert graph is not None
+                assert car_prod.id is not None and steel_prod.id is not None
+                self.assertEqual(2, len(graph))
+                self.assertEqual([], graph.missing)
+                self.assertEqual(
+                    {steel.id, car.id, co2.id}, set(graph.flows.keys())
+                )
+                providers = graph.providers_of(car_prod.id)
+                self.assertEqual([steel_prod.id], providers)
+                consumers = graph.consumers_of(steel_prod.id)
+                self.assertEqual([car_prod.id], consumers)
+                self.assertEqual([], graph.providers_of(steel_prod.id))
+
+                link = graph.links_of(car_prod.id)[0]
+                exchange = graph.linked_exchange(link)
+                assert exchange is not None and exchange.flow is not None
+                self.assertEqual(steel.id, exchange.flow.id)
+                self.assertEqual(800, exchange.amount)
+                client.delete_all(*reversed(entities))
+
+
+if __name__ == "__main__":
+    unittest.main()
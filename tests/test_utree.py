@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 import olca_schema as o
@@ -7,7 +9,7 @@ from config import client
 
 
 class TestUpstreamTree(unittest.TestCase):
-    def test_upstream_tree(self):
+    def setUp(self):
         units = o.new_unit_group("Units of mass", "kg")
         mass = o.new_flow_property("Mass", units)
         e = o.new_elementary_flow("e", mass)
@@ -23,19 +25,26 @@ class TestUpstreamTree(unittest.TestCase):
         o.new_input(Q, p, amount=0.5).default_provider = P.to_ref()
         o.new_output(Q, e, amount=4)
 
-        client.put_all(units, mass, e, p, q, P, Q)
+        self.entities = [units, mass, e, p, q, P, Q]
+        client.put_all(*self.entities)
 
         setup = o.CalculationSetup(
             target=o.Ref(ref_type=o.RefType.Process, id=P.id)
         )
-        result = client.calculate(setup)
-        result.wait_until_ready()
+        self.result = client.calculate(setup)
+        self.result.wait_until_ready()
 
-        envi_flow = next(
-            filter(lambda ei: ei.flow.id == e.id, result.get_envi_flows())
+        self.envi_flow = next(
+            filter(lambda ei: ei.flow.id == e.id, self.result.get_envi_flows())
         )
 
-        root = utree.of(result, envi_flow)
+    def tearDown(self):
+        self.result.dispose()
+        self.entities.reverse()
+        client.delete_all(*self.entities)
+
+    def test_upstream_tree(self):
+        root = utree.of(self.result, self.envi_flow)
         self.assertAlmostEqual(12.0, root.result)
         self.assertAlmostEqual(2.0, root.direct_contribution)
 
@@ -59,8 +68,167 @@ class TestUpstreamTree(unittest.TestCase):
         self.assertAlmostEqual(2.5, l5.result)
         self.assertAlmostEqual(1.0, l5.direct_contribution)
 
-        result.dispose()
-        client.delete_all(Q, P, q, p, e, mass, units)
+    def test_node_path(self):
+        root = utree.of(self.result, self.envi_flow)
+        l3 = root.childs[0].childs[0].childs[0]
+        self.assertEqual(3, l3.depth)
+        self.assertIs(root, l3.path_nodes[0])
+        self.assertEqual(4, len(l3.path))
+        # nodes of the same tech. flow share the same instance
+        self.assertIs(root.childs[0].tech_flow, l3.tech_flow)
+        self.assertEqual(root.provider.id, l3.path[2].provider.id)
+
+    def test_node_of_path(self):
+        root = utree.of(self.result, self.envi_flow)
+        l1 = root.childs[0]
+        upstream = o.UpstreamNode(
+            tech_flow=l1.tech_flow,
+            result=l1.result,
+            direct_contribution=l1.direct_contribution,
+            required_amount=l1.required_amount,
+        )
+        node = utree.Node(self.result, self.envi_flow, upstream, l1.path)
+        self.assertEqual(1, node.depth)
+        self.assertEqual(2, len(node._path))
+        self.assertAlmostEqual(6.0, node.childs[0].result)
+        self.assertEqual(3, len(node.childs[0].path))
+
+    def test_expand(self):
+        root = utree.of(self.result, self.envi_flow)
+        utree.expand(root, max_depth=5, concurrency=4)
+        expected = [12.0, 10.0, 6.0, 5.0, 3.0, 2.5]
+        node = root
+        for value in expected[:-1]:
+            self.assertAlmostEqual(value, node.result)
+            self.assertIsNotNone(node._childs)
+            node = node.childs[0]
+        self.assertAlmostEqual(expected[-1], node.result)
+        self.assertIsNone(node._childs)
+
+    def test_expand_min_share(self):
+        root = utree.of(self.result, self.envi_flow)
+        utree.expand(root, max_depth=10, min_share=0.3)
+        node = root
+        depth = 0
+        while node._childs:
+            node = node._childs[0]
+            depth += 1
+        # 3.0 is the first result below 30% of 12.0
+        self.assertEqual(4, depth)
+        self.assertAlmostEqual(3.0, node.result)
+
+    def test_expand_min_result(self):
+        root = utree.of(self.result, self.envi_flow)
+        utree.expand(root, max_depth=10, min_result=5.5)
+        node = root
+        depth = 0
+        while node._childs:
+            node = node._childs[0]
+            depth += 1
+        self.assertEqual(3, depth)
+        self.assertAlmostEqual(5.0, node.result)
+
+    def test_top_paths(self):
+        root = utree.of(self.result, self.envi_flow)
+        paths = utree.top_paths(root, k=3)
+        self.assertEqual([1, 2, 3], [len(p) for p in paths])
+        self.assertAlmostEqual(6.0, paths[-1][-1].result)
+
+        root = utree.of(self.result, self.envi_flow)
+        paths = utree.top_paths(root, k=3, key="direct_contribution")
+        directs = [p[-1].direct_contribution for p in paths]
+        for expected, actual in zip([4.0, 2.0, 2.0], directs):
+            self.assertAlmostEqual(expected, actual)
+
+    def test_walk(self):
+        root = utree.of(self.result, self.envi_flow)
+        # P -> Q -> P, where the cycle is not followed further
+        results = [n.result for n in utree.walk(root)]
+        self.assertEqual(3, len(results))
+        self.assertAlmostEqual(6.0, results[-1])
+
+        for order in ("dfs", "bfs"):
+            nodes = list(
+                utree.walk(root, order, max_depth=4, skip_cycles=False)
+            )
+            self.assertEqual([0, 1, 2, 3, 4], [n.depth for n in nodes])
+            self.assertAlmostEqual(3.0, nodes[-1].result)
+
+    def test_flatten(self):
+        root = utree.of(self.result, self.envi_flow)
+        utree.expand(root, max_depth=5)
+        flat = utree.flatten(root, skip_cycles=False)
+        self.assertEqual(6, len(flat))
+        self.assertEqual([-1, 0, 1, 2, 3, 4], flat.parent.tolist())
+        self.assertEqual(2, len(flat.providers))
+        self.assertAlmostEqual(2.5, flat.result[-1])
+        d = flat.to_dict()
+        self.assertEqual(flat.provider.tolist(), d["provider"])
+
+    def test_multi_tree(self):
+        root = utree.of_all(self.result, [self.envi_flow, "costs"])
+        self.assertEqual(2, len(root.results))
+        self.assertAlmostEqual(12.0, root.results[0])
+        self.assertAlmostEqual(0.0, root.results[1])
+
+        utree.expand(root, max_depth=3)
+        nodes = list(utree.walk(root, fetch=False, skip_cycles=False))
+        self.assertEqual(4, len(nodes))
+        for node, expected in zip(nodes, [12.0, 10.0, 6.0, 5.0]):
+            self.assertAlmostEqual(expected, node.results[0])
+
+    def test_save_load(self):
+        root = utree.expand(utree.of(self.result, self.envi_flow), max_depth=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "tree.utree")
+            utree.save(root, file)
+
+            offline = utree.load(file)
+            nodes = list(utree.walk(offline, skip_cycles=False, fetch=False))
+            self.assertEqual([12.0, 10.0, 6.0], [n.result for n in nodes])
+            with self.assertRaises(RuntimeError):
+                _ = nodes[-1].childs
+
+            # continues lazily against the live result
+            attached = utree.load(file, self.result)
+            l3 = attached.childs[0].childs[0].childs[0]
+            self.assertAlmostEqual(5.0, l3.result)
+
+    def test_save_load_inner(self):
+        l1 = utree.of(self.result, self.envi_flow).childs[0]
+        upstream = o.UpstreamNode(
+            tech_flow=l1.tech_flow,
+            result=l1.result,
+            direct_contribution=l1.direct_contribution,
+            required_amount=l1.required_amount,
+        )
+        node = utree.Node(self.result, self.envi_flow, upstream, l1.path)
+        utree.expand(node, max_depth=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            file = os.path.join(tmp, "tree.utree")
+            utree.save(node, file)
+
+            # the path above the saved node is kept
+            loaded = utree.load(file, self.result)
+            self.assertEqual(1, loaded.depth)
+            self.assertEqual(2, len(loaded.path))
+            self.assertEqual(l1.path[0].provider.id, loaded.path[0].provider.id)
+            l3 = loaded.childs[0].childs[0]
+            self.assertEqual(3, l3.depth)
+            self.assertAlmostEqual(5.0, l3.result)
+
+    def test_tree_cache(self):
+        demand = self.result.get_demand()
+        setup = o.CalculationSetup(target=demand.tech_flow.provider)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = utree.TreeCache(tmp)
+            self.assertIsNone(cache.get(setup, self.envi_flow))
+            cache.of(self.result, setup, self.envi_flow, max_depth=3)
+            cached = cache.get(setup, self.envi_flow)
+            assert cached is not None
+            self.assertAlmostEqual(12.0, cached.result)
+            nodes = list(utree.walk(cached, skip_cycles=False, fetch=False))
+            self.assertEqual(4, len(nodes))
 
 
 if __name__ == "__main__":